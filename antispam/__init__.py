@@ -31,6 +31,7 @@ from antispam.anti_spam_handler import AntiSpamHandler
 from antispam.base_plugin import BasePlugin
 from antispam.dataclasses import CorePayload, Options
 from antispam.plugin_cache import PluginCache
+from antispam.sweeper import CacheSweeper
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 VersionInfo = namedtuple("VersionInfo", "major minor micro releaselevel serial")
@@ -1,4 +1,6 @@
 from antispam.abc.cache import Cache
+from antispam.abc.codec import Codec
+from antispam.abc.invalidator import Invalidator
 from antispam.abc.lib import Lib
 
-__all__ = ("Lib", "Cache")
+__all__ = ("Lib", "Cache", "Codec", "Invalidator")
@@ -20,11 +20,25 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
-from typing import AsyncIterable, List, Optional, Protocol, Union, runtime_checkable
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Protocol,
+    Union,
+    runtime_checkable,
+)
 
 from antispam.dataclasses import Guild, Member, Message
 from antispam.dataclasses.propagate_data import PropagateData
-from antispam.enums import ResetType
+from antispam.enums import MemberCounter, ResetType
+from antispam.exceptions import GuildNotFound, MemberNotFound
 
 
 @runtime_checkable
@@ -47,6 +61,34 @@ class Cache(Protocol):
         """
         pass
 
+    @asynccontextmanager
+    async def pipeline(self, guild_id: int) -> AsyncIterator[None]:
+        """
+        An async context manager which groups every cache
+        operation made for a single guild, so that caches
+        backed by a network can batch their round trips.
+
+        :py:meth:`antispam.AntiSpamHandler.propagate` opens
+        one of these around each message it processes.
+
+        .. code-block:: python
+            :linenos:
+
+            async with cache.pipeline(guild_id):
+                guild = await cache.get_guild(guild_id)
+                ...
+
+        Parameters
+        ----------
+        guild_id : int
+            The guild operations will be made against
+
+        Notes
+        -----
+        This is not required, by default it does nothing.
+        """
+        yield
+
     async def get_guild(self, guild_id: int) -> Guild:
         """Fetch a Guild dataclass populated with members
 
@@ -195,6 +237,201 @@ class Cache(Protocol):
         """
         raise NotImplementedError
 
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        """
+        Increment one of a Member's counters,
+        creating the Guild/Member if they don't exist
+
+        Parameters
+        ----------
+        member_id : int
+            The Member to modify
+        guild_id : int
+            The guild this member is in
+        counter : MemberCounter
+            An enum denoting the counter to modify
+        amount : int
+            How much to increment (or decrement) by
+
+        Returns
+        -------
+        int
+            The value of the counter after incrementing
+
+        Notes
+        -----
+        This has a default implementation built on
+        ``get_member`` and ``set_member``. Caches
+        which can modify a counter in place, without
+        rewriting the entire Member, should override this.
+        """
+        try:
+            member = await self.get_member(member_id, guild_id)
+        except (MemberNotFound, GuildNotFound):
+            member = Member(id=member_id, guild_id=guild_id)
+
+        value: int = getattr(member, counter.value) + amount
+        setattr(member, counter.value, value)
+        await self.set_member(member)
+        return value
+
+    async def update_member(
+        self, member_id: int, guild_id: int, fn: Callable[[Member], Any]
+    ) -> Member:
+        """
+        Read a Member, modify it and store it again
+        as a single operation, creating the Guild/Member
+        if they don't exist
+
+        .. code-block:: python
+            :linenos:
+
+            def warn(member: Member) -> None:
+                member.warn_count += 1
+
+            member = await cache.update_member(member_id, guild_id, warn)
+
+        Parameters
+        ----------
+        member_id : int
+            The Member to modify
+        guild_id : int
+            The guild this member is in
+        fn : Callable[[Member], Any]
+            Modifies the given Member in place,
+            anything it returns is ignored
+
+        Returns
+        -------
+        Member
+            The Member after ``fn`` was applied
+
+        Warnings
+        --------
+        ``fn`` may be called more than once if the Member
+        changes concurrently, so it should only modify
+        the Member it is given.
+
+        Notes
+        -----
+        This has a default implementation built on
+        ``get_member`` and ``set_member``, which is not
+        safe against concurrent updates. Caches shared
+        between processes should override this.
+        """
+        try:
+            member = await self.get_member(member_id, guild_id)
+        except (MemberNotFound, GuildNotFound):
+            member = Member(id=member_id, guild_id=guild_id)
+
+        fn(member)
+        await self.set_member(member)
+        return member
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, Member]:
+        """
+        Fetch several members from the same guild at once
+
+        Parameters
+        ----------
+        member_ids : Iterable[int]
+            The ids of the members to fetch
+        guild_id : int
+            The guild these members are in
+
+        Returns
+        -------
+        Dict[int, Member]
+            The members found, keyed by id. Members
+            which could not be found are omitted.
+
+        Notes
+        -----
+        This has a default implementation built on
+        ``get_member``. Caches which can fetch several
+        members in one round trip should override this.
+        """
+        members: Dict[int, Member] = {}
+        for member_id in member_ids:
+            try:
+                members[member_id] = await self.get_member(member_id, guild_id)
+            except (MemberNotFound, GuildNotFound):
+                continue
+
+        return members
+
+    async def set_members_many(self, members: Iterable[Member]) -> None:
+        """
+        Stores several members at once, creating
+        any Guilds required silently
+
+        Parameters
+        ----------
+        members : Iterable[Member]
+            The members to store, these may
+            belong to different guilds
+
+        Notes
+        -----
+        This has a default implementation built on
+        ``set_member``. Caches which can store several
+        members in one round trip should override this.
+        """
+        for member in members:
+            await self.set_member(member)
+
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        """
+        Removes several members from the same guild at once
+
+        Parameters
+        ----------
+        member_ids : Iterable[int]
+            The ids of the members to remove
+        guild_id : int
+            The guild these members are in
+
+        Notes
+        -----
+        This fails silently.
+
+        This has a default implementation built on
+        ``delete_member``. Caches which can remove several
+        members in one round trip should override this.
+        """
+        for member_id in member_ids:
+            await self.delete_member(member_id, guild_id)
+
+    async def add_messages_many(self, messages: Iterable[Message]) -> None:
+        """
+        Adds several Messages to their relevant Members,
+        creating the Guild's/Member's required silently
+
+        Parameters
+        ----------
+        messages : Iterable[Message]
+            The messages to add, in the order
+            they should be stored
+
+        Notes
+        -----
+        This has a default implementation built on
+        ``add_message``. Caches which can add several
+        messages in one round trip should override this.
+        """
+        for message in messages:
+            await self.add_message(message)
+
     async def get_all_guilds(self) -> AsyncIterable[Guild]:
         """
         Returns a generator containing all cached guilds
@@ -0,0 +1,111 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from typing import Protocol, runtime_checkable
+
+from antispam.dataclasses import Guild, Member
+
+
+@runtime_checkable
+class Codec(Protocol):
+    """
+    A generic Protocol for turning cached dataclasses
+    into bytes and back again.
+
+    Remote caches such as :py:class:`antispam.caches.redis.RedisCache`
+    use a Codec for every read and write, so implementations
+    should aim to be cheap in both time and payload size.
+    """
+
+    def encode_guild(self, guild: Guild) -> bytes:
+        """
+        Serialize a Guild, excluding its members.
+
+        Parameters
+        ----------
+        guild : Guild
+            The Guild to serialize
+
+        Returns
+        -------
+        bytes
+            The encoded Guild
+
+        Notes
+        -----
+        Members are stored separately by caches,
+        so ``guild.members`` should not be encoded.
+        """
+        raise NotImplementedError
+
+    def decode_guild(self, data: bytes) -> Guild:
+        """
+        Rebuild a Guild from the output of :py:meth:`encode_guild`
+
+        Parameters
+        ----------
+        data : bytes
+            The encoded Guild
+
+        Returns
+        -------
+        Guild
+            The Guild, without any members populated
+        """
+        raise NotImplementedError
+
+    def encode_member(self, member: Member) -> bytes:
+        """
+        Serialize a Member, including its messages.
+
+        Parameters
+        ----------
+        member : Member
+            The Member to serialize
+
+        Returns
+        -------
+        bytes
+            The encoded Member
+        """
+        raise NotImplementedError
+
+    def decode_member(self, data: bytes) -> Member:
+        """
+        Rebuild a Member from the output of :py:meth:`encode_member`
+
+        Parameters
+        ----------
+        data : bytes
+            The encoded Member
+
+        Returns
+        -------
+        Member
+            The Member with messages populated
+
+        Raises
+        ------
+        ValueError
+            The data was encoded with an unsupported schema version
+        """
+        raise NotImplementedError
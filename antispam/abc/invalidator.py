@@ -0,0 +1,73 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from typing import Awaitable, Callable, Optional, Protocol, runtime_checkable
+
+InvalidationCallback = Callable[[int, Optional[int]], Awaitable[None]]
+
+
+@runtime_checkable
+class Invalidator(Protocol):
+    """
+    A generic Protocol for telling other processes
+    that cached data has changed.
+
+    Used by :py:class:`antispam.caches.TieredCache` so that
+    several processes can each keep data in memory
+    while sharing a single backend.
+    """
+
+    async def start(self, callback: InvalidationCallback) -> None:
+        """
+        Start listening for invalidations from other processes.
+
+        Parameters
+        ----------
+        callback : Callable[[int, Optional[int]], Awaitable[None]]
+            Called with the guild id, and member id if only
+            a single member changed, for each invalidation
+            published by another process.
+
+        Notes
+        -----
+        Invalidations published by this process
+        should not be passed to ``callback``
+        """
+        raise NotImplementedError
+
+    async def publish(self, guild_id: int, member_id: Optional[int] = None) -> None:
+        """
+        Tell other processes that data has changed.
+
+        Parameters
+        ----------
+        guild_id : int
+            The guild which changed
+        member_id : Optional[int]
+            The member which changed, if the
+            change was limited to a single member
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Stop listening for invalidations."""
+        raise NotImplementedError
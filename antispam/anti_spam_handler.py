@@ -32,6 +32,7 @@ from antispam.base_plugin import BasePlugin
 from antispam.caches import MemoryCache
 from antispam.core import Core
 from antispam.dataclasses import CorePayload, Guild, Options
+from antispam.dataclasses.propagate_data import PropagateData
 from antispam.deprecation import mark_deprecated
 from antispam.enums import IgnoreType, Library, ResetType
 from antispam.exceptions import (
@@ -43,7 +44,13 @@ from antispam.exceptions import (
     PropagateFailure,
     UnsupportedAction,
 )
+from antispam.expiry import ExpiryScheduler
 from antispam.factory import FactoryBuilder
+from antispam.sweeper import (
+    is_guild_configured,
+    should_keep_guild,
+    should_keep_member,
+)
 from antispam.util import get_aware_time
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -132,6 +139,7 @@ class AntiSpamHandler:
         self.bot = bot
         self.cache = cache
         self.core = Core(self)
+        self.expiry: ExpiryScheduler = ExpiryScheduler(self)
 
         self.needs_init = True
 
@@ -236,6 +244,13 @@ class AntiSpamHandler:
             propagate_data.guild_id,
         )
 
+        async with self.cache.pipeline(propagate_data.guild_id):
+            return await self._propagate(message, propagate_data)
+
+    async def _propagate(
+        self, message, propagate_data: PropagateData
+    ) -> Optional[Union[CorePayload, dict]]:
+        """The body of propagate, run within a cache pipeline"""
         try:
             guild = await self.cache.get_guild(guild_id=propagate_data.guild_id)
         except GuildNotFound:
@@ -918,7 +933,8 @@ class AntiSpamHandler:
         # Drop the previous cache
         # Insert the new list of 'still valid' entries, this is now the cache
 
-        # Ideally I don't want to load this cache into memory
+        # Ideally I don't want to load this cache into memory,
+        # see CacheSweeper for an incremental alternative
         cache = []
         async for guild in self.cache.get_all_guilds():
             new_guild = Guild(guild.id)
@@ -927,30 +943,16 @@ class AntiSpamHandler:
                     member, get_aware_time(), self.options
                 )
 
-                if strict and len(member.messages) != 0:
-                    new_guild.members[member.id] = member
-                elif (
-                    len(member.messages) != 0
-                    or member.kick_count != 0
-                    or member.warn_count != 0
-                    or member.duplicate_counter != 1
-                    or bool(member.duplicate_channel_counter_dict)
-                    or bool(member.addons)
-                ):
+                if should_keep_member(member, strict):
                     new_guild.members[member.id] = member
 
             # Clean guild
-            predicate = (
-                guild.options != self.options
-                or guild.log_channel_id is not None
-                or bool(new_guild.members)
-            )
-            if strict and predicate:
-                new_guild.options = guild.options
-                new_guild.log_channel_id = guild.log_channel_id
-                cache.append(new_guild)
-            elif predicate or bool(guild.addons):
-                new_guild.addons = guild.addons
+            if should_keep_guild(guild, bool(new_guild.members), self, strict):
+                if not strict or not is_guild_configured(
+                    guild, bool(new_guild.members), self
+                ):
+                    new_guild.addons = guild.addons
+
                 new_guild.options = guild.options
                 new_guild.log_channel_id = guild.log_channel_id
                 cache.append(new_guild)
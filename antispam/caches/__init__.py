@@ -20,4 +20,6 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
+from antispam.caches.instrumented import InstrumentedCache
 from antispam.caches.memory import MemoryCache
+from antispam.caches.tiered import TieredCache
@@ -0,0 +1,91 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import datetime
+from typing import Dict, List, cast
+
+from attr import asdict
+
+from antispam.abc import Codec
+from antispam.dataclasses import Guild, Member, Message, Options
+
+
+class JsonCodec(Codec):
+    """
+    The original orjson backed codec.
+
+    Everything is stored as a JSON document built with
+    ``attr.asdict``, this is the most readable format
+    but also the most expensive to encode and decode.
+
+    This codec requires:
+
+    - orjson
+    """
+
+    def __init__(self):
+        # Import here to avoid errors when not
+        # having the optional dependency installed
+        import orjson
+
+        self._json = orjson
+
+    def encode_guild(self, guild: Guild) -> bytes:
+        as_dict = asdict(
+            guild, recurse=True, filter=lambda attribute, _: attribute.name != "members"
+        )
+        as_dict["members"] = {}
+        return self._json.dumps(as_dict)
+
+    def decode_guild(self, data: bytes) -> Guild:
+        guild: Guild = Guild(**self._json.loads(data))
+        # This is actually a dict here
+        guild.options = cast(dict, guild.options)
+        guild.options = Options(**guild.options)
+        guild.members = {}
+        return guild
+
+    def encode_member(self, member: Member) -> bytes:
+        return self._json.dumps(
+            asdict(member, recurse=True), option=self._json.OPT_NON_STR_KEYS
+        )
+
+    def decode_member(self, data: bytes) -> Member:
+        member: Member = Member(**self._json.loads(data))
+
+        # JSON object keys are always strings
+        member.duplicate_channel_counter_dict = cast(
+            Dict[int, int],
+            {int(k): v for k, v in member.duplicate_channel_counter_dict.items()},
+        )
+
+        messages: List[Message] = []
+        member.messages = cast(list, member.messages)
+        for message in member.messages:
+            message = Message(**message)
+            message.creation_time = datetime.datetime.fromisoformat(
+                message.creation_time  # type: ignore
+            )
+            messages.append(message)
+
+        member.messages = messages
+        return member
@@ -0,0 +1,209 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from typing import Any, Callable, Dict, List
+
+import attr
+
+from antispam.abc import Codec
+from antispam.dataclasses import Guild, Member, Message, Options
+from antispam.util import from_timestamp, to_timestamp
+
+
+class MsgPackCodec(Codec):
+    """
+    A compact binary codec built on msgpack.
+
+    Dataclasses are stored as positional arrays rather
+    then keyed documents, timestamps are stored as integer
+    microseconds and only non default ``Options`` are kept.
+
+    Every payload starts with a schema version which allows
+    for older payloads to be upgraded when read. Payloads
+    written by :py:class:`antispam.caches.codecs.JsonCodec`
+    are also understood, so existing data can be read
+    while it is gradually rewritten in this format.
+
+    This codec requires:
+
+    - msgpack
+    - orjson, only to read data written by ``JsonCodec``
+    """
+
+    SCHEMA_VERSION: int = 1
+
+    # version -> callable upgrading a payload from that version to the next
+    _guild_upgrades: Dict[int, Callable[[List[Any]], List[Any]]] = {}
+    _member_upgrades: Dict[int, Callable[[List[Any]], List[Any]]] = {}
+
+    def __init__(self):
+        # Import here to avoid errors when not
+        # having the optional dependency installed
+        import msgpack
+
+        self._msgpack = msgpack
+        self._default_options: Options = Options()
+        self._json_codec = None
+
+    def encode_guild(self, guild: Guild) -> bytes:
+        return self._pack(
+            [
+                self.SCHEMA_VERSION,
+                guild.id,
+                self._encode_options(guild.options),
+                guild.log_channel_id,
+                guild.addons,
+            ]
+        )
+
+    def decode_guild(self, data: bytes) -> Guild:
+        if self._is_json(data):
+            return self._get_json_codec().decode_guild(data)
+
+        payload = self._upgrade(self._unpack(data), self._guild_upgrades)
+        _, guild_id, options, log_channel_id, addons = payload
+        return Guild(
+            id=guild_id,
+            options=Options(**options),
+            log_channel_id=log_channel_id,
+            addons=addons,
+        )
+
+    def encode_member(self, member: Member) -> bytes:
+        return self._pack(
+            [
+                self.SCHEMA_VERSION,
+                member.id,
+                member.guild_id,
+                member.warn_count,
+                member.kick_count,
+                member.times_timed_out,
+                member.duplicate_counter,
+                member.duplicate_channel_counter_dict,
+                member.internal_is_in_guild,
+                [
+                    [
+                        message.id,
+                        message.channel_id,
+                        message.content,
+                        to_timestamp(message.creation_time),
+                        message.is_duplicate,
+                    ]
+                    for message in member.messages
+                ],
+                member.addons,
+            ]
+        )
+
+    def decode_member(self, data: bytes) -> Member:
+        if self._is_json(data):
+            return self._get_json_codec().decode_member(data)
+
+        payload = self._upgrade(self._unpack(data), self._member_upgrades)
+        (
+            _,
+            member_id,
+            guild_id,
+            warn_count,
+            kick_count,
+            times_timed_out,
+            duplicate_counter,
+            duplicate_channel_counter_dict,
+            internal_is_in_guild,
+            messages,
+            addons,
+        ) = payload
+        return Member(
+            id=member_id,
+            guild_id=guild_id,
+            warn_count=warn_count,
+            kick_count=kick_count,
+            times_timed_out=times_timed_out,
+            duplicate_counter=duplicate_counter,
+            duplicate_channel_counter_dict=duplicate_channel_counter_dict,
+            internal_is_in_guild=internal_is_in_guild,
+            messages=[
+                Message(
+                    id=message_id,
+                    channel_id=channel_id,
+                    guild_id=guild_id,
+                    author_id=member_id,
+                    content=content,
+                    creation_time=from_timestamp(creation_time),
+                    is_duplicate=is_duplicate,
+                )
+                for message_id, channel_id, content, creation_time, is_duplicate in messages
+            ],
+            addons=addons,
+        )
+
+    def _encode_options(self, options: Options) -> Dict[str, Any]:
+        """Only store the options which differ from the defaults"""
+        changed: Dict[str, Any] = {}
+        for field in attr.fields(Options):
+            value = getattr(options, field.name)
+            if value == getattr(self._default_options, field.name):
+                continue
+
+            if isinstance(value, set):
+                value = list(value)
+
+            changed[field.name] = value
+
+        return changed
+
+    def _upgrade(
+        self,
+        payload: List[Any],
+        upgrades: Dict[int, Callable[[List[Any]], List[Any]]],
+    ) -> List[Any]:
+        version: int = payload[0]
+        if version > self.SCHEMA_VERSION:
+            raise ValueError(
+                f"Cannot decode schema version {version}, "
+                f"the latest supported version is {self.SCHEMA_VERSION}"
+            )
+
+        while version < self.SCHEMA_VERSION:
+            payload = upgrades[version](payload)
+            version = payload[0]
+
+        return payload
+
+    def _pack(self, payload: List[Any]) -> bytes:
+        return self._msgpack.packb(payload, use_bin_type=True)
+
+    def _unpack(self, data: bytes) -> List[Any]:
+        return self._msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    @staticmethod
+    def _is_json(data: bytes) -> bool:
+        # A msgpack array never starts with `{`
+        return data[:1] == b"{"
+
+    def _get_json_codec(self):
+        if self._json_codec is None:
+            from antispam.caches.codecs.json_codec import JsonCodec
+
+            self._json_codec = JsonCodec()
+
+        return self._json_codec
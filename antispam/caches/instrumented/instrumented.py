@@ -0,0 +1,400 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import bisect
+import time
+from contextlib import asynccontextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+)
+
+import attr
+
+from antispam.abc import Cache, Codec
+from antispam.caches.memory.memory import approximate_size
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter, ResetType
+
+if TYPE_CHECKING:
+    from antispam import AntiSpamHandler
+
+# Upper bounds in seconds, anything slower
+# falls into one final overflow bucket
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+@attr.s(slots=True)
+class MethodStats:
+    """What an :py:class:`InstrumentedCache` recorded for one method."""
+
+    #: How many times the method was called
+    calls: int = attr.ib(default=0)
+    #: How many of those calls raised an exception
+    errors: int = attr.ib(default=0)
+    #: The total time spent within the method, in seconds
+    total_time: float = attr.ib(default=0.0)
+    #: The slowest call, in seconds
+    max_time: float = attr.ib(default=0.0)
+    #: Call counts per latency bucket, see InstrumentedCache.buckets.
+    #: The final entry counts calls slower than every bucket
+    histogram: List[int] = attr.ib(factory=list)
+    #: The bytes passed to or returned from sampled calls,
+    #: see InstrumentedCache.payload_sample_rate
+    payload_bytes: int = attr.ib(default=0)
+    #: How many calls had their payload measured
+    payload_samples: int = attr.ib(default=0)
+
+    @property
+    def average_time(self) -> float:
+        """The mean time per call, in seconds"""
+        if not self.calls:
+            return 0.0
+
+        return self.total_time / self.calls
+
+    @property
+    def average_payload_bytes(self) -> float:
+        """The mean payload of sampled calls, in bytes"""
+        if not self.payload_samples:
+            return 0.0
+
+        return self.payload_bytes / self.payload_samples
+
+    def copy(self) -> MethodStats:
+        return MethodStats(
+            calls=self.calls,
+            errors=self.errors,
+            total_time=self.total_time,
+            max_time=self.max_time,
+            histogram=list(self.histogram),
+            payload_bytes=self.payload_bytes,
+            payload_samples=self.payload_samples,
+        )
+
+
+class InstrumentedCache(Cache):
+    """
+    Wraps another cache, recording how often each
+    method is called, how long it takes, how often
+    it fails and how much data it moves.
+
+    .. code-block:: python
+        :linenos:
+
+        from antispam.caches import InstrumentedCache, RedisCache
+
+        cache = InstrumentedCache(handler, RedisCache(handler, redis))
+        handler = AntiSpamHandler(bot, cache=cache)
+
+        # Later on
+        stats = cache.snapshot()
+        print(stats["get_guild"].average_time)
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler instance
+    backend: Cache
+        The cache to instrument
+    buckets: Sequence[float]
+        Ascending upper bounds, in seconds,
+        used for each method's latency histogram.
+
+        Defaults to ``DEFAULT_BUCKETS``, 0.5ms through 1s
+    payload_sample_rate: int
+        Measure the payload of one in this many calls to
+        each method, as doing so means walking or encoding it.
+        Set to 1 to measure every call.
+
+        Payloads are measured as the bytes the backend's
+        :py:class:`antispam.abc.Codec` encodes them to, if it
+        has one, otherwise as their approximate size in memory.
+
+        Defaults to 100
+
+    Notes
+    -----
+    For ``get_all_guilds`` and ``get_all_members`` the
+    time spent iterating is recorded, not including
+    time spent by the caller between items.
+    """
+
+    def __init__(
+        self,
+        handler: AntiSpamHandler,
+        backend: Cache,
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        payload_sample_rate: int = 100,
+    ):
+        if list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be in ascending order")
+
+        if payload_sample_rate < 1:
+            raise ValueError("payload_sample_rate must be at least 1")
+
+        self.handler: AntiSpamHandler = handler
+        self.backend: Cache = backend
+        self.buckets: List[float] = list(buckets)
+        self.payload_sample_rate: int = payload_sample_rate
+
+        self._stats: Dict[str, MethodStats] = {}
+
+    def snapshot(self) -> Dict[str, MethodStats]:
+        """
+        Returns a copy of what has been recorded so far.
+
+        Returns
+        -------
+        Dict[str, MethodStats]
+            Stats keyed by method name, methods
+            which were never called are not included
+        """
+        return {name: stats.copy() for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """Forget everything recorded so far."""
+        self._stats = {}
+
+    def _stats_for(self, name: str) -> MethodStats:
+        stats: Optional[MethodStats] = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = MethodStats(
+                histogram=[0] * (len(self.buckets) + 1)
+            )
+
+        return stats
+
+    def _should_sample(self, name: str) -> bool:
+        return self._stats_for(name).calls % self.payload_sample_rate == 0
+
+    def _payload_size(self, value: Any) -> int:
+        """How many bytes a dataclass, or a dict or list of them, is"""
+        if value is None:
+            return 0
+
+        if isinstance(value, dict):
+            return sum(self._payload_size(item) for item in value.values())
+
+        if isinstance(value, list):
+            return sum(self._payload_size(item) for item in value)
+
+        codec: Optional[Codec] = getattr(self.backend, "codec", None)
+        if isinstance(codec, Codec):
+            if isinstance(value, Guild):
+                return len(codec.encode_guild(value))
+
+            if isinstance(value, Member):
+                return len(codec.encode_member(value))
+
+        if isinstance(value, (Guild, Member, Message)):
+            return approximate_size(value)
+
+        return 0
+
+    def _record(
+        self, name: str, duration: float, errored: bool, payload: Optional[int]
+    ) -> None:
+        stats: MethodStats = self._stats_for(name)
+        stats.calls += 1
+        stats.errors += errored
+        stats.total_time += duration
+        stats.max_time = max(stats.max_time, duration)
+        stats.histogram[bisect.bisect_left(self.buckets, duration)] += 1
+        if payload is not None:
+            stats.payload_bytes += payload
+            stats.payload_samples += 1
+
+    async def _call(self, name: str, awaitable: Awaitable, argument: Any = None) -> Any:
+        sampled: bool = self._should_sample(name)
+        start: float = time.perf_counter()
+        try:
+            result = await awaitable
+        except Exception:
+            duration: float = time.perf_counter() - start
+            payload = self._payload_size(argument) if sampled else None
+            self._record(name, duration, True, payload)
+            raise
+
+        duration: float = time.perf_counter() - start
+        payload = (
+            self._payload_size(argument) + self._payload_size(result)
+            if sampled
+            else None
+        )
+        self._record(name, duration, False, payload)
+        return result
+
+    async def _iterate(self, name: str, iterable: AsyncIterable) -> AsyncIterable:
+        sampled: bool = self._should_sample(name)
+        duration: float = 0.0
+        payload: int = 0
+        iterator = iterable.__aiter__()
+        while True:
+            start: float = time.perf_counter()
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                duration += time.perf_counter() - start
+                break
+            except Exception:
+                duration += time.perf_counter() - start
+                self._record(name, duration, True, payload if sampled else None)
+                raise
+
+            duration += time.perf_counter() - start
+            if sampled:
+                payload += self._payload_size(item)
+
+            yield item
+
+        self._record(name, duration, False, payload if sampled else None)
+
+    async def initialize(self, *args, **kwargs) -> None:
+        await self._call("initialize", self.backend.initialize(*args, **kwargs))
+
+    @asynccontextmanager
+    async def pipeline(self, guild_id: int) -> AsyncIterator[None]:
+        async with self.backend.pipeline(guild_id):
+            yield
+
+    async def get_guild(self, guild_id: int) -> Guild:
+        return await self._call("get_guild", self.backend.get_guild(guild_id))
+
+    async def set_guild(self, guild: Guild) -> None:
+        await self._call("set_guild", self.backend.set_guild(guild), guild)
+
+    async def delete_guild(self, guild_id: int) -> None:
+        await self._call("delete_guild", self.backend.delete_guild(guild_id))
+
+    async def get_member(self, member_id: int, guild_id: int) -> Member:
+        return await self._call(
+            "get_member", self.backend.get_member(member_id, guild_id)
+        )
+
+    async def set_member(self, member: Member) -> None:
+        await self._call("set_member", self.backend.set_member(member), member)
+
+    async def delete_member(self, member_id: int, guild_id: int) -> None:
+        await self._call(
+            "delete_member", self.backend.delete_member(member_id, guild_id)
+        )
+
+    async def add_message(self, message: Message) -> None:
+        await self._call("add_message", self.backend.add_message(message), message)
+
+    async def reset_member_count(
+        self, member_id: int, guild_id: int, reset_type: ResetType
+    ) -> None:
+        await self._call(
+            "reset_member_count",
+            self.backend.reset_member_count(member_id, guild_id, reset_type),
+        )
+
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        return await self._call(
+            "increment_member_counter",
+            self.backend.increment_member_counter(member_id, guild_id, counter, amount),
+        )
+
+    async def update_member(
+        self, member_id: int, guild_id: int, fn: Callable[[Member], Any]
+    ) -> Member:
+        return await self._call(
+            "update_member", self.backend.update_member(member_id, guild_id, fn)
+        )
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, Member]:
+        return await self._call(
+            "get_members_many", self.backend.get_members_many(member_ids, guild_id)
+        )
+
+    async def set_members_many(self, members: Iterable[Member]) -> None:
+        members: List[Member] = list(members)
+        await self._call(
+            "set_members_many",
+            self.backend.set_members_many(members),
+            members,
+        )
+
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        await self._call(
+            "delete_members_many",
+            self.backend.delete_members_many(member_ids, guild_id),
+        )
+
+    async def add_messages_many(self, messages: Iterable[Message]) -> None:
+        messages: List[Message] = list(messages)
+        await self._call(
+            "add_messages_many",
+            self.backend.add_messages_many(messages),
+            messages,
+        )
+
+    async def get_all_guilds(self) -> AsyncIterable[Guild]:
+        async for guild in self._iterate(
+            "get_all_guilds", self.backend.get_all_guilds()
+        ):
+            yield guild
+
+    async def get_all_members(self, guild_id: int) -> AsyncIterable[Member]:
+        async for member in self._iterate(
+            "get_all_members", self.backend.get_all_members(guild_id)
+        ):
+            yield member
+
+    async def drop(self) -> None:
+        await self._call("drop", self.backend.drop())
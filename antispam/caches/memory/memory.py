@@ -21,19 +21,103 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 import logging
-from typing import AsyncIterable
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from antispam import dataclasses, exceptions
 from antispam.abc import Cache
-from antispam.enums import ResetType
+from antispam.enums import MemberCounter, ResetType
+from antispam.sweeper import should_keep_member
 
 log = logging.getLogger(__name__)
 
+# Rough per object costs, measured with tracemalloc on CPython 3.11
+_GUILD_BYTES = 1600
+_MEMBER_BYTES = 450
+_MESSAGE_BYTES = 250
+
+
+def approximate_size(
+    value: Union[dataclasses.Guild, dataclasses.Member, dataclasses.Message]
+) -> int:
+    """Roughly how many bytes a dataclass holds in memory, including a guild's members"""
+    if isinstance(value, dataclasses.Message):
+        return _MESSAGE_BYTES + len(value.content)
+
+    if isinstance(value, dataclasses.Member):
+        return _MEMBER_BYTES + sum(
+            _MESSAGE_BYTES + len(message.content) for message in value.messages
+        )
+
+    return _GUILD_BYTES + sum(
+        approximate_size(member) for member in value.members.values()
+    )
+
 
 class MemoryCache(Cache):
-    def __init__(self, handler):
+    """
+    The default cache, storing everything in process.
+
+    By default this grows without bound, setting any limit
+    enables least recently used eviction. Only members which
+    :py:meth:`antispam.AntiSpamHandler.clean_cache` would remove,
+    and have never been timed out, are evicted. Likewise only guilds
+    with no other members, default options and no log channel,
+    so spam tracking and punishment state is never lost.
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler instance
+    max_guilds: Optional[int]
+        The most guilds to keep.
+    max_members_per_guild: Optional[int]
+        The most members to keep within a guild.
+    max_bytes: Optional[int]
+        An approximate memory budget for
+        all guilds, members and messages.
+    """
+
+    def __init__(
+        self,
+        handler,
+        *,
+        max_guilds: Optional[int] = None,
+        max_members_per_guild: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
         self.handler = handler
-        self.cache = {}
+        self.cache: OrderedDict[int, dataclasses.Guild] = OrderedDict()
+
+        self.max_guilds: Optional[int] = max_guilds
+        self.max_members_per_guild: Optional[int] = max_members_per_guild
+        self.max_bytes: Optional[int] = max_bytes
+        self._bounded: bool = any(
+            limit is not None
+            for limit in (max_guilds, max_members_per_guild, max_bytes)
+        )
+
+        # Eviction metrics
+        self.evicted_guilds: int = 0
+        self.evicted_members: int = 0
+
+        # Approximate sizes, only tracked when bounded
+        self.approximate_bytes: int = 0
+        # Keyed by (guild_id, member_id), member_id is None for the guild itself
+        self._sizes: Dict[Tuple[int, Optional[int]], int] = {}
+        # Evictable member ids per guild, least recently used first,
+        # so eviction doesn't rescan members which can't be evicted
+        self._evictable: Dict[int, OrderedDict[int, None]] = {}
+
         log.info("Cache instance ready to roll.")
 
     async def initialize(self, *args, **kwargs) -> None:
@@ -41,18 +125,42 @@ class MemoryCache(Cache):
 
     async def get_guild(self, guild_id: int) -> dataclasses.Guild:
         log.debug("Attempting to return cached Guild(id=%s)", guild_id)
+        return self._get_guild(guild_id)
+
+    def _get_guild(self, guild_id: int) -> dataclasses.Guild:
+        """Used by operations on a single member, which may not need every member"""
         try:
-            return self.cache[guild_id]
+            guild = self.cache[guild_id]
         except KeyError:
             raise exceptions.GuildNotFound from None
 
+        if self._bounded:
+            self.cache.move_to_end(guild_id)
+
+        return guild
+
     async def set_guild(self, guild: dataclasses.Guild) -> None:
         log.debug("Attempting to set Guild(id=%s)", guild.id)
+        if self._bounded:
+            old = self.cache.get(guild.id)
+            if old is not guild:
+                if old is not None:
+                    self._forget_guild(old)
+
+                self.cache[guild.id] = guild
+                self._track_guild(guild)
+
+            self.cache.move_to_end(guild.id)
+            self._enforce_limits(guild)
+            return
+
         self.cache[guild.id] = guild
 
     async def delete_guild(self, guild_id: int) -> None:
         log.debug("Attempting to delete Guild(id=%s)", guild_id)
-        self.cache.pop(guild_id, None)
+        guild = self.cache.pop(guild_id, None)
+        if guild is not None and self._bounded:
+            self._forget_guild(guild)
 
     async def get_member(self, member_id: int, guild_id: int) -> dataclasses.Member:
         log.debug(
@@ -60,13 +168,18 @@ class MemoryCache(Cache):
             member_id,
             guild_id,
         )
-        guild = await self.get_guild(guild_id)
+        guild = self._get_guild(guild_id)
 
         try:
-            return guild.members[member_id]
+            member = guild.members[member_id]
         except KeyError:
             raise exceptions.MemberNotFound from None
 
+        if self._bounded:
+            self._touch_member(guild, member_id)
+
+        return member
+
     async def set_member(self, member: dataclasses.Member) -> None:
         log.debug(
             "Attempting to cache Member(id=%s) for Guild(id=%s)",
@@ -74,19 +187,32 @@ class MemoryCache(Cache):
             member.guild_id,
         )
         try:
-            guild = await self.get_guild(member.guild_id)
+            guild = self._get_guild(member.guild_id)
         except exceptions.GuildNotFound:
             guild = dataclasses.Guild(id=member.guild_id, options=self.handler.options)
 
+        if not self._bounded:
+            guild.members[member.id] = member
+            await self.set_guild(guild)
+            return
+
+        # Re-inserting marks it most recently used
+        guild.members.pop(member.id, None)
         guild.members[member.id] = member
-        await self.set_guild(guild)
+        if guild.id not in self.cache:
+            self.cache[guild.id] = guild
+            self._track_guild(guild)
+
+        self.cache.move_to_end(guild.id)
+        self._track_member(member)
+        self._enforce_limits(guild, protect_member=(guild.id, member.id))
 
     async def delete_member(self, member_id: int, guild_id: int) -> None:
         log.debug(
             "Attempting to delete Member(id=%s) in Guild(id=%s)", member_id, guild_id
         )
         try:
-            guild = await self.get_guild(guild_id)
+            guild = self._get_guild(guild_id)
         except exceptions.GuildNotFound:
             return
 
@@ -95,6 +221,9 @@ class MemoryCache(Cache):
         except KeyError:
             return
 
+        if self._bounded:
+            self._forget_member(guild_id, member_id)
+
         await self.set_guild(guild)
 
     async def add_message(self, message: dataclasses.Message) -> None:
@@ -116,7 +245,7 @@ class MemoryCache(Cache):
             await self.set_guild(guild)
 
         except exceptions.MemberNotFound:
-            guild = await self.get_guild(message.guild_id)
+            guild = self._get_guild(message.guild_id)
 
             member = dataclasses.Member(id=message.author_id, guild_id=message.guild_id)
             guild.members[member.id] = member
@@ -149,6 +278,86 @@ class MemoryCache(Cache):
             # This is fine
             return
 
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        log.debug(
+            "Attempting to increment %s on Member(id=%s) in Guild(id=%s) by %s",
+            counter.name,
+            member_id,
+            guild_id,
+            amount,
+        )
+        try:
+            member = await self.get_member(member_id, guild_id)
+        except (exceptions.MemberNotFound, exceptions.GuildNotFound):
+            member = dataclasses.Member(id=member_id, guild_id=guild_id)
+            await self.set_member(member)
+
+        value: int = getattr(member, counter.value) + amount
+        setattr(member, counter.value, value)
+        return value
+
+    async def update_member(
+        self,
+        member_id: int,
+        guild_id: int,
+        fn: Callable[[dataclasses.Member], Any],
+    ) -> dataclasses.Member:
+        log.debug(
+            "Attempting to update Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        try:
+            member = await self.get_member(member_id, guild_id)
+        except (exceptions.MemberNotFound, exceptions.GuildNotFound):
+            member = dataclasses.Member(id=member_id, guild_id=guild_id)
+            await self.set_member(member)
+
+        # Nothing can change it between these calls, so modify it in place
+        fn(member)
+        if self._bounded:
+            self._track_member(member)
+
+        return member
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, dataclasses.Member]:
+        log.debug("Attempting to return cached members for Guild(id=%s)", guild_id)
+        try:
+            guild = self._get_guild(guild_id)
+        except exceptions.GuildNotFound:
+            return {}
+
+        members: Dict[int, dataclasses.Member] = {}
+        for member_id in member_ids:
+            member = guild.members.get(member_id)
+            if member is None:
+                continue
+
+            if self._bounded:
+                self._touch_member(guild, member_id)
+
+            members[member_id] = member
+
+        return members
+
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        log.debug("Attempting to delete members in Guild(id=%s)", guild_id)
+        guild = self.cache.get(guild_id)
+        if guild is None:
+            return
+
+        for member_id in member_ids:
+            if guild.members.pop(member_id, None) is not None and self._bounded:
+                self._forget_member(guild_id, member_id)
+
     async def get_all_members(
         self, guild_id: int
     ) -> AsyncIterable[dataclasses.Member]:  # noqa
@@ -159,9 +368,132 @@ class MemoryCache(Cache):
 
     async def get_all_guilds(self) -> AsyncIterable[dataclasses.Guild]:  # noqa
         log.debug("Yielding all cached guilds")
-        for guild in self.cache.values():
+        # Copied so callers can modify the cache while iterating
+        for guild in list(self.cache.values()):
             yield guild
 
     async def drop(self) -> None:
         log.warning("Cache was just dropped")
-        self.cache = {}
+        self.cache = OrderedDict()
+        self.approximate_bytes = 0
+        self._sizes = {}
+        self._evictable = {}
+
+    def _track_guild(self, guild: dataclasses.Guild) -> None:
+        """Compute the approximate size of a guild and its members."""
+        self.approximate_bytes += _GUILD_BYTES - self._sizes.get((guild.id, None), 0)
+        self._sizes[(guild.id, None)] = _GUILD_BYTES
+        for member in guild.members.values():
+            self._track_member(member)
+
+    def _track_member(self, member: dataclasses.Member) -> None:
+        size: int = approximate_size(member)
+        key = (member.guild_id, member.id)
+        self.approximate_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+        evictable = self._evictable.setdefault(member.guild_id, OrderedDict())
+        if self._is_evictable_member(member):
+            evictable[member.id] = None
+            evictable.move_to_end(member.id)
+        else:
+            evictable.pop(member.id, None)
+
+    def _touch_member(self, guild: dataclasses.Guild, member_id: int) -> None:
+        """Mark a member as most recently used."""
+        # Dicts keep insertion order, so re-inserting moves it to the end
+        guild.members[member_id] = guild.members.pop(member_id)
+        evictable = self._evictable.get(guild.id)
+        if evictable is not None and member_id in evictable:
+            evictable.move_to_end(member_id)
+
+    def _forget_member(self, guild_id: int, member_id: int) -> None:
+        self.approximate_bytes -= self._sizes.pop((guild_id, member_id), 0)
+        evictable = self._evictable.get(guild_id)
+        if evictable is not None:
+            evictable.pop(member_id, None)
+
+    def _forget_guild(self, guild: dataclasses.Guild) -> None:
+        self.approximate_bytes -= self._sizes.pop((guild.id, None), 0)
+        for member_id in guild.members.keys():
+            self._forget_member(guild.id, member_id)
+
+        self._evictable.pop(guild.id, None)
+
+    @staticmethod
+    def _is_evictable_member(member: dataclasses.Member) -> bool:
+        # Timeouts escalate, so their count is kept as well
+        return member.times_timed_out == 0 and not should_keep_member(
+            member, strict=False
+        )
+
+    def _is_evictable_guild(self, guild: dataclasses.Guild) -> bool:
+        return (
+            guild.log_channel_id is None
+            and not guild.addons
+            and guild.options == self.handler.options
+            and all(self._is_evictable_member(m) for m in guild.members.values())
+        )
+
+    def _evict_member(
+        self, guild: dataclasses.Guild, protect: Optional[Tuple[int, int]]
+    ) -> bool:
+        """Evict the least recently used evictable member, if any.
+
+        ``protect`` is a ``(guild_id, member_id)`` pair to never evict.
+        """
+        evictable = self._evictable.get(guild.id)
+        while evictable:
+            member_id: int = next(iter(evictable))
+            if (guild.id, member_id) == protect:
+                # The most recently used, so there is nothing else
+                return False
+
+            evictable.pop(member_id)
+            member = guild.members.get(member_id)
+            if member is None or not self._is_evictable_member(member):
+                # Changed in place since it was last tracked
+                continue
+
+            guild.members.pop(member_id)
+            self._forget_member(guild.id, member_id)
+            self.evicted_members += 1
+            return True
+
+        return False
+
+    def _evict_guild(self, protect: int) -> bool:
+        """Evict the least recently used evictable guild, if any."""
+        for guild in self.cache.values():
+            if guild.id != protect and self._is_evictable_guild(guild):
+                self.cache.pop(guild.id)
+                self._forget_guild(guild)
+                self.evicted_guilds += 1
+                return True
+
+        return False
+
+    def _enforce_limits(
+        self,
+        guild: dataclasses.Guild,
+        protect_member: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Evict least recently used data until within every limit."""
+        if self.max_members_per_guild is not None:
+            while len(guild.members) > self.max_members_per_guild:
+                if not self._evict_member(guild, protect_member):
+                    break
+
+        if self.max_guilds is not None:
+            while len(self.cache) > self.max_guilds:
+                if not self._evict_guild(guild.id):
+                    break
+
+        if self.max_bytes is not None:
+            while self.approximate_bytes > self.max_bytes:
+                # Prefer shrinking other guilds before the active one
+                if not any(
+                    self._evict_member(g, protect_member)
+                    for g in list(self.cache.values())
+                ) and not self._evict_guild(guild.id):
+                    break
@@ -23,10 +23,11 @@ DEALINGS IN THE SOFTWARE.
 # Taken from https://document.koldfusion.xyz with slight modifications.
 import functools
 from copy import deepcopy
-from typing import Any, Dict, List, Optional, Type, TypeVar, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type, TypeVar, Union
 
 from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
-from pymongo.results import DeleteResult
+from pymongo import ReturnDocument
+from pymongo.results import BulkWriteResult, DeleteResult, UpdateResult
 
 T = TypeVar("T")
 
@@ -98,7 +99,9 @@ class Document:
 
     # <-- Pointer Methods -->
     async def find(
-        self, filter_dict: Union[Dict, Any]
+        self,
+        filter_dict: Union[Dict, Any],
+        projection: Optional[Dict[str, Any]] = None,
     ) -> Optional[Union[Dict[str, Any], Type[T]]]:
         """
         Find and return one item.
@@ -108,13 +111,15 @@ class Document:
             The _id of the item to find,
             if a Dict is passed that is
             used as the filter.
+        projection: Optional[Dict[str, Any]]
+            The fields to return
         Returns
         -------
         Optional[Union[Dict[str, Any], Type[T]]]
             The result of the query
         """
         filter_dict = self.__convert_filter(filter_dict)
-        return await self.find_by_custom(filter_dict)
+        return await self.find_by_custom(filter_dict, projection)
 
     async def delete(self, filter_dict: Union[Dict, Any]) -> Optional[DeleteResult]:
         """
@@ -227,7 +232,9 @@ class Document:
 
     @return_converted
     async def find_by_custom(
-        self, filter_dict: Dict[str, Any]
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
     ) -> Optional[Union[Dict[str, Any], Type[T]]]:
         """
         Find and return one item.
@@ -235,6 +242,8 @@ class Document:
         ----------
         filter_dict: Dict[str, Any]
             What to filter/find based on
+        projection: Optional[Dict[str, Any]]
+            The fields to return
         Returns
         -------
         Optional[Union[Dict[str, Any], Type[T]]]
@@ -242,11 +251,13 @@ class Document:
         """
         self.__ensure_dict(filter_dict)
 
-        return await self._document.find_one(filter_dict)
+        return await self._document.find_one(filter_dict, projection)
 
     @return_converted
     async def find_many_by_custom(
-        self, filter_dict: Dict[str, Any]
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Union[Dict[str, Any], Type[T]]]:
         """
         Find and return all items
@@ -255,6 +266,8 @@ class Document:
         ----------
         filter_dict: Dict[str, Any]
             What to filter/find based on
+        projection: Optional[Dict[str, Any]]
+            The fields to return
         Returns
         -------
         List[Union[Dict[str, Any], Type[T]]]
@@ -262,7 +275,37 @@ class Document:
         """
         self.__ensure_dict(filter_dict)
 
-        return await self._document.find(filter_dict).to_list(None)
+        return await self._document.find(filter_dict, projection).to_list(None)
+
+    async def iterate_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Union[Dict[str, Any], Type[T]]]:
+        """
+        Stream all items matching the given
+        filter, only holding one batch
+        in memory at a time.
+        Parameters
+        ----------
+        filter_dict: Dict[str, Any]
+            What to filter/find based on
+        projection: Optional[Dict[str, Any]]
+            The fields to return
+        batch_size: int
+            How many items to fetch per round trip
+        Yields
+        ------
+        Union[Dict[str, Any], Type[T]]
+            Each matching item
+        """
+        self.__ensure_dict(filter_dict)
+
+        cursor = self._document.find(filter_dict, projection, batch_size=batch_size)
+        async for item in cursor:
+            item.pop("_id", None)
+            yield self.converter(**item) if self.converter else item
 
     async def delete_by_id(self, data_id: Any) -> Optional[DeleteResult]:
         """
@@ -525,6 +568,164 @@ class Document:
         self.__ensure_list_of_dicts(data)
         await self._document.insert_many(data)
 
+    async def bulk_write(
+        self, operations: List[Any], ordered: bool = False
+    ) -> Optional[BulkWriteResult]:
+        """
+        Run the given write operations,
+        such as ``ReplaceOne`` or ``DeleteMany``,
+        in as few round trips as possible.
+        Parameters
+        ----------
+        operations: List[Any]
+            The pymongo write operations to run
+        ordered: bool
+            Whether operations must run in order,
+            unordered writes can be parallelized
+            by the server. Defaults to ``False``
+        Returns
+        -------
+        Optional[BulkWriteResult]
+            The result of the writes
+        """
+        if not operations:
+            return None
+
+        return await self._document.bulk_write(operations, ordered=ordered)
+
+    async def create_index(self, keys: List[Tuple[str, int]], **kwargs: Any) -> str:
+        """
+        Create an index if it doesn't already exist.
+        Parameters
+        ----------
+        keys: List[Tuple[str, int]]
+            The (field, direction) pairs to index
+        kwargs: Any
+            Index options such as
+            ``unique`` or ``expireAfterSeconds``
+        Returns
+        -------
+        str
+            The name of the index
+        """
+        return await self._document.create_index(keys, **kwargs)
+
+    async def update_with_operators(
+        self,
+        filter_dict: Dict[str, Any],
+        operators: Dict[str, Dict[str, Any]],
+        upsert: bool = False,
+    ) -> None:
+        """
+        Apply a raw update, such as one
+        combining ``$push`` and ``$inc``,
+        to the first document matching the filter.
+        Parameters
+        ----------
+        filter_dict: Dict[str, Any]
+            The data to filter on
+        operators: Dict[str, Dict[str, Any]]
+            The update operators to apply
+        upsert: bool
+            Insert the document if
+            nothing matches the filter
+        """
+        self.__ensure_dict(filter_dict)
+        self.__ensure_dict(operators)
+
+        await self._document.update_one(filter_dict, operators, upsert=upsert)
+
+    async def find_one_and_update_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        operators: Dict[str, Dict[str, Any]],
+        upsert: bool = False,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Apply a raw update and return
+        the document after it was applied.
+        Parameters
+        ----------
+        filter_dict: Dict[str, Any]
+            The data to filter on
+        operators: Dict[str, Dict[str, Any]]
+            The update operators to apply
+        upsert: bool
+            Insert the document if
+            nothing matches the filter
+        projection: Optional[Dict[str, Any]]
+            The fields to return
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            The updated document, this is
+            never passed to the converter
+        """
+        self.__ensure_dict(filter_dict)
+        self.__ensure_dict(operators)
+
+        return await self._document.find_one_and_update(
+            filter_dict,
+            operators,
+            upsert=upsert,
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def find_raw_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find and return one item as stored.
+        Parameters
+        ----------
+        filter_dict: Dict[str, Any]
+            What to filter/find based on
+        projection: Optional[Dict[str, Any]]
+            The fields to return
+        Returns
+        -------
+        Optional[Dict[str, Any]]
+            The result of the query, this
+            is never passed to the converter
+        """
+        self.__ensure_dict(filter_dict)
+
+        return await self._document.find_one(filter_dict, projection)
+
+    async def replace_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        data: Dict[str, Any],
+        upsert: bool = False,
+    ) -> bool:
+        """
+        Replace the first document matching the filter.
+        Parameters
+        ----------
+        filter_dict: Dict[str, Any]
+            The data to filter on
+        data: Dict[str, Any]
+            The document to replace it with
+        upsert: bool
+            Insert the document if
+            nothing matches the filter
+        Returns
+        -------
+        bool
+            Whether a document was replaced or inserted
+        """
+        self.__ensure_dict(filter_dict)
+        self.__ensure_dict(data)
+
+        result: UpdateResult = await self._document.replace_one(
+            filter_dict, data, upsert=upsert
+        )
+        return bool(result.matched_count) or result.upserted_id is not None
+
     # <-- Private methods -->
     @staticmethod
     def __ensure_list_of_dicts(data: List[Dict]):
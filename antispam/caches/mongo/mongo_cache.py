@@ -20,20 +20,34 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
-import asyncio
+import datetime
 import logging
 from copy import deepcopy
-from typing import TYPE_CHECKING, AsyncIterable, Dict, List
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import pytz
 from attr import asdict
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DeleteMany, ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 from antispam import Options
 from antispam.abc import Cache
 from antispam.caches.mongo.document import Document
 from antispam.dataclasses import Guild, Member, Message
-from antispam.enums import ResetType
+from antispam.enums import MemberCounter, ResetType
 from antispam.exceptions import GuildNotFound, MemberNotFound
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -41,6 +55,12 @@ if TYPE_CHECKING:  # pragma: no cover
 
 log = logging.getLogger(__name__)
 
+# Guild documents never store members, updated_at only exists
+# to drive the optional TTL index and version changes on every
+# member write so update_member can detect concurrent writes
+_GUILD_PROJECTION = {"members": False}
+_MEMBER_PROJECTION = {"updated_at": False, "version": False}
+
 
 class MongoCache(Cache):
     """
@@ -56,11 +76,32 @@ class MongoCache(Cache):
         The optional name of your collection.
 
         Defaults to antispam
+    member_ttl: Optional[datetime.timedelta]
+        If set, members which have not been
+        written to within this period are
+        removed by MongoDB using a TTL index.
+
+        Defaults to None
+    batch_size: int
+        How many documents are fetched per
+        round trip when iterating the cache.
+
+        Defaults to 1000
     """
 
-    def __init__(self, handler, connection_url, database_name=None):
+    def __init__(
+        self,
+        handler,
+        connection_url,
+        database_name=None,
+        *,
+        member_ttl: Optional[datetime.timedelta] = None,
+        batch_size: int = 1000,
+    ):
         self.handler: "AntiSpamHandler" = handler
         self.database_name = database_name or "antispam"
+        self.member_ttl: Optional[datetime.timedelta] = member_ttl
+        self.batch_size: int = batch_size
 
         self.__mongo = AsyncIOMotorClient(connection_url)
         self.db = self.__mongo[self.database_name]
@@ -70,9 +111,23 @@ class MongoCache(Cache):
 
         log.info("Cache instance ready to roll.")
 
+    async def initialize(self, *args, **kwargs) -> None:
+        """Creates the indexes every lookup relies on."""
+        # Also serves queries on guild_id alone
+        await self.members.create_index(
+            [("guild_id", ASCENDING), ("id", ASCENDING)], unique=True
+        )
+        await self.guilds.create_index([("id", ASCENDING)], unique=True)
+
+        if self.member_ttl is not None:
+            await self.members.create_index(
+                [("updated_at", ASCENDING)],
+                expireAfterSeconds=int(self.member_ttl.total_seconds()),
+            )
+
     async def get_guild(self, guild_id: int) -> Guild:
         log.debug("Attempting to return cached Guild(id=%s)", guild_id)
-        guild: Guild = await self.guilds.find({"id": guild_id})
+        guild: Guild = await self.guilds.find({"id": guild_id}, _GUILD_PROJECTION)
 
         # This is a dict here actually
         if not guild:
@@ -80,17 +135,10 @@ class MongoCache(Cache):
 
         guild.options = Options(**guild.options)  # type: ignore
         members: List[Member] = await self.members.find_many_by_custom(
-            {"guild_id": guild_id}
+            {"guild_id": guild_id}, _MEMBER_PROJECTION
         )
         for member in members:
-            messages: List[Message] = []
-            for dict_message in member.messages:
-                dict_message: dict = dict_message
-                msg = Message(**dict_message)
-                msg.creation_time = msg.creation_time.replace(tzinfo=pytz.UTC)
-                messages.append(msg)
-            member.messages = messages
-            guild.members[member.id] = member
+            guild.members[member.id] = self._convert_messages(member)
 
         return guild
 
@@ -98,14 +146,25 @@ class MongoCache(Cache):
         log.debug("Attempting to set Guild(id=%s)", guild.id)
         guild = deepcopy(guild)
 
-        await self._delete_members_for_guild(guild.id)
-
         # Since self.members exists
         members: List[Member] = list(guild.members.values())
         guild.members = {}
 
-        iters = [self.set_member(m) for m in members]
-        await asyncio.gather(*iters)
+        # Replace every member we have and delete any others
+        # for this guild, these never overlap so can run unordered
+        stamp: Dict = self._write_stamp()
+        operations: list = [
+            ReplaceOne(
+                {"id": member.id, "guild_id": guild.id},
+                {**asdict(member, recurse=True), **stamp},
+                upsert=True,
+            )
+            for member in members
+        ]
+        operations.append(
+            DeleteMany({"guild_id": guild.id, "id": {"$nin": [m.id for m in members]}})
+        )
+        await self.members.bulk_write(operations, ordered=False)
         await self.guilds.upsert({"id": guild.id}, asdict(guild, recurse=True))
 
     async def delete_guild(self, guild_id: int) -> None:
@@ -120,20 +179,12 @@ class MongoCache(Cache):
             guild_id,
         )
         member: Member = await self.members.find(
-            {"id": member_id, "guild_id": guild_id}
+            {"id": member_id, "guild_id": guild_id}, _MEMBER_PROJECTION
         )
         if not member:
             raise MemberNotFound
 
-        messages: List[Message] = []
-        for dict_message in member.messages:
-            dict_message: dict = dict_message
-            msg = Message(**dict_message)
-            msg.creation_time = msg.creation_time.replace(tzinfo=pytz.UTC)
-            messages.append(msg)
-        member.messages = messages
-
-        return member
+        return self._convert_messages(member)
 
     async def set_member(self, member: Member) -> None:
         log.debug(
@@ -141,10 +192,10 @@ class MongoCache(Cache):
             member.id,
             member.guild_id,
         )
-        if not await self._guild_exists(member.guild_id):
-            await self.set_guild(Guild(member.guild_id, options=self.handler.options))
+        await self._ensure_guild(member.guild_id)
 
         member_dict: Dict = asdict(member, recurse=True)
+        member_dict.update(self._write_stamp())
         await self.members.upsert_custom(
             {"id": member.id, "guild_id": member.guild_id}, member_dict
         )
@@ -162,14 +213,18 @@ class MongoCache(Cache):
             message.author_id,
             message.guild_id,
         )
-        member: Member = await self.members.find(
-            {"id": message.author_id, "guild_id": message.guild_id}
+        options: Dict = await self._ensure_guild(message.guild_id)
+        await self.members.update_with_operators(
+            {"id": message.author_id, "guild_id": message.guild_id},
+            {
+                "$push": self._push_messages([asdict(message, recurse=True)], options),
+                "$set": self._write_stamp(),
+                "$setOnInsert": self._member_defaults(
+                    message.author_id, message.guild_id, "messages"
+                ),
+            },
+            upsert=True,
         )
-        if not member:
-            member = Member(message.author_id, guild_id=message.guild_id)
-
-        member.messages.append(message)
-        await self.set_member(member)
 
     async def reset_member_count(
         self, member_id: int, guild_id: int, reset_type: ResetType
@@ -180,32 +235,187 @@ class MongoCache(Cache):
             guild_id,
             reset_type.name,
         )
-        member: Member = await self.members.find(
-            {"id": member_id, "guild_id": guild_id}
-        )
-        if not member:
-            return None
-
         if reset_type == ResetType.KICK_COUNTER:
-            member.kick_count = 0
+            field = MemberCounter.KICK_COUNTER.value
         else:
-            member.warn_count = 0
+            field = MemberCounter.WARN_COUNTER.value
+
+        await self.members.update_with_operators(
+            {"id": member_id, "guild_id": guild_id},
+            {"$set": {field: 0, **self._write_stamp()}},
+        )
+
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        log.debug(
+            "Attempting to increment %s on Member(id=%s) in Guild(id=%s) by %s",
+            counter.name,
+            member_id,
+            guild_id,
+            amount,
+        )
+        await self._ensure_guild(guild_id)
+        member: Dict = await self.members.find_one_and_update_by_custom(
+            {"id": member_id, "guild_id": guild_id},
+            {
+                "$inc": {counter.value: amount},
+                "$set": self._write_stamp(),
+                "$setOnInsert": self._member_defaults(
+                    member_id, guild_id, counter.value
+                ),
+            },
+            upsert=True,
+            projection={counter.value: True},
+        )
+        return member[counter.value]
+
+    async def update_member(
+        self, member_id: int, guild_id: int, fn: Callable[[Member], Any]
+    ) -> Member:
+        """
+        Replaces the member only if its version is unchanged
+        since it was read, retrying whenever it has changed.
+        """
+        log.debug(
+            "Attempting to update Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        member_filter: Dict = {"id": member_id, "guild_id": guild_id}
+        while True:
+            member_dict: Optional[Dict] = await self.members.find_raw_by_custom(
+                member_filter, {"_id": False, "updated_at": False}
+            )
+            if member_dict is None:
+                await self._ensure_guild(guild_id)
+                version = None
+                member: Member = Member(id=member_id, guild_id=guild_id)
+            else:
+                # Missing for members written before versions existed
+                version = member_dict.pop("version", None)
+                member: Member = self._convert_messages(Member(**member_dict))
+
+            fn(member)
+
+            try:
+                replaced: bool = await self.members.replace_by_custom(
+                    {**member_filter, "version": version},
+                    {**asdict(member, recurse=True), **self._write_stamp()},
+                    upsert=version is None,
+                )
+            except DuplicateKeyError:
+                # Another write created this member first
+                replaced = False
+
+            if replaced:
+                return member
+
+            log.debug(
+                "Member(id=%s) in Guild(id=%s) changed during an update, retrying",
+                member_id,
+                guild_id,
+            )
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, Member]:
+        log.debug("Attempting to return cached members for Guild(id=%s)", guild_id)
+        members: List[Member] = await self.members.find_many_by_custom(
+            {"guild_id": guild_id, "id": {"$in": list(member_ids)}},
+            _MEMBER_PROJECTION,
+        )
+        return {member.id: self._convert_messages(member) for member in members}
+
+    async def set_members_many(self, members: Iterable[Member]) -> None:
+        members: List[Member] = list(members)
+        log.debug("Attempting to cache %s members", len(members))
+        if not members:
+            return
+
+        await self._ensure_guilds({member.guild_id for member in members})
+
+        stamp: Dict = self._write_stamp()
+        await self.members.bulk_write(
+            [
+                ReplaceOne(
+                    {"id": member.id, "guild_id": member.guild_id},
+                    {**asdict(member, recurse=True), **stamp},
+                    upsert=True,
+                )
+                for member in members
+            ],
+            ordered=False,
+        )
 
-        await self.set_member(member)
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        log.debug("Attempting to delete members in Guild(id=%s)", guild_id)
+        await self.members.delete(
+            {"guild_id": guild_id, "id": {"$in": list(member_ids)}}
+        )
+
+    async def add_messages_many(self, messages: Iterable[Message]) -> None:
+        messages: List[Message] = list(messages)
+        log.debug("Attempting to add %s messages", len(messages))
+        if not messages:
+            return
+
+        guild_ids: Set[int] = {message.guild_id for message in messages}
+        await self._ensure_guilds(guild_ids)
+        options: Dict[int, Dict] = await self._guild_options(guild_ids)
+
+        # One push per author keeps their messages in order
+        authored: Dict[Tuple[int, int], List[Dict]] = {}
+        for message in messages:
+            authored.setdefault((message.guild_id, message.author_id), []).append(
+                asdict(message, recurse=True)
+            )
+
+        stamp: Dict = self._write_stamp()
+        await self.members.bulk_write(
+            [
+                UpdateOne(
+                    {"id": member_id, "guild_id": guild_id},
+                    {
+                        "$push": self._push_messages(message_dicts, options[guild_id]),
+                        "$set": stamp,
+                        "$setOnInsert": self._member_defaults(
+                            member_id, guild_id, "messages"
+                        ),
+                    },
+                    upsert=True,
+                )
+                for (guild_id, member_id), message_dicts in authored.items()
+            ],
+            ordered=False,
+        )
 
     async def get_all_members(self, guild_id: int) -> AsyncIterable[Member]:
         log.debug("Yielding all cached members for Guild(id=%s)", guild_id)
         if not await self._guild_exists(guild_id):
             raise GuildNotFound
 
-        members = await self.members.find_many_by_custom({"guild_id": guild_id})
-        for member in members:
-            yield member
+        async for member in self.members.iterate_by_custom(
+            {"guild_id": guild_id}, _MEMBER_PROJECTION, self.batch_size
+        ):
+            yield self._convert_messages(member)
 
     async def get_all_guilds(self) -> AsyncIterable[Guild]:
         log.debug("Yielding all cached guilds")
-        guilds = await self.guilds.get_all()
-        for guild in guilds:
+        # Only one guild and its members are held in memory at a time
+        async for guild in self.guilds.iterate_by_custom(
+            {}, _GUILD_PROJECTION, self.batch_size
+        ):
+            guild.options = Options(**guild.options)  # type: ignore
+            async for member in self.members.iterate_by_custom(
+                {"guild_id": guild.id}, _MEMBER_PROJECTION, self.batch_size
+            ):
+                guild.members[member.id] = self._convert_messages(member)
+
             yield guild
 
     async def drop(self) -> None:
@@ -215,8 +425,96 @@ class MongoCache(Cache):
 
     async def _guild_exists(self, guild_id: int) -> True:
         """A guild existence check"""
-        r_1 = await self.guilds.find({"id": guild_id})
+        r_1 = await self.guilds.find({"id": guild_id}, {"id": True})
         return bool(r_1)
 
-    async def _delete_members_for_guild(self, guild_id: int):
-        await self.members.delete({"guild_id": guild_id})
+    @staticmethod
+    def _convert_messages(member: Member) -> Member:
+        """Messages come back from Mongo as naive dicts"""
+        messages: List[Message] = []
+        for dict_message in member.messages:
+            dict_message: dict = dict_message
+            msg = Message(**dict_message)
+            msg.creation_time = msg.creation_time.replace(tzinfo=pytz.UTC)
+            messages.append(msg)
+        member.messages = messages
+
+        return member
+
+    async def _ensure_guild(self, guild_id: int) -> Dict:
+        """
+        Create the guild if it doesn't exist, without reading
+        it first, returning the options it has either way
+        """
+        guild: Guild = Guild(guild_id, options=self.handler.options)
+        document: Dict = await self.guilds.find_one_and_update_by_custom(
+            {"id": guild_id},
+            {"$setOnInsert": asdict(guild, recurse=True)},
+            upsert=True,
+            projection={"options": True},
+        )
+        return document["options"]
+
+    async def _ensure_guilds(self, guild_ids: Iterable[int]) -> None:
+        """Create any of these guilds which don't exist, in one round trip"""
+        await self.guilds.bulk_write(
+            [
+                UpdateOne(
+                    {"id": guild_id},
+                    {
+                        "$setOnInsert": asdict(
+                            Guild(guild_id, options=self.handler.options),
+                            recurse=True,
+                        )
+                    },
+                    upsert=True,
+                )
+                for guild_id in guild_ids
+            ],
+            ordered=False,
+        )
+
+    async def _guild_options(self, guild_ids: Iterable[int]) -> Dict[int, Dict]:
+        """The stored options of each of these guilds, in one round trip"""
+        guilds: List[Guild] = await self.guilds.find_many_by_custom(
+            {"id": {"$in": list(guild_ids)}}, {"id": True, "options": True}
+        )
+        return {guild.id: guild.options for guild in guilds}
+
+    @staticmethod
+    def _push_messages(message_dicts: List[Dict], options: Dict) -> Dict:
+        """
+        A $push of messages which keeps no more of them than
+        the handler would when capping the member, as members
+        are otherwise only trimmed when Core next updates them
+        """
+        push: Dict = {"$each": message_dicts}
+        if options.get("max_messages_per_member") is not None:
+            # Core always keeps the newest message_duplicate_count
+            push["$slice"] = -max(
+                options["max_messages_per_member"],
+                options["message_duplicate_count"],
+            )
+
+        return {"messages": push}
+
+    @staticmethod
+    def _write_stamp() -> Dict:
+        """The fields every member write sets"""
+        return {
+            "updated_at": datetime.datetime.now(datetime.timezone.utc),
+            "version": ObjectId(),
+        }
+
+    @staticmethod
+    def _member_defaults(member_id: int, guild_id: int, *exclude: str) -> Dict:
+        """
+        The fields a new member document starts with, excluding
+        the filter fields and those being updated as Mongo
+        rejects an update touching the same field twice.
+        """
+        member_dict: Dict = asdict(Member(member_id, guild_id), recurse=True)
+        for field in ("id", "guild_id", *exclude):
+            member_dict.pop(field)
+
+        return member_dict
@@ -21,3 +21,4 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 from antispam.caches.redis.redis import RedisCache
+from antispam.caches.redis.invalidation import RedisInvalidator
@@ -0,0 +1,116 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from typing import TYPE_CHECKING, Optional
+
+from antispam.abc import Invalidator
+from antispam.abc.invalidator import InvalidationCallback
+
+if TYPE_CHECKING:
+    from redis import asyncio as aioredis
+
+log = logging.getLogger(__name__)
+
+
+class RedisInvalidator(Invalidator):
+    """
+    Publishes and receives invalidations over Redis pub/sub.
+
+    Invalidating the same guild or member twice is harmless,
+    so messages are applied in whatever order they arrive
+    and duplicate deliveries need no special handling.
+
+    Parameters
+    ----------
+    redis: redis.asyncio.Redis
+        Your redis connection instance.
+    channel: str
+        The pub/sub channel shared by every process.
+
+        Defaults to ``antispam:invalidate``
+    """
+
+    def __init__(self, redis: aioredis.Redis, channel: str = "antispam:invalidate"):
+        self.redis: aioredis.Redis = redis
+        self.channel: str = channel
+        self.node_id: str = uuid.uuid4().hex
+
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, callback: InvalidationCallback) -> None:
+        if self._task is not None:
+            return
+
+        self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        self._task = asyncio.create_task(self._listen(callback))
+
+    async def publish(self, guild_id: int, member_id: Optional[int] = None) -> None:
+        await self.redis.publish(
+            self.channel, f"{self.node_id}:{guild_id}:{member_id or ''}"
+        )
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+            self._task = None
+
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            # aclose only exists on redis 5.0.1 onwards
+            close = getattr(self._pubsub, "aclose", self._pubsub.reset)
+            await close()
+            self._pubsub = None
+
+    async def _listen(self, callback: InvalidationCallback) -> None:
+        async for message in self._pubsub.listen():
+            if message["type"] != "message":
+                continue
+
+            try:
+                await self._handle(message["data"], callback)
+            except Exception:
+                log.exception("Failed to handle invalidation %s", message["data"])
+
+    async def _handle(self, data: bytes, callback: InvalidationCallback) -> None:
+        parts = data.decode("utf-8").split(":")
+        if len(parts) != 3:
+            raise ValueError(f"Malformed invalidation message {data!r}")
+
+        node_id, guild_id, member_id = parts
+        if node_id == self.node_id:
+            return
+
+        guild_id = int(guild_id)
+        log.debug("Received invalidation for Guild(id=%s)", guild_id)
+        await callback(guild_id, int(member_id) if member_id else None)
@@ -0,0 +1,298 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from redis import asyncio as aioredis
+    from redis.asyncio.client import Pipeline
+
+
+def _to_bytes(value: Any) -> bytes:
+    """Mirror how redis stores values"""
+    if isinstance(value, bytes):
+        return value
+
+    if isinstance(value, str):
+        return value.encode("utf-8")
+
+    return str(value).encode("utf-8")
+
+
+class PipelinedRedis:
+    """
+    Stands in for a redis connection while a
+    :py:meth:`antispam.caches.redis.RedisCache.pipeline`
+    scope is open.
+
+    Every key belonging to the scoped guild is read up front,
+    reads for those keys are then served locally while writes
+    are applied locally and buffered into a single MULTI/EXEC
+    pipeline. Keys outside the scope go straight to redis.
+
+    Member keys are watched before they are read, so a
+    read-modify-write served from the snapshot can be written with
+    :py:meth:`flush_guarded`, which fails if another process wrote
+    to the guild's members since. Otherwise, or for members which
+    did not exist yet, ``RedisCache`` flushes the scope, runs them
+    against redis and records the result with :py:meth:`remember_hash`.
+
+    This only implements the commands ``RedisCache`` uses.
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        guild_key: str,
+        member_pattern: str,
+    ):
+        self.redis: aioredis.Redis = redis
+        self.guild_key: str = guild_key
+        self.member_pattern: str = member_pattern
+        self.member_prefix: str = member_pattern.rstrip("*")
+
+        # key -> bytes for strings, Dict[bytes, bytes] for hashes
+        self._snapshot: Dict[str, Any] = {}
+        self._writes: List[Tuple[str, tuple, dict]] = []
+
+        # Holds the connection the watched keys belong to
+        self._watch: Optional[Pipeline] = None
+        self._watched: Set[str] = set()
+
+    def _owns(self, key: str) -> bool:
+        return key == self.guild_key or key.startswith(self.member_prefix)
+
+    async def prefetch(self) -> None:
+        """Read every key for this guild, this costs at most three round trips."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(self.guild_key)
+            pipe.keys(self.member_pattern)
+            guild, member_keys = await pipe.execute()
+
+        if guild is not None:
+            self._snapshot[self.guild_key] = guild
+
+        if not member_keys:
+            return
+
+        keys: List[str] = [key.decode("utf-8") for key in member_keys]
+        self._watch = self.redis.pipeline(transaction=True)
+        await self._watch.watch(*keys)
+        self._watched.update(keys)
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+
+            for key, value in zip(keys, await pipe.execute()):
+                if value:
+                    self._snapshot[key] = value
+
+    async def flush(self) -> None:
+        """Write everything buffered within one MULTI/EXEC"""
+        if not self._writes:
+            return
+
+        writes, self._writes = self._writes, []
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for name, args, kwargs in writes:
+                getattr(pipe, name)(*args, **kwargs)
+
+            await pipe.execute()
+
+    def is_watched(self, key: str) -> bool:
+        """Whether a write depending on the snapshot of key can be guarded"""
+        return key in self._watched
+
+    def take_watch(self) -> Optional[Pipeline]:
+        """
+        Hand over the connection watching this guild's members,
+        so the keys are no longer watched once it is next used.
+        """
+        pipe, self._watch = self._watch, None
+        self._watched.clear()
+        return pipe
+
+    async def flush_guarded(self, writes: List[Tuple[str, tuple, dict]]) -> bool:
+        """
+        Write everything buffered along with ``writes`` within one
+        MULTI/EXEC, which only succeeds if no watched key has changed.
+
+        Returns ``False`` if one had, in which case only
+        what was buffered is written. Keys are no longer
+        watched afterwards either way.
+        """
+        from redis.exceptions import WatchError
+
+        pipe: Pipeline = self.take_watch()
+        buffered, self._writes = self._writes, []
+        try:
+            pipe.multi()
+            for name, args, kwargs in buffered + writes:
+                getattr(pipe, name)(*args, **kwargs)
+
+            await pipe.execute()
+            return True
+        except WatchError:
+            self._writes = buffered
+            await self.flush()
+            return False
+        finally:
+            await pipe.reset()
+
+    async def close(self) -> None:
+        """Stop watching keys, releasing the connection used to"""
+        pipe: Optional[Pipeline] = self.take_watch()
+        if pipe is not None:
+            await pipe.reset()
+
+    def remember(self, key: str, value, nx: bool = False) -> None:
+        """Record a value written to redis outside of this scope"""
+        if not self._owns(key) or (nx and key in self._snapshot):
+            return
+
+        self._snapshot[key] = _to_bytes(value)
+
+    def remember_hash(self, key: str, mapping: Dict[Any, Any]) -> None:
+        """Record hash fields written to redis outside of this scope"""
+        if not self._owns(key):
+            return
+
+        entry: Dict[bytes, bytes] = self._snapshot.setdefault(key, {})
+        for k, v in mapping.items():
+            entry[_to_bytes(k)] = _to_bytes(v)
+
+    def pipeline(self, transaction: bool = True) -> _PipelinedRedisPipeline:
+        return _PipelinedRedisPipeline(self)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not self._owns(key):
+            return await self.redis.get(key)
+
+        value = self._snapshot.get(key)
+        return value if isinstance(value, bytes) else None
+
+    async def set(self, key: str, value, nx: bool = False) -> Optional[bool]:
+        if not self._owns(key):
+            return await self.redis.set(key, value, nx=nx)
+
+        if nx and key in self._snapshot:
+            return None
+
+        self._snapshot[key] = _to_bytes(value)
+        self._writes.append(("set", (key, value), {"nx": nx}))
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        if not all(self._owns(key) for key in keys):
+            return await self.redis.delete(*keys)
+
+        self._writes.append(("delete", keys, {}))
+        return sum(self._snapshot.pop(key, None) is not None for key in keys)
+
+    async def exists(self, key: str) -> int:
+        if not self._owns(key):
+            return await self.redis.exists(key)
+
+        return int(key in self._snapshot)
+
+    async def keys(self, pattern: str) -> List[bytes]:
+        if pattern != self.member_pattern:
+            return await self.redis.keys(pattern)
+
+        return [
+            key.encode("utf-8")
+            for key in self._snapshot.keys()
+            if key.startswith(self.member_prefix)
+        ]
+
+    async def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        if not self._owns(key):
+            return await self.redis.hgetall(key)
+
+        return dict(self._snapshot.get(key, {}))
+
+    async def hset(self, key: str, field=None, value=None, mapping=None) -> int:
+        if not self._owns(key):
+            return await self.redis.hset(key, field, value, mapping=mapping)
+
+        entry: Dict[bytes, bytes] = self._snapshot.setdefault(key, {})
+        if field is not None:
+            entry[_to_bytes(field)] = _to_bytes(value)
+
+        for k, v in (mapping or {}).items():
+            entry[_to_bytes(k)] = _to_bytes(v)
+
+        self._writes.append(("hset", (key, field, value), {"mapping": mapping}))
+        return 0
+
+    async def hsetnx(self, key: str, field, value) -> int:
+        if not self._owns(key):
+            return await self.redis.hsetnx(key, field, value)
+
+        entry: Dict[bytes, bytes] = self._snapshot.setdefault(key, {})
+        if _to_bytes(field) in entry:
+            return 0
+
+        entry[_to_bytes(field)] = _to_bytes(value)
+        self._writes.append(("hsetnx", (key, field, value), {}))
+        return 1
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        if not self._owns(key):
+            return await self.redis.hincrby(key, field, amount)
+
+        entry: Dict[bytes, bytes] = self._snapshot.setdefault(key, {})
+        value: int = int(entry.get(_to_bytes(field), 0)) + amount
+        entry[_to_bytes(field)] = _to_bytes(value)
+        self._writes.append(("hincrby", (key, field, amount), {}))
+        return value
+
+
+class _PipelinedRedisPipeline:
+    """Queues commands against a PipelinedRedis"""
+
+    def __init__(self, redis: PipelinedRedis):
+        self._redis: PipelinedRedis = redis
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> _PipelinedRedisPipeline:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self._commands = []
+
+    def __getattr__(self, item: str):
+        def queue(*args, **kwargs):
+            self._commands.append((item, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        return [
+            await getattr(self._redis, name)(*args, **kwargs)
+            for name, args, kwargs in commands
+        ]
@@ -23,19 +23,30 @@ DEALINGS IN THE SOFTWARE.
 from __future__ import annotations
 
 import asyncio
-import datetime
 import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from copy import deepcopy
-from typing import TYPE_CHECKING, List, AsyncIterable, Dict, cast
-
-from attr import asdict
-
-import orjson as json
-
-from antispam.abc import Cache
-from antispam.enums import ResetType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    List,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from antispam.abc import Cache, Codec
+from antispam.caches.codecs import JsonCodec
+from antispam.caches.redis.pipeline import PipelinedRedis
+from antispam.enums import MemberCounter, ResetType
 from antispam.exceptions import GuildNotFound, MemberNotFound
-from antispam.dataclasses import Message, Member, Guild, Options
+from antispam.dataclasses import Message, Member, Guild
 
 if TYPE_CHECKING:
     from redis import asyncio as aioredis
@@ -44,34 +55,114 @@ if TYPE_CHECKING:
 
 log = logging.getLogger(__name__)
 
+# Counters are stored as their own hash fields so
+# they can be modified in place with HINCRBY
+_COUNTER_FIELDS = tuple(counter.value for counter in MemberCounter)
+
+# The pipeline scope is per task so concurrent
+# propagate calls never share buffered state
+_pipeline_scope: ContextVar[Optional[PipelinedRedis]] = ContextVar(
+    "antispam_redis_pipeline_scope", default=None
+)
+
 
 class RedisCache(Cache):
     """
     A cache backend built to use Redis.
 
+    Members are stored as a hash, where ``data`` contains the
+    encoded Member and each :py:class:`antispam.enums.MemberCounter`
+    has its own field so it can be modified atomically.
+
+    Adding messages never writes back the counters it read, so
+    increments made meanwhile by other processes are kept. Setting
+    a member overwrites them, as the member given is the source of truth.
+
     Parameters
     ----------
     handler: AntiSpamHandler
         The AntiSpamHandler instance
     redis: redis.asyncio.Redis
         Your redis connection instance.
+    codec: Optional[Codec]
+        The :py:class:`antispam.abc.Codec` used to
+        serialize guilds and members.
+
+        Defaults to :py:class:`antispam.caches.codecs.JsonCodec`
+    hash_tags: bool
+        If True, the guild id within each key is wrapped in a
+        hash tag, I.e. ``GUILD:{1}`` and ``MEMBER:{1}:2``.
+
+        This places all of a guild's data within the same
+        Redis Cluster slot. Use :py:meth:`RedisCache.migrate_keys`
+        to move existing data over to this layout.
+
+        Defaults to False
     """
 
-    def __init__(self, handler: AntiSpamHandler, redis: aioredis.Redis):
+    def __init__(
+        self,
+        handler: AntiSpamHandler,
+        redis: aioredis.Redis,
+        *,
+        codec: Optional[Codec] = None,
+        hash_tags: bool = False,
+    ):
         self.redis: aioredis.Redis = redis
         self.handler: AntiSpamHandler = handler
+        self.codec: Codec = codec or JsonCodec()
+        self.hash_tags: bool = hash_tags
+
+    @property
+    def _redis(self) -> Union[aioredis.Redis, PipelinedRedis]:
+        """The connection to use, taking any open pipeline scope into account"""
+        scope: Optional[PipelinedRedis] = _pipeline_scope.get()
+        if scope is not None and scope.redis is self.redis:
+            return scope
+
+        return self.redis
+
+    @asynccontextmanager
+    async def pipeline(self, guild_id: int) -> AsyncIterator[None]:
+        """
+        Read everything for this guild up front, serve reads
+        locally and flush all writes in one MULTI/EXEC on exit.
+
+        This turns a propagate into four round trips, three to
+        read and watch the guild and its members and one to write.
+        A member's first message takes two more, as there
+        was nothing to watch for them beforehand.
+
+        Nested scopes, or operations on other guilds
+        while a scope is open, are passed through to redis.
+        """
+        if _pipeline_scope.get() is not None:
+            yield
+            return
+
+        scope = PipelinedRedis(
+            self.redis,
+            guild_key=self._guild_key(guild_id),
+            member_pattern=self._member_key(guild_id, "*"),
+        )
+        try:
+            await scope.prefetch()
+            token = _pipeline_scope.set(scope)
+            try:
+                yield
+            finally:
+                _pipeline_scope.reset(token)
+                await scope.flush()
+        finally:
+            await scope.close()
 
     async def get_guild(self, guild_id: int) -> Guild:
         log.debug("Attempting to return cached Guild(id=%s)", guild_id)
-        resp = await self.redis.get(f"GUILD:{guild_id}")
+        resp = await self._redis.get(self._guild_key(guild_id))
         if not resp:
             raise GuildNotFound
 
-        as_json = json.loads(resp.decode("utf-8"))
-        guild: Guild = Guild(**as_json)
-        # This is actually a dict here
-        guild.options = cast(dict, guild.options)
-        guild.options = Options(**guild.options)
+        guild: Guild = self.codec.decode_guild(resp)
 
         guild_members: Dict[int, Member] = {}
         async for member in self.get_all_members(guild_id):
@@ -92,13 +183,12 @@ class RedisCache(Cache):
         iters = [self.set_member(m) for m in members]
         await asyncio.gather(*iters)
 
-        as_json = json.dumps(asdict(guild, recurse=True))
-        await self.redis.set(f"GUILD:{guild.id}", as_json)
+        await self._redis.set(self._guild_key(guild.id), self.codec.encode_guild(guild))
 
     async def delete_guild(self, guild_id: int) -> None:
         log.debug("Attempting to delete Guild(id=%s)", guild_id)
         await self._delete_members_for_guild(guild_id)
-        await self.redis.delete(f"GUILD:{guild_id}")
+        await self._redis.delete(self._guild_key(guild_id))
 
     async def get_member(self, member_id: int, guild_id: int) -> Member:
         log.debug(
@@ -106,24 +196,11 @@ class RedisCache(Cache):
             member_id,
             guild_id,
         )
-        resp = await self.redis.get(f"MEMBER:{guild_id}:{member_id}")
+        resp = await self._redis.hgetall(self._member_key(guild_id, member_id))
         if not resp:
             raise MemberNotFound
 
-        as_json = json.loads(resp.decode("utf-8"))
-        member: Member = Member(**as_json)
-
-        messages: List[Message] = []
-        member.messages = cast(list, member.messages)
-        for message in member.messages:
-            message = Message(**message)
-            message.creation_time = datetime.datetime.fromisoformat(
-                message.creation_time  # type: ignore
-            )
-            messages.append(message)
-
-        member.messages = messages
-        return member
+        return self._decode_member(resp, member_id, guild_id)
 
     async def set_member(self, member: Member) -> None:
         log.debug(
@@ -133,18 +210,20 @@ class RedisCache(Cache):
         )
         if not await self._does_guild_exist(member.guild_id):
             guild = Guild(id=member.guild_id, options=self.handler.options)
-            guild.members = {}
-            guild_as_json = json.dumps(asdict(guild, recurse=True))
-            await self.redis.set(f"GUILD:{guild.id}", guild_as_json)
+            await self._redis.set(
+                self._guild_key(guild.id), self.codec.encode_guild(guild)
+            )
 
-        as_json = json.dumps(asdict(member, recurse=True))
-        await self.redis.set(f"MEMBER:{member.guild_id}:{member.id}", as_json)
+        await self._redis.hset(
+            self._member_key(member.guild_id, member.id),
+            mapping=self._encode_member(member),
+        )
 
     async def delete_member(self, member_id: int, guild_id: int) -> None:
         log.debug(
             "Attempting to delete Member(id=%s) in Guild(id=%s)", member_id, guild_id
         )
-        await self.redis.delete(f"MEMBER:{guild_id}:{member_id}")
+        await self._redis.delete(self._member_key(guild_id, member_id))
 
     async def add_message(self, message: Message) -> None:
         log.debug(
@@ -153,13 +232,12 @@ class RedisCache(Cache):
             message.author_id,
             message.guild_id,
         )
-        try:
-            member: Member = await self.get_member(message.author_id, message.guild_id)
-        except (MemberNotFound, GuildNotFound):
-            member: Member = Member(message.author_id, guild_id=message.guild_id)
-
-        member.messages.append(message)
-        await self.set_member(member)
+        # Writing back what was read could undo a concurrent HINCRBY
+        await self.update_member(
+            message.author_id,
+            message.guild_id,
+            lambda member: member.messages.append(message),
+        )
 
     async def reset_member_count(
         self, member_id: int, guild_id: int, reset_type: ResetType
@@ -170,17 +248,225 @@ class RedisCache(Cache):
             guild_id,
             reset_type.name,
         )
-        try:
-            member: Member = await self.get_member(member_id, guild_id)
-        except (MemberNotFound, GuildNotFound):
+        key: str = self._member_key(guild_id, member_id)
+        if not await self._redis.exists(key):
             return
 
         if reset_type == ResetType.KICK_COUNTER:
-            member.kick_count = 0
+            field = MemberCounter.KICK_COUNTER.value
         else:
-            member.warn_count = 0
+            field = MemberCounter.WARN_COUNTER.value
+
+        await self._redis.hset(key, field, 0)
+
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        log.debug(
+            "Attempting to increment %s on Member(id=%s) in Guild(id=%s) by %s",
+            counter.name,
+            member_id,
+            guild_id,
+            amount,
+        )
+        scope: Optional[PipelinedRedis] = await self._flush_scope()
+        key: str = self._member_key(guild_id, member_id)
+        guild_data: bytes = self.codec.encode_guild(
+            Guild(id=guild_id, options=self.handler.options)
+        )
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._guild_key(guild_id), guild_data, nx=True)
+            pipe.hincrby(key, counter.value, amount)
+            _, value = await pipe.execute()
+
+        if scope is not None:
+            scope.remember(self._guild_key(guild_id), guild_data, nx=True)
+            scope.remember_hash(key, {counter.value: value})
+
+        return int(value)
+
+    async def update_member(
+        self, member_id: int, guild_id: int, fn: Callable[[Member], Any]
+    ) -> Member:
+        """
+        Uses WATCH and MULTI/EXEC, retrying whenever
+        the member changes before the write lands.
+
+        Within a :py:meth:`RedisCache.pipeline` scope the member is
+        read from the scope, which watched it before reading, and
+        written along with anything buffered in one MULTI/EXEC.
+        If anything changed since, or the member was not watched,
+        this falls back to running the transaction against redis.
+        """
+        log.debug(
+            "Attempting to update Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        from redis.exceptions import WatchError
+
+        key: str = self._member_key(guild_id, member_id)
+        guild_key: str = self._guild_key(guild_id)
+        guild_data: bytes = self.codec.encode_guild(
+            Guild(id=guild_id, options=self.handler.options)
+        )
+
+        watched = self._redis
+        if isinstance(watched, PipelinedRedis) and watched.is_watched(key):
+            member: Member = self._decode_member(
+                await watched.hgetall(key), member_id, guild_id
+            )
+            fn(member)
+
+            mapping = self._encode_member(member)
+            if await watched.flush_guarded(
+                [
+                    ("set", (guild_key, guild_data), {"nx": True}),
+                    ("hset", (key,), {"mapping": mapping}),
+                ]
+            ):
+                watched.remember(guild_key, guild_data, nx=True)
+                watched.remember_hash(key, mapping)
+                return member
+
+            log.debug(
+                "Member(id=%s) in Guild(id=%s) changed since it was read, retrying",
+                member_id,
+                guild_id,
+            )
+
+        scope: Optional[PipelinedRedis] = await self._flush_scope()
+        # Reusing the scope's connection saves it unwatching on exit
+        pipe = scope.take_watch() if scope is not None else None
+        if pipe is None:
+            pipe = self.redis.pipeline(transaction=True)
+
+        async with pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    resp: Dict[bytes, bytes] = await pipe.hgetall(key)
+                    if resp:
+                        member = self._decode_member(resp, member_id, guild_id)
+                    else:
+                        member = Member(id=member_id, guild_id=guild_id)
+
+                    fn(member)
+
+                    mapping = self._encode_member(member)
+                    pipe.multi()
+                    pipe.set(guild_key, guild_data, nx=True)
+                    pipe.hset(key, mapping=mapping)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    log.debug(
+                        "Member(id=%s) in Guild(id=%s) changed during an update, retrying",
+                        member_id,
+                        guild_id,
+                    )
+
+        if scope is not None:
+            scope.remember(guild_key, guild_data, nx=True)
+            scope.remember_hash(key, mapping)
+
+        return member
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, Member]:
+        member_ids: List[int] = list(member_ids)
+        log.debug(
+            "Attempting to return %s cached members for Guild(id=%s)",
+            len(member_ids),
+            guild_id,
+        )
+        if not member_ids:
+            return {}
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for member_id in member_ids:
+                pipe.hgetall(self._member_key(guild_id, member_id))
+
+            resps: List[Dict[bytes, bytes]] = await pipe.execute()
 
-        await self.set_member(member)
+        return {
+            member_id: self._decode_member(resp, member_id, guild_id)
+            for member_id, resp in zip(member_ids, resps)
+            if resp
+        }
+
+    async def set_members_many(self, members: Iterable[Member]) -> None:
+        members: List[Member] = list(members)
+        log.debug("Attempting to cache %s members", len(members))
+        if not members:
+            return
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for guild_id in {member.guild_id for member in members}:
+                guild = Guild(id=guild_id, options=self.handler.options)
+                pipe.set(
+                    self._guild_key(guild_id), self.codec.encode_guild(guild), nx=True
+                )
+
+            for member in members:
+                pipe.hset(
+                    self._member_key(member.guild_id, member.id),
+                    mapping=self._encode_member(member),
+                )
+
+            await pipe.execute()
+
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        keys: List[str] = [
+            self._member_key(guild_id, member_id) for member_id in member_ids
+        ]
+        log.debug(
+            "Attempting to delete %s members in Guild(id=%s)", len(keys), guild_id
+        )
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def add_messages_many(self, messages: Iterable[Message]) -> None:
+        messages: List[Message] = list(messages)
+        log.debug("Attempting to add %s messages", len(messages))
+        if not messages:
+            return
+
+        # Read every author once, in order of first appearance
+        keys: List[Tuple[int, int]] = list(
+            dict.fromkeys((message.guild_id, message.author_id) for message in messages)
+        )
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for guild_id, member_id in keys:
+                pipe.hgetall(self._member_key(guild_id, member_id))
+
+            resps: List[Dict[bytes, bytes]] = await pipe.execute()
+
+        authors: Dict[Tuple[int, int], Member] = {
+            (guild_id, member_id): self._decode_member(resp, member_id, guild_id)
+            if resp
+            else Member(member_id, guild_id=guild_id)
+            for (guild_id, member_id), resp in zip(keys, resps)
+        }
+        for message in messages:
+            authors[(message.guild_id, message.author_id)].messages.append(message)
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for guild_id in {guild_id for guild_id, _ in keys}:
+                guild = Guild(id=guild_id, options=self.handler.options)
+                pipe.set(
+                    self._guild_key(guild_id), self.codec.encode_guild(guild), nx=True
+                )
+
+            for member in authors.values():
+                self._queue_add_messages(pipe, member)
+
+            await pipe.execute()
 
     async def drop(self) -> None:
         log.warning("Cache was just dropped")
@@ -189,10 +475,15 @@ class RedisCache(Cache):
 
     async def get_all_guilds(self) -> AsyncIterable[Guild]:
         log.debug("Yielding all cached guilds")
-        keys: List[bytes] = await self.redis.keys("GUILD:*")
+        keys: List[bytes] = await self._redis.keys("GUILD:*")
         for key in keys:
-            key = key.decode("utf-8").split(":")[1]
-            yield await self.get_guild(int(key))
+            key = key.decode("utf-8")
+            guild_id: int = self._key_ids(key)[0]
+            if key != self._guild_key(guild_id):
+                # Left behind in the other key layout
+                continue
+
+            yield await self.get_guild(guild_id)
 
     async def get_all_members(self, guild_id: int) -> AsyncIterable[Member]:
         log.debug("Yielding all cached members for Guild(id=%s)", guild_id)
@@ -204,15 +495,151 @@ class RedisCache(Cache):
 
     async def _get_all_members(self, guild_id: int) -> AsyncIterable[Member]:
         """This exists so we don't need to raise GuildNotFound when used internally."""
-        keys: List[bytes] = await self.redis.keys(f"MEMBER:{guild_id}:*")
-        for key in keys:
-            key = key.decode("utf-8").split(":")[2]
-            yield await self.get_member(int(key), guild_id)
+        keys: List[str] = [
+            key.decode("utf-8")
+            for key in await self._redis.keys(self._member_key(guild_id, "*"))
+        ]
+        if not keys:
+            return
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+
+            resps: List[Dict[bytes, bytes]] = await pipe.execute()
+
+        for key, resp in zip(keys, resps):
+            if not resp:
+                continue
+
+            yield self._decode_member(resp, self._key_ids(key)[1], guild_id)
+
+    async def migrate_keys(self) -> int:
+        """
+        Move any guilds and members stored within the other key
+        layout, or members stored as a plain value rather
+        than a hash, over to the layout this cache uses.
+
+        This is safe to run more than once.
+
+        Returns
+        -------
+        int
+            How many keys were migrated
+        """
+        migrated: int = 0
+        for key in await self.redis.keys("GUILD:*"):
+            key = key.decode("utf-8")
+            new_key: str = self._guild_key(self._key_ids(key)[0])
+            if key == new_key:
+                continue
+
+            value: Optional[bytes] = await self.redis.get(key)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(new_key, value)
+                pipe.delete(key)
+                await pipe.execute()
+
+            migrated += 1
+
+        for key in await self.redis.keys("MEMBER:*"):
+            key = key.decode("utf-8")
+            guild_id, member_id = self._key_ids(key)
+            new_key: str = self._member_key(guild_id, member_id)
+            key_type: bytes = await self.redis.type(key)
+            if key == new_key and key_type == b"hash":
+                continue
+
+            if key_type == b"hash":
+                mapping = await self.redis.hgetall(key)
+            else:
+                # Members used to be stored as a single encoded value
+                member: Member = self.codec.decode_member(await self.redis.get(key))
+                mapping = self._encode_member(member)
+
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(key)
+                pipe.hset(new_key, mapping=mapping)
+                await pipe.execute()
+
+            migrated += 1
+
+        log.info("Migrated %s keys to the current key layout", migrated)
+        return migrated
+
+    def _guild_key(self, guild_id: int) -> str:
+        if self.hash_tags:
+            return f"GUILD:{{{guild_id}}}"
+
+        return f"GUILD:{guild_id}"
+
+    def _member_key(self, guild_id: int, member_id: Union[int, str]) -> str:
+        if self.hash_tags:
+            return f"MEMBER:{{{guild_id}}}:{member_id}"
+
+        return f"MEMBER:{guild_id}:{member_id}"
+
+    @staticmethod
+    def _key_ids(key: str) -> List[int]:
+        """The ids within a key, for either key layout"""
+        return [int(part.strip("{}")) for part in key.split(":")[1:]]
+
+    def _encode_member(self, member: Member) -> Dict[str, Union[bytes, int]]:
+        mapping: Dict[str, Union[bytes, int]] = {
+            "data": self.codec.encode_member(member)
+        }
+        for field in _COUNTER_FIELDS:
+            mapping[field] = getattr(member, field)
+
+        return mapping
+
+    def _queue_add_messages(self, pipe, member: Member) -> None:
+        """
+        Queue writing back a member read without a WATCH, counters are
+        only set when missing so a concurrent HINCRBY is never undone
+        """
+        key: str = self._member_key(member.guild_id, member.id)
+        mapping: Dict[str, Union[bytes, int]] = self._encode_member(member)
+        pipe.hset(key, mapping={"data": mapping.pop("data")})
+        for field, value in mapping.items():
+            pipe.hsetnx(key, field, value)
+
+    def _decode_member(
+        self, resp: Dict[bytes, bytes], member_id: int, guild_id: int
+    ) -> Member:
+        # A member created purely by HINCRBY has no data yet
+        data: Optional[bytes] = resp.get(b"data")
+        if data:
+            member: Member = self.codec.decode_member(data)
+        else:
+            member: Member = Member(id=member_id, guild_id=guild_id)
+
+        # The counter fields are the source of truth
+        for field in _COUNTER_FIELDS:
+            value = resp.get(field.encode("utf-8"))
+            if value is not None:
+                setattr(member, field, int(value))
+
+        return member
+
+    async def _flush_scope(self) -> Optional[PipelinedRedis]:
+        """
+        Write anything buffered within an open pipeline scope,
+        so read-modify-write operations can go straight to redis
+        without being reordered around the scope's writes.
+        """
+        scope = self._redis
+        if not isinstance(scope, PipelinedRedis):
+            return None
+
+        await scope.flush()
+        return scope
 
     async def _does_guild_exist(self, guild_id: int) -> bool:
-        resp = await self.redis.get(f"GUILD:{guild_id}")
+        resp = await self._redis.get(self._guild_key(guild_id))
         return bool(resp)
 
     async def _delete_members_for_guild(self, guild_id: int):
-        async for member in self._get_all_members(guild_id):
-            await self.delete_member(member.id, member.guild_id)
+        keys: List[bytes] = await self._redis.keys(self._member_key(guild_id, "*"))
+        if keys:
+            await self._redis.delete(*[key.decode("utf-8") for key in keys])
@@ -0,0 +1,944 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import sys
+import tempfile
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from attr import asdict
+
+from antispam.abc import Cache
+from antispam.dataclasses import Guild, Member, Message, Options
+from antispam.enums import MemberCounter, ResetType
+from antispam.exceptions import CacheFull, GuildNotFound, MemberNotFound
+from antispam.util import dumps_json, from_timestamp, to_timestamp
+
+if TYPE_CHECKING:
+    from antispam import AntiSpamHandler
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"ASSHM001"
+
+# Slot states, deleted slots keep probe sequences intact
+_EMPTY = 0
+_USED = 1
+_DELETED = 2
+
+# magic, guild capacity, member capacity, messages per member,
+# content size, guild data size, member data size
+_HEADER = struct.Struct("<8s6I")
+# state, id, first member slot, data length
+_GUILD = struct.Struct("<BqiI")
+_GUILD_KEY = struct.Struct("<Bq")
+# state, guild id, id, previous member slot, next member slot,
+# warn count, kick count, times timed out, duplicate counter,
+# is in guild, first message, message count, data length
+_MEMBER = struct.Struct("<Bqqiiiiii?HHI")
+_MEMBER_KEY = struct.Struct("<Bqq")
+# id, channel id, creation time, is duplicate, content length
+_MESSAGE = struct.Struct("<qqq?H")
+_LINK = struct.Struct("<i")
+
+_HEAD_AT = _GUILD_KEY.size
+_PREVIOUS_AT = _MEMBER_KEY.size
+_NEXT_AT = _MEMBER_KEY.size + _LINK.size
+
+# Where each counter sits within the fields of _MEMBER
+_COUNTER_FIELDS: Dict[str, int] = {
+    MemberCounter.WARN_COUNTER.value: 5,
+    MemberCounter.KICK_COUNTER.value: 6,
+    MemberCounter.TIMEOUT_COUNTER.value: 7,
+}
+_FIRST_MESSAGE = 10
+_MESSAGE_COUNT = 11
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+
+# Room for a fingerprint's markers and length along with some tokens
+_MIN_CONTENT_SIZE = 16
+
+
+def _hash(*values: int) -> int:
+    """FNV-1a over 64 bit ids, stable across processes unlike hash()"""
+    result = 0xCBF29CE484222325
+    for value in values:
+        result = ((result ^ (value & _MASK)) * 0x100000001B3) & _MASK
+
+    return result ^ (result >> 29)
+
+
+def _is_tracked() -> bool:
+    """
+    Whether the resource tracker removes shared memory
+    once the process which opened it exits
+    """
+    return sys.version_info < (3, 13) and os.name == "posix"
+
+
+def _open(name: str, *, create: bool = False, size: int = 0) -> SharedMemory:
+    """
+    Open shared memory which outlives the process that created
+    it, it is only removed by :py:meth:`SharedMemoryCache.unlink`
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, create=create, size=size, track=False)
+
+    memory = SharedMemory(name, create=create, size=size)
+    if _is_tracked():
+        from multiprocessing import resource_tracker
+
+        # Other processes may still be using it
+        resource_tracker.unregister(memory._name, "shared_memory")
+
+    return memory
+
+
+def _unlink(memory: SharedMemory) -> None:
+    if _is_tracked():
+        from multiprocessing import resource_tracker
+
+        # Unlinking unregisters it, which the tracker expects to be registered
+        resource_tracker.register(memory._name, "shared_memory")
+
+    memory.unlink()
+
+
+class _FileLock:
+    """An exclusive lock shared by every process opening the same file"""
+
+    def __init__(self, path: str):
+        # Only available on unix, other platforms must provide a lock
+        import fcntl
+
+        self._fcntl = fcntl
+        self._file = open(path, "a+b")
+
+    def __enter__(self) -> None:
+        self._fcntl.flock(self._file.fileno(), self._fcntl.LOCK_EX)
+
+    def __exit__(self, *args) -> None:
+        self._fcntl.flock(self._file.fileno(), self._fcntl.LOCK_UN)
+
+
+class SharedMemoryCache(Cache):
+    """
+    A cache backend stored within shared memory, so every
+    process on a host, such as one per group of shards,
+    shares the same state without a network round trip.
+
+    The shared memory is a fixed layout of two open addressed
+    hash tables, one for guilds and one for members. Member
+    counters are fixed fields modified in place under a
+    lock shared by every process, so incrementing a counter
+    or adding a message is a single write.
+
+    Due to the fixed layout:
+
+    - Each member can have at most ``messages_per_member`` messages.
+      Every guild's :py:attr:`antispam.Options.max_messages_per_member`
+      and :py:attr:`antispam.Options.message_duplicate_count` must be
+      set no higher, so the handler discards messages first.
+    - Only message fingerprints are stored, every guild's
+      :py:attr:`antispam.Options.store_message_content` must
+      be ``False``. Fingerprints are truncated to ``content_size``
+      bytes, they keep the length of the full content so
+      duplicate detection never mistakes a shared prefix for a duplicate.
+    - Guild options and addons, and member addons, are stored
+      as JSON which must fit within ``guild_data_size`` and
+      ``member_data_size`` bytes respectively. They have the same
+      limitations as :py:class:`antispam.caches.codecs.JsonCodec`.
+
+    Every process must be created with the same ``name``
+    and layout parameters. The shared memory stays around
+    after every process exits, call :py:meth:`unlink` to remove it.
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler instance
+    name: str
+        The name of the shared memory, processes
+        using the same name share state.
+
+        Defaults to ``antispam``
+    guild_capacity: int
+        The most guilds which can be stored.
+    member_capacity: int
+        The most members which can be stored, across every guild.
+    messages_per_member: int
+        How many messages to keep per member.
+    content_size: int
+        How many bytes of message content to keep.
+    guild_data_size: int
+        The space for a guild's options and addons.
+    member_data_size: int
+        The space for a member's addons and per channel duplicate counters.
+    lock: Optional[ContextManager]
+        A lock shared by every process, such as a
+        ``multiprocessing.Lock`` given to each process.
+
+        Defaults to locking a file within the temporary
+        directory, which requires a unix platform.
+
+    Raises
+    ------
+    ValueError
+        No lock was provided on a platform
+        without ``fcntl``, the shared memory
+        already exists with a different layout,
+        or the handler's options do not fit the layout.
+    """
+
+    def __init__(
+        self,
+        handler: AntiSpamHandler,
+        name: str = "antispam",
+        *,
+        guild_capacity: int = 1024,
+        member_capacity: int = 16384,
+        messages_per_member: int = 16,
+        content_size: int = 128,
+        guild_data_size: int = 8192,
+        member_data_size: int = 512,
+        lock: Optional[ContextManager] = None,
+    ):
+        self.handler: AntiSpamHandler = handler
+        self.name: str = name
+        self.guild_capacity: int = guild_capacity
+        self.member_capacity: int = member_capacity
+        self.messages_per_member: int = messages_per_member
+        self.content_size: int = content_size
+        self.guild_data_size: int = guild_data_size
+        self.member_data_size: int = member_data_size
+
+        if content_size < _MIN_CONTENT_SIZE:
+            raise ValueError(
+                f"content_size must be at least {_MIN_CONTENT_SIZE} bytes "
+                "to hold a fingerprint"
+            )
+
+        self._check_options(handler.options)
+
+        if lock is None:
+            try:
+                lock = _FileLock(
+                    os.path.join(tempfile.gettempdir(), f"{name}.antispam.lock")
+                )
+            except ImportError:
+                raise ValueError(
+                    "A lock shared by every process is required on this platform"
+                ) from None
+
+        self._lock: ContextManager = lock
+        self._memory: Optional[SharedMemory] = None
+
+        self._guild_size: int = _GUILD.size + guild_data_size
+        self._message_size: int = _MESSAGE.size + content_size
+        self._messages_at: int = _MEMBER.size + member_data_size
+        self._member_size: int = (
+            self._messages_at + messages_per_member * self._message_size
+        )
+        self._guilds_at: int = _HEADER.size
+        self._members_at: int = self._guilds_at + guild_capacity * self._guild_size
+        self.size: int = self._members_at + member_capacity * self._member_size
+
+    async def initialize(self, *args, **kwargs) -> None:
+        """Opens the shared memory, creating it if no other process has."""
+        self._buffer()
+
+    def close(self) -> None:
+        """Detach this process from the shared memory."""
+        if self._memory is not None:
+            self._memory.close()
+            self._memory = None
+
+    def unlink(self) -> None:
+        """Remove the shared memory, once every process has closed it."""
+        self._buffer()
+        _unlink(self._memory)
+
+        self.close()
+
+    def _buffer(self) -> memoryview:
+        if self._memory is not None:
+            return self._memory.buf
+
+        header = (
+            MAGIC,
+            self.guild_capacity,
+            self.member_capacity,
+            self.messages_per_member,
+            self.content_size,
+            self.guild_data_size,
+            self.member_data_size,
+        )
+        with self._lock:
+            try:
+                memory = _open(self.name)
+            except FileNotFoundError:
+                memory = _open(self.name, create=True, size=self.size)
+                _HEADER.pack_into(memory.buf, 0, *header)
+                log.info("Created shared memory %s of %s bytes", self.name, self.size)
+
+        if memory.size < self.size or _HEADER.unpack_from(memory.buf, 0) != header:
+            memory.close()
+            raise ValueError(
+                f"Shared memory {self.name} exists with a different layout"
+            )
+
+        self._memory = memory
+        return memory.buf
+
+    def _check_options(self, options: Options) -> None:
+        """
+        Raise ValueError unless the handler keeps members
+        within the layout when using these options
+        """
+        if options.max_messages_per_member is None or (
+            max(options.max_messages_per_member, options.message_duplicate_count)
+            > self.messages_per_member
+        ):
+            raise ValueError(
+                "Options.max_messages_per_member and "
+                "Options.message_duplicate_count must be set no "
+                f"higher than messages_per_member={self.messages_per_member}"
+            )
+
+        if options.store_message_content:
+            raise ValueError(
+                "Options.store_message_content must be False, "
+                "only message fingerprints are stored"
+            )
+
+    @contextmanager
+    def _locked(self) -> Iterator[memoryview]:
+        buffer = self._buffer()
+        with self._lock:
+            yield buffer
+
+    async def get_guild(self, guild_id: int) -> Guild:
+        log.debug("Attempting to return cached Guild(id=%s)", guild_id)
+        with self._locked() as buffer:
+            index = self._find_guild(buffer, guild_id)[0]
+            if index == -1:
+                raise GuildNotFound
+
+            return self._read_guild(buffer, index)
+
+    async def set_guild(self, guild: Guild) -> None:
+        log.debug("Attempting to set Guild(id=%s)", guild.id)
+        with self._locked() as buffer:
+            index = self._write_guild(buffer, guild)
+            # Replaces any 'old' members
+            self._remove_guild_members(buffer, index)
+            for member in guild.members.values():
+                self._write_member(buffer, member)
+
+    async def delete_guild(self, guild_id: int) -> None:
+        log.debug("Attempting to delete Guild(id=%s)", guild_id)
+        with self._locked() as buffer:
+            index = self._find_guild(buffer, guild_id)[0]
+            if index == -1:
+                return
+
+            self._remove_guild_members(buffer, index)
+            self._release(
+                buffer, self._guilds_at, self._guild_size, self.guild_capacity, index
+            )
+
+    async def get_member(self, member_id: int, guild_id: int) -> Member:
+        log.debug(
+            "Attempting to return a cached Member(id=%s) for Guild(id=%s)",
+            member_id,
+            guild_id,
+        )
+        with self._locked() as buffer:
+            index = self._find_member(buffer, guild_id, member_id)[0]
+            if index != -1:
+                return self._read_member(buffer, index)
+
+            if self._find_guild(buffer, guild_id)[0] == -1:
+                raise GuildNotFound
+
+            raise MemberNotFound
+
+    async def set_member(self, member: Member) -> None:
+        log.debug(
+            "Attempting to cache Member(id=%s) for Guild(id=%s)",
+            member.id,
+            member.guild_id,
+        )
+        with self._locked() as buffer:
+            self._write_member(buffer, member)
+
+    async def delete_member(self, member_id: int, guild_id: int) -> None:
+        log.debug(
+            "Attempting to delete Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        with self._locked() as buffer:
+            index = self._find_member(buffer, guild_id, member_id)[0]
+            if index != -1:
+                self._remove_member(buffer, index)
+
+    async def add_message(self, message: Message) -> None:
+        log.debug(
+            "Attempting to add a Message(id=%s) to Member(id=%s) in Guild(id=%s)",
+            message.id,
+            message.author_id,
+            message.guild_id,
+        )
+        with self._locked() as buffer:
+            self._append_message(buffer, message)
+
+    async def reset_member_count(
+        self, member_id: int, guild_id: int, reset_type: ResetType
+    ) -> None:
+        log.debug(
+            "Attempting to reset counts on Member(id=%s) in Guild(id=%s) with type %s",
+            member_id,
+            guild_id,
+            reset_type.name,
+        )
+        counter: MemberCounter = (
+            MemberCounter.KICK_COUNTER
+            if reset_type == ResetType.KICK_COUNTER
+            else MemberCounter.WARN_COUNTER
+        )
+        with self._locked() as buffer:
+            index = self._find_member(buffer, guild_id, member_id)[0]
+            if index != -1:
+                self._set_counter(buffer, index, counter, lambda _: 0)
+
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        log.debug(
+            "Attempting to increment %s on Member(id=%s) in Guild(id=%s) by %s",
+            counter.name,
+            member_id,
+            guild_id,
+            amount,
+        )
+        with self._locked() as buffer:
+            index = self._member_index(buffer, guild_id, member_id)
+            return self._set_counter(
+                buffer, index, counter, lambda value: value + amount
+            )
+
+    async def update_member(
+        self,
+        member_id: int,
+        guild_id: int,
+        fn: Callable[[Member], Any],
+    ) -> Member:
+        log.debug(
+            "Attempting to update Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        # The lock is held throughout, so fn only ever runs once
+        with self._locked() as buffer:
+            index = self._member_index(buffer, guild_id, member_id)
+            member = self._read_member(buffer, index)
+            fn(member)
+            self._write_member(buffer, member)
+
+        return member
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, Member]:
+        log.debug("Attempting to return cached members for Guild(id=%s)", guild_id)
+        members: Dict[int, Member] = {}
+        with self._locked() as buffer:
+            for member_id in member_ids:
+                index = self._find_member(buffer, guild_id, member_id)[0]
+                if index != -1:
+                    members[member_id] = self._read_member(buffer, index)
+
+        return members
+
+    async def set_members_many(self, members: Iterable[Member]) -> None:
+        log.debug("Attempting to cache many members")
+        with self._locked() as buffer:
+            for member in members:
+                self._write_member(buffer, member)
+
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        log.debug("Attempting to delete members in Guild(id=%s)", guild_id)
+        with self._locked() as buffer:
+            for member_id in member_ids:
+                index = self._find_member(buffer, guild_id, member_id)[0]
+                if index != -1:
+                    self._remove_member(buffer, index)
+
+    async def add_messages_many(self, messages: Iterable[Message]) -> None:
+        log.debug("Attempting to add many messages")
+        with self._locked() as buffer:
+            for message in messages:
+                self._append_message(buffer, message)
+
+    async def get_all_guilds(self) -> AsyncIterable[Guild]:
+        log.debug("Yielding all cached guilds")
+        with self._locked() as buffer:
+            guild_ids: List[int] = []
+            for index in range(self.guild_capacity):
+                state, guild_id = _GUILD_KEY.unpack_from(
+                    buffer, self._guilds_at + index * self._guild_size
+                )
+                if state == _USED:
+                    guild_ids.append(guild_id)
+
+        for guild_id in guild_ids:
+            try:
+                yield await self.get_guild(guild_id)
+            except GuildNotFound:
+                # Deleted by another process since
+                continue
+
+    async def get_all_members(self, guild_id: int) -> AsyncIterable[Member]:
+        log.debug("Yielding all cached members for Guild(id=%s)", guild_id)
+        guild: Guild = await self.get_guild(guild_id)
+        for member in guild.members.values():
+            yield member
+
+    async def drop(self) -> None:
+        log.warning("Cache was just dropped")
+        with self._locked() as buffer:
+            buffer[self._guilds_at : self.size] = bytes(self.size - self._guilds_at)
+
+    def _find(
+        self,
+        buffer: memoryview,
+        key: struct.Struct,
+        table_at: int,
+        slot_size: int,
+        capacity: int,
+        ids: Tuple[int, ...],
+    ) -> Tuple[int, int]:
+        """
+        Linearly probe a table for ids, returning their slot or -1 along
+        with the first free slot which they can be inserted into, or -1
+        """
+        start: int = _hash(*ids) % capacity
+        free: int = -1
+        for step in range(capacity):
+            index: int = (start + step) % capacity
+            state, *slot_ids = key.unpack_from(buffer, table_at + index * slot_size)
+            if state == _EMPTY:
+                return -1, index if free == -1 else free
+
+            if state == _DELETED:
+                if free == -1:
+                    free = index
+
+            elif tuple(slot_ids) == ids:
+                return index, -1
+
+        return -1, free
+
+    @staticmethod
+    def _release(
+        buffer: memoryview, table_at: int, slot_size: int, capacity: int, index: int
+    ) -> None:
+        """Free a slot, emptying trailing deleted slots no probe can pass"""
+        if buffer[table_at + (index + 1) % capacity * slot_size] != _EMPTY:
+            buffer[table_at + index * slot_size] = _DELETED
+            return
+
+        for _ in range(capacity):
+            buffer[table_at + index * slot_size] = _EMPTY
+            index = (index - 1) % capacity
+            if buffer[table_at + index * slot_size] != _DELETED:
+                return
+
+    def _find_guild(self, buffer: memoryview, guild_id: int) -> Tuple[int, int]:
+        return self._find(
+            buffer,
+            _GUILD_KEY,
+            self._guilds_at,
+            self._guild_size,
+            self.guild_capacity,
+            (guild_id,),
+        )
+
+    def _find_member(
+        self, buffer: memoryview, guild_id: int, member_id: int
+    ) -> Tuple[int, int]:
+        return self._find(
+            buffer,
+            _MEMBER_KEY,
+            self._members_at,
+            self._member_size,
+            self.member_capacity,
+            (guild_id, member_id),
+        )
+
+    def _read_guild(self, buffer: memoryview, index: int) -> Guild:
+        offset: int = self._guilds_at + index * self._guild_size
+        _, guild_id, member_index, length = _GUILD.unpack_from(buffer, offset)
+        data: dict = json.loads(
+            bytes(buffer[offset + _GUILD.size : offset + _GUILD.size + length])
+        )
+        guild: Guild = Guild(
+            id=guild_id,
+            options=Options(**data["options"]),
+            log_channel_id=data["log_channel_id"],
+            addons=data["addons"],
+        )
+        while member_index != -1:
+            member: Member = self._read_member(buffer, member_index)
+            guild.members[member.id] = member
+            member_index = _LINK.unpack_from(
+                buffer, self._members_at + member_index * self._member_size + _NEXT_AT
+            )[0]
+
+        return guild
+
+    def _write_guild(self, buffer: memoryview, guild: Guild) -> int:
+        self._check_options(guild.options)
+        data: bytes = dumps_json(
+            {
+                "options": asdict(guild.options),
+                "log_channel_id": guild.log_channel_id,
+                "addons": guild.addons,
+            }
+        ).encode("utf-8")
+        if len(data) > self.guild_data_size:
+            raise ValueError(f"Guild(id={guild.id}) is larger than guild_data_size")
+
+        index, free = self._find_guild(buffer, guild.id)
+        if index == -1:
+            if free == -1:
+                raise CacheFull(f"There is no space left for Guild(id={guild.id})")
+
+            index, head = free, -1
+        else:
+            head = self._guild_head(buffer, index)
+
+        offset: int = self._guilds_at + index * self._guild_size
+        _GUILD.pack_into(buffer, offset, _USED, guild.id, head, len(data))
+        buffer[offset + _GUILD.size : offset + _GUILD.size + len(data)] = data
+        return index
+
+    def _guild_head(self, buffer: memoryview, index: int) -> int:
+        return _LINK.unpack_from(
+            buffer, self._guilds_at + index * self._guild_size + _HEAD_AT
+        )[0]
+
+    def _set_guild_head(self, buffer: memoryview, index: int, head: int) -> None:
+        _LINK.pack_into(
+            buffer, self._guilds_at + index * self._guild_size + _HEAD_AT, head
+        )
+
+    def _remove_guild_members(self, buffer: memoryview, index: int) -> None:
+        member_index: int = self._guild_head(buffer, index)
+        while member_index != -1:
+            next_index: int = _LINK.unpack_from(
+                buffer, self._members_at + member_index * self._member_size + _NEXT_AT
+            )[0]
+            self._release(
+                buffer,
+                self._members_at,
+                self._member_size,
+                self.member_capacity,
+                member_index,
+            )
+            member_index = next_index
+
+        self._set_guild_head(buffer, index, -1)
+
+    def _member_index(self, buffer: memoryview, guild_id: int, member_id: int) -> int:
+        """The slot for a member, creating the member and guild if required"""
+        index, free = self._find_member(buffer, guild_id, member_id)
+        if index != -1:
+            return index
+
+        if free == -1:
+            raise CacheFull(
+                f"There is no space left for Member(id={member_id}) "
+                f"in Guild(id={guild_id})"
+            )
+
+        guild_index: int = self._find_guild(buffer, guild_id)[0]
+        if guild_index == -1:
+            guild_index = self._write_guild(
+                buffer, Guild(id=guild_id, options=self.handler.options)
+            )
+
+        # New members are linked in at the front of their guild
+        head: int = self._guild_head(buffer, guild_index)
+        if head != -1:
+            _LINK.pack_into(
+                buffer, self._members_at + head * self._member_size + _PREVIOUS_AT, free
+            )
+
+        _MEMBER.pack_into(
+            buffer,
+            self._members_at + free * self._member_size,
+            *self._member_fields(
+                Member(id=member_id, guild_id=guild_id), -1, head, 0, 0
+            ),
+        )
+        self._set_guild_head(buffer, guild_index, free)
+        return free
+
+    def _remove_member(self, buffer: memoryview, index: int) -> None:
+        offset: int = self._members_at + index * self._member_size
+        _, guild_id, _ = _MEMBER_KEY.unpack_from(buffer, offset)
+        previous: int = _LINK.unpack_from(buffer, offset + _PREVIOUS_AT)[0]
+        next_index: int = _LINK.unpack_from(buffer, offset + _NEXT_AT)[0]
+
+        if previous == -1:
+            self._set_guild_head(
+                buffer, self._find_guild(buffer, guild_id)[0], next_index
+            )
+        else:
+            _LINK.pack_into(
+                buffer,
+                self._members_at + previous * self._member_size + _NEXT_AT,
+                next_index,
+            )
+
+        if next_index != -1:
+            _LINK.pack_into(
+                buffer,
+                self._members_at + next_index * self._member_size + _PREVIOUS_AT,
+                previous,
+            )
+
+        self._release(
+            buffer, self._members_at, self._member_size, self.member_capacity, index
+        )
+
+    @staticmethod
+    def _member_fields(
+        member: Member, previous: int, next_index: int, messages: int, length: int
+    ) -> Tuple:
+        return (
+            _USED,
+            member.guild_id,
+            member.id,
+            previous,
+            next_index,
+            member.warn_count,
+            member.kick_count,
+            member.times_timed_out,
+            member.duplicate_counter,
+            member.internal_is_in_guild,
+            0,
+            messages,
+            length,
+        )
+
+    def _read_member(self, buffer: memoryview, index: int) -> Member:
+        offset: int = self._members_at + index * self._member_size
+        (
+            _,
+            guild_id,
+            member_id,
+            _,
+            _,
+            warn_count,
+            kick_count,
+            times_timed_out,
+            duplicate_counter,
+            internal_is_in_guild,
+            first,
+            count,
+            length,
+        ) = _MEMBER.unpack_from(buffer, offset)
+        data: dict = (
+            json.loads(
+                bytes(buffer[offset + _MEMBER.size : offset + _MEMBER.size + length])
+            )
+            if length
+            else {}
+        )
+        member: Member = Member(
+            id=member_id,
+            guild_id=guild_id,
+            warn_count=warn_count,
+            kick_count=kick_count,
+            times_timed_out=times_timed_out,
+            duplicate_counter=duplicate_counter,
+            # JSON object keys are always strings
+            duplicate_channel_counter_dict={
+                int(k): v
+                for k, v in data.get("duplicate_channel_counter_dict", {}).items()
+            },
+            internal_is_in_guild=internal_is_in_guild,
+            addons=data.get("addons", {}),
+        )
+        for position in range(count):
+            member.messages.append(
+                self._read_message(
+                    buffer,
+                    offset,
+                    (first + position) % self.messages_per_member,
+                    guild_id,
+                    member_id,
+                )
+            )
+
+        return member
+
+    def _write_member(self, buffer: memoryview, member: Member) -> None:
+        data: bytes = dumps_json(
+            {
+                "duplicate_channel_counter_dict": member.duplicate_channel_counter_dict,
+                "addons": member.addons,
+            }
+        ).encode("utf-8")
+        if len(data) > self.member_data_size:
+            raise ValueError(
+                f"Member(id={member.id}) in Guild(id={member.guild_id}) "
+                "is larger than member_data_size"
+            )
+
+        if len(member.messages) > self.messages_per_member:
+            # Only reachable without the handler, which caps members first
+            raise CacheFull(
+                f"Member(id={member.id}) in Guild(id={member.guild_id}) "
+                "has more than messages_per_member messages"
+            )
+
+        index: int = self._member_index(buffer, member.guild_id, member.id)
+        offset: int = self._members_at + index * self._member_size
+        previous: int = _LINK.unpack_from(buffer, offset + _PREVIOUS_AT)[0]
+        next_index: int = _LINK.unpack_from(buffer, offset + _NEXT_AT)[0]
+
+        _MEMBER.pack_into(
+            buffer,
+            offset,
+            *self._member_fields(
+                member, previous, next_index, len(member.messages), len(data)
+            ),
+        )
+        buffer[offset + _MEMBER.size : offset + _MEMBER.size + len(data)] = data
+        for position, message in enumerate(member.messages):
+            self._write_message(buffer, offset, position, message)
+
+    def _set_counter(
+        self,
+        buffer: memoryview,
+        index: int,
+        counter: MemberCounter,
+        fn: Callable[[int], int],
+    ) -> int:
+        offset: int = self._members_at + index * self._member_size
+        fields: list = list(_MEMBER.unpack_from(buffer, offset))
+        field: int = _COUNTER_FIELDS[counter.value]
+        fields[field] = fn(fields[field])
+        _MEMBER.pack_into(buffer, offset, *fields)
+        return fields[field]
+
+    def _append_message(self, buffer: memoryview, message: Message) -> None:
+        index: int = self._member_index(buffer, message.guild_id, message.author_id)
+        offset: int = self._members_at + index * self._member_size
+        fields: list = list(_MEMBER.unpack_from(buffer, offset))
+        first: int = fields[_FIRST_MESSAGE]
+        count: int = fields[_MESSAGE_COUNT]
+        if count >= self.messages_per_member:
+            raise CacheFull(
+                f"Member(id={message.author_id}) in Guild(id={message.guild_id}) "
+                "already has messages_per_member messages"
+            )
+
+        position = (first + count) % self.messages_per_member
+        fields[_MESSAGE_COUNT] = count + 1
+        self._write_message(buffer, offset, position, message)
+        _MEMBER.pack_into(buffer, offset, *fields)
+
+    def _read_message(
+        self,
+        buffer: memoryview,
+        member_at: int,
+        position: int,
+        guild_id: int,
+        author_id: int,
+    ) -> Message:
+        offset: int = member_at + self._messages_at + position * self._message_size
+        (
+            message_id,
+            channel_id,
+            creation_time,
+            is_duplicate,
+            length,
+        ) = _MESSAGE.unpack_from(buffer, offset)
+        content_at: int = offset + _MESSAGE.size
+        return Message(
+            id=message_id,
+            channel_id=channel_id,
+            guild_id=guild_id,
+            author_id=author_id,
+            # Truncation may have split a character
+            content=bytes(buffer[content_at : content_at + length]).decode(
+                "utf-8", "ignore"
+            ),
+            creation_time=from_timestamp(creation_time),
+            is_duplicate=is_duplicate,
+        )
+
+    def _write_message(
+        self, buffer: memoryview, member_at: int, position: int, message: Message
+    ) -> None:
+        offset: int = member_at + self._messages_at + position * self._message_size
+        # Fingerprint tokens are ascii, so truncating
+        # them leaves a shorter yet valid fingerprint
+        content: bytes = message.content.encode("utf-8")[: self.content_size]
+        _MESSAGE.pack_into(
+            buffer,
+            offset,
+            message.id,
+            message.channel_id,
+            to_timestamp(message.creation_time),
+            message.is_duplicate,
+            len(content),
+        )
+        content_at: int = offset + _MESSAGE.size
+        buffer[content_at : content_at + len(content)] = content
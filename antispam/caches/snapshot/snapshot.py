@@ -0,0 +1,600 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import struct
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterable,
+    BinaryIO,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from antispam import dataclasses
+from antispam.abc import Cache, Codec
+from antispam.caches.codecs import JsonCodec
+from antispam.caches.memory import MemoryCache
+
+if TYPE_CHECKING:
+    from antispam import AntiSpamHandler
+
+log = logging.getLogger(__name__)
+
+# File layout, all integers are little endian:
+#
+#   header   MAGIC, codec name length (B), codec name
+#
+# Followed by one or more saves, each appended after the last:
+#
+#   records  encoded guilds and members which changed since the last save
+#   members  per guild, member_count * (member id, offset, length)
+#   guilds   guild count, then per guild
+#            (guild id, offset, length, member index offset, member count)
+#   trailer  guild table offset, END_MAGIC
+#
+# Offsets are from the start of the file, so a save refers to
+# any unchanged records written by an earlier save. Only the
+# last save's guild table is read, and a save which didn't
+# finish is skipped in favour of the one before it.
+MAGIC = b"ASSNAP01"
+END_MAGIC = b"ASSNAPEND"
+
+_CODEC_NAME = struct.Struct("<B")
+_COUNT = struct.Struct("<Q")
+_MEMBER_ENTRY = struct.Struct("<qQI")
+_GUILD_ENTRY = struct.Struct("<qQIQI")
+_TRAILER = struct.Struct(f"<Q{len(END_MAGIC)}s")
+
+# Rewrite the file once less than 1 / _COMPACT_RATIO of it is still used
+_COMPACT_RATIO = 2
+
+# (offset, length, member index offset, member count)
+_GuildEntry = Tuple[int, int, int, int]
+# (offset, length)
+_Record = Tuple[int, int]
+
+
+def _header(codec: Codec) -> bytes:
+    codec_name: bytes = codec.__class__.__name__.encode("utf-8")
+    return MAGIC + _CODEC_NAME.pack(len(codec_name)) + codec_name
+
+
+class _Writer:
+    """Appends to a file while tracking the current offset"""
+
+    def __init__(self, stream: BinaryIO, offset: int = 0):
+        self.stream: BinaryIO = stream
+        self.offset: int = offset
+        # Bytes referenced by the save being written
+        self.used: int = 0
+
+    def write(self, data: bytes) -> _Record:
+        offset = self.offset
+        self.stream.write(data)
+        self.offset += len(data)
+        self.used += len(data)
+        return offset, len(data)
+
+    def reuse(self, record: _Record) -> _Record:
+        self.used += record[1]
+        return record
+
+    def finish(self, guilds: List[Tuple[int, int, int, int, int]]) -> None:
+        """Write the guild table and trailer, then flush to disk"""
+        table_offset, _ = self.write(_COUNT.pack(len(guilds)))
+        self.write(b"".join(_GUILD_ENTRY.pack(*entry) for entry in guilds))
+        self.write(_TRAILER.pack(table_offset, END_MAGIC))
+
+        self.stream.flush()
+        os.fsync(self.stream.fileno())
+
+
+class _Snapshot:
+    """A memory mapped snapshot file, as of its last complete save"""
+
+    def __init__(self, view: mmap.mmap, guilds: Dict[int, _GuildEntry]):
+        self.view: mmap.mmap = view
+        self.guilds: Dict[int, _GuildEntry] = guilds
+
+    @classmethod
+    def open(cls, path: str, codec: Codec) -> Optional[_Snapshot]:
+        """
+        Map a snapshot, returning None if there isn't one.
+
+        Raises
+        ------
+        ValueError
+            The file isn't a complete snapshot
+            written with this codec
+        """
+        try:
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return None
+
+                view = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+        try:
+            return cls(view, cls._read_guilds(view, path, codec))
+        except BaseException:
+            view.close()
+            raise
+
+    @staticmethod
+    def _read_guilds(
+        view: mmap.mmap, path: str, codec: Codec
+    ) -> Dict[int, _GuildEntry]:
+        if view[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an antispam snapshot")
+
+        (name_length,) = _CODEC_NAME.unpack_from(view, len(MAGIC))
+        name_start = len(MAGIC) + _CODEC_NAME.size
+        codec_name = view[name_start : name_start + name_length].decode("utf-8")
+        if codec_name != codec.__class__.__name__:
+            raise ValueError(
+                f"{path} was written with {codec_name}, "
+                f"not {codec.__class__.__name__}"
+            )
+
+        end = view.rfind(END_MAGIC)
+        trailer = end + len(END_MAGIC) - _TRAILER.size
+        if end == -1 or trailer < name_start + name_length:
+            raise ValueError(f"{path} is incomplete")
+
+        if end + len(END_MAGIC) != len(view):
+            log.warning("Ignoring an incomplete save at the end of %s", path)
+
+        table_offset, _ = _TRAILER.unpack_from(view, trailer)
+        (guild_count,) = _COUNT.unpack_from(view, table_offset)
+        start = table_offset + _COUNT.size
+        return {
+            guild_id: tuple(entry)
+            for guild_id, *entry in _GUILD_ENTRY.iter_unpack(
+                view[start : start + guild_count * _GUILD_ENTRY.size]
+            )
+        }
+
+    def record(self, record: _Record) -> bytes:
+        offset, length = record
+        return self.view[offset : offset + length]
+
+    def members(self, entry: _GuildEntry) -> Dict[int, _Record]:
+        """Where each member of a guild is stored, without decoding them"""
+        _, _, index_offset, member_count = entry
+        return {
+            member_id: (offset, length)
+            for member_id, offset, length in _MEMBER_ENTRY.iter_unpack(
+                self.view[
+                    index_offset : index_offset + member_count * _MEMBER_ENTRY.size
+                ]
+            )
+        }
+
+    def close(self) -> None:
+        self.view.close()
+
+
+async def write_snapshot(
+    cache: Cache, path: str, *, codec: Optional[Codec] = None
+) -> int:
+    """
+    Write everything stored within a cache to a snapshot file
+    which :py:class:`SnapshotCache` can load from.
+
+    If ``path`` already holds a snapshot written with the same
+    codec, only guilds and members which changed since it was
+    written are appended, along with a new index. Once most of
+    the file is no longer used it is rewritten instead.
+
+    A new file is written to a temporary file first and then
+    moved into place, while a save which fails part way
+    through an append is ignored when the snapshot is read.
+    Either way the previous snapshot is kept until the new
+    one is complete.
+
+    Parameters
+    ----------
+    cache: Cache
+        The cache to save
+    path: str
+        Where to write the snapshot
+    codec: Optional[Codec]
+        The :py:class:`antispam.abc.Codec` used to encode
+        guilds and members, the same codec must be used to read it.
+
+        Defaults to :py:class:`antispam.caches.codecs.JsonCodec`
+
+    Returns
+    -------
+    int
+        How many guilds were written
+    """
+    codec = codec or JsonCodec()
+    try:
+        previous: Optional[_Snapshot] = _Snapshot.open(path, codec)
+    except ValueError:
+        log.info("Replacing %s as it can't be appended to", path)
+        previous = None
+
+    if previous is None:
+        temporary_path: str = f"{path}.tmp"
+        with open(temporary_path, "wb") as stream:
+            writer = _Writer(stream)
+            writer.write(_header(codec))
+            count = await _write_guilds(writer, cache, codec, None)
+
+        os.replace(temporary_path, path)
+        log.info("Wrote a snapshot of %s guilds to %s", count, path)
+        return count
+
+    try:
+        with open(path, "r+b") as stream:
+            start: int = stream.seek(0, os.SEEK_END)
+            writer = _Writer(stream, start)
+            writer.used = len(_header(codec))
+            try:
+                count = await _write_guilds(writer, cache, codec, previous)
+            except BaseException:
+                # Nothing refers to a partial save, but don't keep it around
+                stream.truncate(start)
+                raise
+    finally:
+        previous.close()
+
+    log.info(
+        "Appended %s bytes to the snapshot of %s guilds at %s",
+        writer.offset - start,
+        count,
+        path,
+    )
+    if writer.offset > writer.used * _COMPACT_RATIO:
+        _compact(path, codec)
+
+    return count
+
+
+async def _write_guilds(
+    writer: _Writer, cache: Cache, codec: Codec, previous: Optional[_Snapshot]
+) -> int:
+    """Write a save, reusing any records within previous which are unchanged"""
+
+    def write(data: bytes, record: Optional[_Record]) -> _Record:
+        if record is not None and previous.record(record) == data:
+            return writer.reuse(record)
+
+        return writer.write(data)
+
+    guilds: List[Tuple[int, int, int, int, int]] = []
+    async for guild in cache.get_all_guilds():
+        entry: Optional[_GuildEntry] = previous and previous.guilds.get(guild.id)
+        stored: Dict[int, _Record] = previous.members(entry) if entry else {}
+
+        guild_offset, guild_length = write(
+            codec.encode_guild(guild), entry[:2] if entry else None
+        )
+        members: List[bytes] = []
+        for member in guild.members.values():
+            offset, length = write(codec.encode_member(member), stored.get(member.id))
+            members.append(_MEMBER_ENTRY.pack(member.id, offset, length))
+
+        index_offset, _ = writer.write(b"".join(members))
+        guilds.append(
+            (guild.id, guild_offset, guild_length, index_offset, len(members))
+        )
+
+    writer.finish(guilds)
+    return len(guilds)
+
+
+def _compact(path: str, codec: Codec) -> None:
+    """Rewrite a snapshot with only what its last save refers to"""
+    snapshot: _Snapshot = _Snapshot.open(path, codec)
+    temporary_path: str = f"{path}.tmp"
+    try:
+        with open(temporary_path, "wb") as stream:
+            writer = _Writer(stream)
+            writer.write(_header(codec))
+            guilds: List[Tuple[int, int, int, int, int]] = []
+            for guild_id, entry in snapshot.guilds.items():
+                guild_offset, guild_length = writer.write(snapshot.record(entry[:2]))
+                members: List[bytes] = [
+                    _MEMBER_ENTRY.pack(
+                        member_id, *writer.write(snapshot.record(record))
+                    )
+                    for member_id, record in snapshot.members(entry).items()
+                ]
+                index_offset, _ = writer.write(b"".join(members))
+                guilds.append(
+                    (guild_id, guild_offset, guild_length, index_offset, len(members))
+                )
+
+            writer.finish(guilds)
+    finally:
+        snapshot.close()
+
+    os.replace(temporary_path, path)
+    log.info("Compacted the snapshot at %s", path)
+
+
+class SnapshotCache(MemoryCache):
+    """
+    A :py:class:`antispam.caches.MemoryCache` which starts
+    from a snapshot written by :py:func:`write_snapshot`.
+
+    The snapshot is memory mapped and only its guild table
+    is read when initialized, so startup time does not depend
+    on how much state was saved. A guild is decoded the first
+    time anything within it is accessed, and each of its members
+    the first time that member is. Anything which returns a
+    whole guild decodes all of its members. From then on it
+    behaves as a ``MemoryCache``.
+
+    .. code-block:: python
+        :linenos:
+
+        from antispam.caches.snapshot import SnapshotCache, write_snapshot
+
+        # On shutdown
+        await write_snapshot(bot.handler.cache, "antispam.snapshot")
+
+        # On startup
+        bot.handler.set_cache(SnapshotCache(bot.handler, "antispam.snapshot"))
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler instance
+    path: str
+        The snapshot to load from,
+        it is fine for this not to exist yet.
+    codec: Optional[Codec]
+        The :py:class:`antispam.abc.Codec` the snapshot was written with.
+
+        Defaults to :py:class:`antispam.caches.codecs.JsonCodec`
+
+    Notes
+    -----
+    Members which are yet to be decoded don't
+    count towards ``max_members_per_guild`` or ``max_bytes``,
+    and a guild with any of them is never evicted.
+    """
+
+    def __init__(
+        self,
+        handler: AntiSpamHandler,
+        path: str,
+        *,
+        codec: Optional[Codec] = None,
+    ):
+        super().__init__(handler)
+        self.path: str = path
+        self.codec: Codec = codec or JsonCodec()
+
+        self._snapshot: Optional[_Snapshot] = None
+        # Guilds within the snapshot which are yet to be decoded
+        self._pending: Dict[int, _GuildEntry] = {}
+        # Members of decoded guilds which are yet to be decoded
+        self._pending_members: Dict[int, Dict[int, _Record]] = {}
+        self._opened: bool = False
+
+    @property
+    def pending_guilds(self) -> int:
+        """How many guilds within the snapshot are yet to be decoded"""
+        return len(self._pending)
+
+    @property
+    def pending_members(self) -> int:
+        """
+        How many members of already decoded
+        guilds are yet to be decoded
+        """
+        return sum(len(members) for members in self._pending_members.values())
+
+    async def initialize(self, *args, **kwargs) -> None:
+        """Maps the snapshot and reads its guild table."""
+        self._open()
+
+    async def close(self) -> None:
+        """
+        Unmap the snapshot, any guilds or members
+        which were not yet decoded are discarded.
+        """
+        self._close()
+
+    def _close(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+        self._pending = {}
+        self._pending_members = {}
+
+    def _open(self) -> None:
+        if self._opened:
+            return
+
+        self._opened = True
+        self._snapshot = _Snapshot.open(self.path, self.codec)
+        if self._snapshot is None:
+            log.info("No snapshot found at %s, starting empty", self.path)
+            return
+
+        self._pending = dict(self._snapshot.guilds)
+        log.info(
+            "Mapped a snapshot of %s guilds from %s", len(self._pending), self.path
+        )
+        self._release()
+
+    def _release(self) -> None:
+        """Unmap the snapshot once everything within it is decoded"""
+        if not self._pending and not self._pending_members:
+            self._close()
+
+    def _load_guild(self, guild_id: int) -> None:
+        """Decode a guild from the snapshot, without any of its members"""
+        self._open()
+        entry = self._pending.pop(guild_id, None)
+        if entry is None:
+            return
+
+        guild: dataclasses.Guild = self.codec.decode_guild(
+            self._snapshot.record(entry[:2])
+        )
+        members: Dict[int, _Record] = self._snapshot.members(entry)
+        if members:
+            self._pending_members[guild.id] = members
+
+        self.cache[guild.id] = guild
+        if self._bounded:
+            self._track_guild(guild)
+
+        self._release()
+
+    def _load_members(
+        self, guild_id: int, member_ids: Optional[Iterable[int]] = None
+    ) -> None:
+        """Decode members of a guild from the snapshot, defaulting to all of them"""
+        self._load_guild(guild_id)
+        pending: Optional[Dict[int, _Record]] = self._pending_members.get(guild_id)
+        if not pending:
+            return
+
+        guild: dataclasses.Guild = self.cache[guild_id]
+        for member_id in list(pending) if member_ids is None else member_ids:
+            record = pending.pop(member_id, None)
+            if record is None:
+                continue
+
+            member: dataclasses.Member = self.codec.decode_member(
+                self._snapshot.record(record)
+            )
+            guild.members[member.id] = member
+            if self._bounded:
+                self._track_member(member)
+
+        if not pending:
+            self._pending_members.pop(guild_id)
+            self._release()
+
+    def _discard_members(self, guild_id: int, member_ids: Iterable[int]) -> None:
+        """The snapshot copy of these members is outdated"""
+        self._load_guild(guild_id)
+        pending: Optional[Dict[int, _Record]] = self._pending_members.get(guild_id)
+        if not pending:
+            return
+
+        for member_id in member_ids:
+            pending.pop(member_id, None)
+
+        if not pending:
+            self._pending_members.pop(guild_id)
+            self._release()
+
+    def _discard_guild(self, guild_id: int) -> None:
+        """The snapshot copy of this guild is outdated"""
+        self._open()
+        if (
+            self._pending.pop(guild_id, None) is not None
+            or self._pending_members.pop(guild_id, None) is not None
+        ):
+            self._release()
+
+    def _get_guild(self, guild_id: int) -> dataclasses.Guild:
+        self._load_guild(guild_id)
+        return super()._get_guild(guild_id)
+
+    async def get_guild(self, guild_id: int) -> dataclasses.Guild:
+        self._load_members(guild_id)
+        return await super().get_guild(guild_id)
+
+    async def set_guild(self, guild: dataclasses.Guild) -> None:
+        self._open()
+        if self.cache.get(guild.id) is not guild:
+            # Replacing the guild, so the snapshot copy is outdated
+            self._discard_guild(guild.id)
+
+        await super().set_guild(guild)
+
+    async def delete_guild(self, guild_id: int) -> None:
+        self._discard_guild(guild_id)
+        await super().delete_guild(guild_id)
+
+    async def get_member(self, member_id: int, guild_id: int) -> dataclasses.Member:
+        self._load_members(guild_id, (member_id,))
+        return await super().get_member(member_id, guild_id)
+
+    async def set_member(self, member: dataclasses.Member) -> None:
+        self._discard_members(member.guild_id, (member.id,))
+        await super().set_member(member)
+
+    async def delete_member(self, member_id: int, guild_id: int) -> None:
+        self._discard_members(guild_id, (member_id,))
+        await super().delete_member(member_id, guild_id)
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, dataclasses.Member]:
+        member_ids = list(member_ids)
+        self._load_members(guild_id, member_ids)
+        return await super().get_members_many(member_ids, guild_id)
+
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        member_ids = list(member_ids)
+        self._discard_members(guild_id, member_ids)
+        await super().delete_members_many(member_ids, guild_id)
+
+    async def get_all_guilds(self) -> AsyncIterable[dataclasses.Guild]:
+        self._open()
+        for guild_id in list(self._pending.keys()):
+            self._load_guild(guild_id)
+
+        for guild_id in list(self._pending_members.keys()):
+            self._load_members(guild_id)
+
+        async for guild in super().get_all_guilds():
+            yield guild
+
+    async def drop(self) -> None:
+        self._open()
+        self._close()
+        await super().drop()
+
+    def _forget_guild(self, guild: dataclasses.Guild) -> None:
+        self._pending_members.pop(guild.id, None)
+        super()._forget_guild(guild)
+
+    def _is_evictable_guild(self, guild: dataclasses.Guild) -> bool:
+        return guild.id not in self._pending_members and super()._is_evictable_guild(
+            guild
+        )
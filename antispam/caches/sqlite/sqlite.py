@@ -0,0 +1,663 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncContextManager,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from attr import asdict
+
+from antispam.abc import Cache
+from antispam.dataclasses import Guild, Member, Message, Options
+from antispam.enums import MemberCounter, ResetType
+from antispam.exceptions import GuildNotFound, MemberNotFound
+from antispam.util import dumps_json, from_timestamp, to_timestamp
+
+if TYPE_CHECKING:
+    import aiosqlite
+
+    from antispam import AntiSpamHandler
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS guilds (
+        id INTEGER PRIMARY KEY,
+        log_channel_id INTEGER,
+        options TEXT NOT NULL,
+        addons TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS members (
+        guild_id INTEGER NOT NULL REFERENCES guilds (id) ON DELETE CASCADE,
+        id INTEGER NOT NULL,
+        warn_count INTEGER NOT NULL DEFAULT 0,
+        kick_count INTEGER NOT NULL DEFAULT 0,
+        times_timed_out INTEGER NOT NULL DEFAULT 0,
+        duplicate_counter INTEGER NOT NULL DEFAULT 1,
+        duplicate_channel_counter_dict TEXT NOT NULL DEFAULT '{}',
+        internal_is_in_guild INTEGER NOT NULL DEFAULT 1,
+        addons TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (guild_id, id)
+    ) WITHOUT ROWID
+    """,
+    # Messages are kept in insertion order by rowid
+    """
+    CREATE TABLE IF NOT EXISTS messages (
+        guild_id INTEGER NOT NULL,
+        member_id INTEGER NOT NULL,
+        id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        creation_time INTEGER NOT NULL,
+        is_duplicate INTEGER NOT NULL,
+        FOREIGN KEY (guild_id, member_id)
+            REFERENCES members (guild_id, id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS messages_member ON messages (guild_id, member_id)",
+    "CREATE INDEX IF NOT EXISTS messages_creation_time ON messages (creation_time)",
+)
+
+# Statements are kept as constants so sqlite's statement
+# cache reuses the prepared form across every call
+_MEMBER_COLUMNS = (
+    "id, guild_id, warn_count, kick_count, times_timed_out, duplicate_counter, "
+    "duplicate_channel_counter_dict, internal_is_in_guild, addons"
+)
+_MESSAGE_COLUMNS = (
+    "id, channel_id, guild_id, member_id, content, creation_time, is_duplicate"
+)
+
+_SELECT_GUILD = "SELECT id, options, log_channel_id, addons FROM guilds WHERE id = ?"
+_SELECT_GUILD_IDS = "SELECT id FROM guilds"
+_UPSERT_GUILD = (
+    "INSERT INTO guilds (id, log_channel_id, options, addons) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET log_channel_id = excluded.log_channel_id, "
+    "options = excluded.options, addons = excluded.addons"
+)
+_INSERT_GUILD = (
+    "INSERT OR IGNORE INTO guilds (id, log_channel_id, options, addons) "
+    "VALUES (?, ?, ?, ?)"
+)
+_DELETE_GUILD = "DELETE FROM guilds WHERE id = ?"
+_DELETE_GUILDS = "DELETE FROM guilds"
+
+_SELECT_MEMBER = f"SELECT {_MEMBER_COLUMNS} FROM members WHERE guild_id = ? AND id = ?"
+_SELECT_MEMBERS = f"SELECT {_MEMBER_COLUMNS} FROM members WHERE guild_id = ?"
+_UPSERT_MEMBER = (
+    f"INSERT INTO members ({_MEMBER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (guild_id, id) DO UPDATE SET warn_count = excluded.warn_count, "
+    "kick_count = excluded.kick_count, times_timed_out = excluded.times_timed_out, "
+    "duplicate_counter = excluded.duplicate_counter, "
+    "duplicate_channel_counter_dict = excluded.duplicate_channel_counter_dict, "
+    "internal_is_in_guild = excluded.internal_is_in_guild, addons = excluded.addons"
+)
+_INSERT_MEMBER = "INSERT OR IGNORE INTO members (guild_id, id) VALUES (?, ?)"
+_DELETE_MEMBER = "DELETE FROM members WHERE guild_id = ? AND id = ?"
+_DELETE_MEMBERS = "DELETE FROM members WHERE guild_id = ?"
+
+_SELECT_MESSAGES = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages "
+    "WHERE guild_id = ? AND member_id = ? ORDER BY rowid"
+)
+_SELECT_GUILD_MESSAGES = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages WHERE guild_id = ? ORDER BY rowid"
+)
+_INSERT_MESSAGE = (
+    f"INSERT INTO messages ({_MESSAGE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_DELETE_MESSAGES = "DELETE FROM messages WHERE guild_id = ? AND member_id = ?"
+_EXPIRE_MESSAGES = "DELETE FROM messages WHERE creation_time < ?"
+
+
+class SQLiteCache(Cache):
+    """
+    A persistent cache backend built on SQLite, for single
+    node bots which want their state to survive a restart
+    without running Redis or MongoDB.
+
+    Guilds, members and messages each have their own table.
+    Members are keyed by ``(guild_id, id)`` and messages are
+    indexed by member and by creation time, so
+    :py:meth:`SQLiteCache.expire_messages` can remove
+    old messages without reading them.
+
+    The database runs in WAL mode, so other processes
+    reading it are never blocked by a write. Plugin addons and options are
+    stored as JSON, with the same limitations as
+    :py:class:`antispam.caches.codecs.JsonCodec`.
+
+    This cache requires:
+
+    - aiosqlite
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler instance
+    path: str
+        Where to store the database,
+        ``":memory:"`` keeps it in memory.
+
+        Defaults to ``antispam.sqlite3``
+    """
+
+    def __init__(self, handler: AntiSpamHandler, path: str = "antispam.sqlite3"):
+        self.handler: AntiSpamHandler = handler
+        self.path: str = path
+
+        self._db: Optional[aiosqlite.Connection] = None
+        # Created lazily so they bind to the running event loop
+        self.__connect_lock: Optional[asyncio.Lock] = None
+        self.__write_lock: Optional[asyncio.Lock] = None
+
+    async def initialize(self, *args, **kwargs) -> None:
+        """Opens the database, creating the tables and indexes if required."""
+        await self._connection()
+
+    async def close(self) -> None:
+        """Close the database connection."""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def _connection(self) -> aiosqlite.Connection:
+        if self._db is not None:
+            return self._db
+
+        if self.__connect_lock is None:
+            self.__connect_lock = asyncio.Lock()
+
+        async with self.__connect_lock:
+            if self._db is not None:
+                return self._db
+
+            # Import here to avoid errors when not
+            # having the optional dependency installed
+            import aiosqlite
+
+            # Autocommit, transactions are opened explicitly
+            db = await aiosqlite.connect(self.path, isolation_level=None)
+            await db.execute("PRAGMA journal_mode=WAL")
+            await db.execute("PRAGMA synchronous=NORMAL")
+            await db.execute("PRAGMA foreign_keys=ON")
+            for statement in _SCHEMA:
+                await db.execute(statement)
+
+            self._db = db
+            log.info("SQLite cache ready at %s", self.path)
+
+        return self._db
+
+    def _read(self) -> AsyncContextManager[aiosqlite.Connection]:
+        """
+        A read only transaction. Reads share the connection with
+        writes, so without this they could see the changes
+        of a transaction which hasn't finished yet, such as a
+        member removed by set_guild before being written again.
+        """
+        return self._transaction("DEFERRED")
+
+    @asynccontextmanager
+    async def _transaction(
+        self, mode: str = "IMMEDIATE"
+    ) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        A transaction on the shared connection, only one runs
+        at a time. IMMEDIATE takes SQLite's write lock up front
+        so anything read within it can't be changed by another
+        process.
+        """
+        db = await self._connection()
+        if self.__write_lock is None:
+            self.__write_lock = asyncio.Lock()
+
+        async with self.__write_lock:
+            await db.execute(f"BEGIN {mode}")
+            try:
+                yield db
+            except BaseException:
+                await db.execute("ROLLBACK")
+                raise
+            else:
+                await db.execute("COMMIT")
+
+    async def get_guild(self, guild_id: int) -> Guild:
+        log.debug("Attempting to return cached Guild(id=%s)", guild_id)
+        async with self._read() as db:
+            async with db.execute(_SELECT_GUILD, (guild_id,)) as cursor:
+                row = await cursor.fetchone()
+
+            if row is None:
+                raise GuildNotFound
+
+            guild: Guild = self._decode_guild(row)
+            for member in await self._read_members(db, guild_id):
+                guild.members[member.id] = member
+
+        return guild
+
+    async def set_guild(self, guild: Guild) -> None:
+        log.debug("Attempting to set Guild(id=%s)", guild.id)
+        async with self._transaction() as db:
+            await db.execute(_UPSERT_GUILD, self._encode_guild(guild))
+            # Replaces any 'old' members, cascading to their messages
+            await db.execute(_DELETE_MEMBERS, (guild.id,))
+            await self._write_members(db, guild.members.values())
+
+    async def delete_guild(self, guild_id: int) -> None:
+        log.debug("Attempting to delete Guild(id=%s)", guild_id)
+        async with self._transaction() as db:
+            await db.execute(_DELETE_GUILD, (guild_id,))
+
+    async def get_member(self, member_id: int, guild_id: int) -> Member:
+        log.debug(
+            "Attempting to return a cached Member(id=%s) for Guild(id=%s)",
+            member_id,
+            guild_id,
+        )
+        async with self._read() as db:
+            return await self._read_member(db, member_id, guild_id)
+
+    async def set_member(self, member: Member) -> None:
+        log.debug(
+            "Attempting to cache Member(id=%s) for Guild(id=%s)",
+            member.id,
+            member.guild_id,
+        )
+        async with self._transaction() as db:
+            await self._ensure_guilds(db, (member.guild_id,))
+            await self._write_members(db, (member,))
+
+    async def delete_member(self, member_id: int, guild_id: int) -> None:
+        log.debug(
+            "Attempting to delete Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        async with self._transaction() as db:
+            await db.execute(_DELETE_MEMBER, (guild_id, member_id))
+
+    async def add_message(self, message: Message) -> None:
+        log.debug(
+            "Attempting to add a Message(id=%s) to Member(id=%s) in Guild(id=%s)",
+            message.id,
+            message.author_id,
+            message.guild_id,
+        )
+        await self.add_messages_many((message,))
+
+    async def reset_member_count(
+        self, member_id: int, guild_id: int, reset_type: ResetType
+    ) -> None:
+        log.debug(
+            "Attempting to reset counts on Member(id=%s) in Guild(id=%s) with type %s",
+            member_id,
+            guild_id,
+            reset_type.name,
+        )
+        if reset_type == ResetType.KICK_COUNTER:
+            field = MemberCounter.KICK_COUNTER.value
+        else:
+            field = MemberCounter.WARN_COUNTER.value
+
+        async with self._transaction() as db:
+            await db.execute(
+                f"UPDATE members SET {field} = 0 WHERE guild_id = ? AND id = ?",
+                (guild_id, member_id),
+            )
+
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        log.debug(
+            "Attempting to increment %s on Member(id=%s) in Guild(id=%s) by %s",
+            counter.name,
+            member_id,
+            guild_id,
+            amount,
+        )
+        async with self._transaction() as db:
+            await self._ensure_guilds(db, (guild_id,))
+            await db.execute(_INSERT_MEMBER, (guild_id, member_id))
+            # RETURNING would need SQLite 3.35, the transaction
+            # already stops anything changing this in between
+            await db.execute(
+                f"UPDATE members SET {counter.value} = {counter.value} + ? "
+                "WHERE guild_id = ? AND id = ?",
+                (amount, guild_id, member_id),
+            )
+            async with db.execute(
+                f"SELECT {counter.value} FROM members WHERE guild_id = ? AND id = ?",
+                (guild_id, member_id),
+            ) as cursor:
+                row = await cursor.fetchone()
+
+        return row[0]
+
+    async def update_member(
+        self, member_id: int, guild_id: int, fn: Callable[[Member], Any]
+    ) -> Member:
+        log.debug(
+            "Attempting to update Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        async with self._transaction() as db:
+            try:
+                member: Member = await self._read_member(db, member_id, guild_id)
+            except MemberNotFound:
+                member: Member = Member(id=member_id, guild_id=guild_id)
+
+            fn(member)
+            await self._ensure_guilds(db, (guild_id,))
+            await self._write_members(db, (member,))
+
+        return member
+
+    async def get_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> Dict[int, Member]:
+        wanted = set(member_ids)
+        log.debug(
+            "Attempting to return %s cached members for Guild(id=%s)",
+            len(wanted),
+            guild_id,
+        )
+        if not wanted:
+            return {}
+
+        async with self._read() as db:
+            members: List[Member] = await self._read_members(db, guild_id)
+
+        return {member.id: member for member in members if member.id in wanted}
+
+    async def set_members_many(self, members: Iterable[Member]) -> None:
+        members: List[Member] = list(members)
+        log.debug("Attempting to cache %s members", len(members))
+        if not members:
+            return
+
+        async with self._transaction() as db:
+            await self._ensure_guilds(db, {member.guild_id for member in members})
+            await self._write_members(db, members)
+
+    async def delete_members_many(
+        self, member_ids: Iterable[int], guild_id: int
+    ) -> None:
+        log.debug("Attempting to delete members in Guild(id=%s)", guild_id)
+        async with self._transaction() as db:
+            await db.executemany(
+                _DELETE_MEMBER, [(guild_id, member_id) for member_id in member_ids]
+            )
+
+    async def add_messages_many(self, messages: Iterable[Message]) -> None:
+        messages: List[Message] = list(messages)
+        log.debug("Attempting to add %s messages", len(messages))
+        if not messages:
+            return
+
+        async with self._transaction() as db:
+            await self._ensure_guilds(db, {message.guild_id for message in messages})
+            await db.executemany(
+                _INSERT_MEMBER,
+                {(message.guild_id, message.author_id) for message in messages},
+            )
+            await db.executemany(
+                _INSERT_MESSAGE, [self._encode_message(m) for m in messages]
+            )
+
+    async def expire_messages(self, before: datetime.datetime) -> int:
+        """
+        Delete every message sent before the given time,
+        using the creation time index rather than
+        reading each member.
+
+        Parameters
+        ----------
+        before: datetime.datetime
+            Messages sent before this are removed
+
+        Returns
+        -------
+        int
+            How many messages were removed
+
+        Notes
+        -----
+        Unlike cleaning up a member through the handler,
+        this does not lower any duplicate counters.
+        """
+        async with self._transaction() as db:
+            cursor = await db.execute(_EXPIRE_MESSAGES, (to_timestamp(before),))
+            removed: int = cursor.rowcount
+            await cursor.close()
+
+        log.debug("Expired %s messages sent before %s", removed, before)
+        return removed
+
+    async def get_all_guilds(self) -> AsyncIterable[Guild]:
+        log.debug("Yielding all cached guilds")
+        async with self._read() as db:
+            async with db.execute(_SELECT_GUILD_IDS) as cursor:
+                guild_ids: List[int] = [row[0] for row in await cursor.fetchall()]
+
+        for guild_id in guild_ids:
+            try:
+                yield await self.get_guild(guild_id)
+            except GuildNotFound:
+                # Deleted while iterating
+                continue
+
+    async def get_all_members(self, guild_id: int) -> AsyncIterable[Member]:
+        log.debug("Yielding all cached members for Guild(id=%s)", guild_id)
+        async with self._read() as db:
+            async with db.execute(_SELECT_GUILD, (guild_id,)) as cursor:
+                if await cursor.fetchone() is None:
+                    raise GuildNotFound
+
+            members: List[Member] = await self._read_members(db, guild_id)
+
+        for member in members:
+            yield member
+
+    async def drop(self) -> None:
+        log.warning("Cache was just dropped")
+        async with self._transaction() as db:
+            await db.execute(_DELETE_GUILDS)
+
+    async def _ensure_guilds(
+        self, db: aiosqlite.Connection, guild_ids: Iterable[int]
+    ) -> None:
+        """Create any of these guilds which don't exist"""
+        await db.executemany(
+            _INSERT_GUILD,
+            [
+                self._encode_guild(Guild(id=guild_id, options=self.handler.options))
+                for guild_id in guild_ids
+            ],
+        )
+
+    async def _write_members(
+        self, db: aiosqlite.Connection, members: Iterable[Member]
+    ) -> None:
+        """Upsert members, replacing all of their messages"""
+        members = list(members)
+        await db.executemany(_UPSERT_MEMBER, [self._encode_member(m) for m in members])
+        await db.executemany(
+            _DELETE_MESSAGES, [(member.guild_id, member.id) for member in members]
+        )
+        await db.executemany(
+            _INSERT_MESSAGE,
+            [
+                self._encode_message(message)
+                for member in members
+                for message in member.messages
+            ],
+        )
+
+    async def _read_member(
+        self, db: aiosqlite.Connection, member_id: int, guild_id: int
+    ) -> Member:
+        async with db.execute(_SELECT_MEMBER, (guild_id, member_id)) as cursor:
+            row = await cursor.fetchone()
+
+        if row is None:
+            raise MemberNotFound
+
+        member: Member = self._decode_member(row)
+        async with db.execute(_SELECT_MESSAGES, (guild_id, member_id)) as cursor:
+            member.messages = [self._decode_message(r) for r in await cursor.fetchall()]
+
+        return member
+
+    async def _read_members(
+        self, db: aiosqlite.Connection, guild_id: int
+    ) -> List[Member]:
+        """Every member in a guild, reading all of their messages at once"""
+        async with db.execute(_SELECT_MEMBERS, (guild_id,)) as cursor:
+            members: Dict[int, Member] = {
+                row[0]: self._decode_member(row) for row in await cursor.fetchall()
+            }
+
+        async with db.execute(_SELECT_GUILD_MESSAGES, (guild_id,)) as cursor:
+            for row in await cursor.fetchall():
+                member: Optional[Member] = members.get(row[3])
+                if member is not None:
+                    member.messages.append(self._decode_message(row))
+
+        return list(members.values())
+
+    @staticmethod
+    def _encode_guild(guild: Guild) -> Tuple:
+        return (
+            guild.id,
+            guild.log_channel_id,
+            dumps_json(asdict(guild.options)),
+            dumps_json(guild.addons),
+        )
+
+    @staticmethod
+    def _decode_guild(row: Sequence) -> Guild:
+        guild_id, options, log_channel_id, addons = row
+        return Guild(
+            id=guild_id,
+            options=Options(**json.loads(options)),
+            log_channel_id=log_channel_id,
+            addons=json.loads(addons),
+        )
+
+    @staticmethod
+    def _encode_member(member: Member) -> Tuple:
+        return (
+            member.id,
+            member.guild_id,
+            member.warn_count,
+            member.kick_count,
+            member.times_timed_out,
+            member.duplicate_counter,
+            dumps_json(member.duplicate_channel_counter_dict),
+            member.internal_is_in_guild,
+            dumps_json(member.addons),
+        )
+
+    @staticmethod
+    def _decode_member(row: Sequence) -> Member:
+        (
+            member_id,
+            guild_id,
+            warn_count,
+            kick_count,
+            times_timed_out,
+            duplicate_counter,
+            duplicate_channel_counter_dict,
+            internal_is_in_guild,
+            addons,
+        ) = row
+        return Member(
+            id=member_id,
+            guild_id=guild_id,
+            warn_count=warn_count,
+            kick_count=kick_count,
+            times_timed_out=times_timed_out,
+            duplicate_counter=duplicate_counter,
+            # JSON object keys are always strings
+            duplicate_channel_counter_dict={
+                int(k): v for k, v in json.loads(duplicate_channel_counter_dict).items()
+            },
+            internal_is_in_guild=bool(internal_is_in_guild),
+            addons=json.loads(addons),
+        )
+
+    @staticmethod
+    def _encode_message(message: Message) -> Tuple:
+        return (
+            message.id,
+            message.channel_id,
+            message.guild_id,
+            message.author_id,
+            message.content,
+            to_timestamp(message.creation_time),
+            message.is_duplicate,
+        )
+
+    @staticmethod
+    def _decode_message(row: Sequence) -> Message:
+        (
+            message_id,
+            channel_id,
+            guild_id,
+            author_id,
+            content,
+            creation_time,
+            is_duplicate,
+        ) = row
+        return Message(
+            id=message_id,
+            channel_id=channel_id,
+            guild_id=guild_id,
+            author_id=author_id,
+            content=content,
+            creation_time=from_timestamp(creation_time),
+            is_duplicate=bool(is_duplicate),
+        )
@@ -0,0 +1,461 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING, AsyncIterable, Dict, Optional, Set
+
+from antispam.abc import Cache, Invalidator
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter, ResetType
+from antispam.exceptions import GuildNotFound, MemberNotFound
+
+if TYPE_CHECKING:
+    from antispam import AntiSpamHandler
+
+log = logging.getLogger(__name__)
+
+
+class TieredCache(Cache):
+    """
+    An in process cache placed in front of another cache.
+
+    Reads are served from memory once a guild has been loaded,
+    while writes are applied in memory and coalesced into
+    writes against ``backend`` every ``flush_interval`` seconds,
+    or whenever :py:meth:`TieredCache.flush` is called.
+
+    When several processes share ``backend``, pass an
+    ``invalidator`` so each drops data changed by the others.
+    Changes are only shared once flushed, and concurrent
+    changes to the same member are last write wins.
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler instance
+    backend: Cache
+        The cache to persist data to,
+        I.e. :py:class:`antispam.caches.redis.RedisCache`
+    max_guilds: int
+        How many guilds to keep in memory, the least
+        recently used guild is flushed and evicted
+        once this is exceeded.
+
+        Defaults to 1000
+    flush_interval: float
+        How many seconds to wait between flushes.
+
+        Defaults to 5
+    invalidator: Optional[Invalidator]
+        Used to share changes with other processes
+        using the same backend, such as
+        :py:class:`antispam.caches.redis.RedisInvalidator`.
+
+        Guilds changed elsewhere are dropped from memory,
+        while single members are reloaded on next access.
+
+        Defaults to None
+    """
+
+    def __init__(
+        self,
+        handler: AntiSpamHandler,
+        backend: Cache,
+        *,
+        max_guilds: int = 1000,
+        flush_interval: float = 5,
+        invalidator: Optional[Invalidator] = None,
+    ):
+        if max_guilds < 1:
+            raise ValueError("max_guilds must be at least 1")
+
+        self.handler: AntiSpamHandler = handler
+        self.backend: Cache = backend
+        self.max_guilds: int = max_guilds
+        self.flush_interval: float = flush_interval
+        self.invalidator: Optional[Invalidator] = invalidator
+
+        self._guilds: OrderedDict[int, Guild] = OrderedDict()
+
+        # What needs writing to the backend, per guild
+        self._dirty_guilds: Set[int] = set()
+        self._deleted_guilds: Set[int] = set()
+        self._dirty_members: Dict[int, Set[int]] = {}
+        self._deleted_members: Dict[int, Set[int]] = {}
+
+        # What other processes have changed
+        self._stale_guilds: Set[int] = set()
+        self._stale_members: Dict[int, Set[int]] = {}
+
+        # Created lazily so it binds to the running event loop
+        self.__flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def _flush_lock(self) -> asyncio.Lock:
+        if self.__flush_lock is None:
+            self.__flush_lock = asyncio.Lock()
+
+        return self.__flush_lock
+
+    async def initialize(self, *args, **kwargs) -> None:
+        await self.backend.initialize(*args, **kwargs)
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+        if self.invalidator is not None:
+            await self.invalidator.start(self._on_invalidation)
+
+    async def close(self) -> None:
+        """Stop flushing in the background and flush everything outstanding."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+
+            self._flush_task = None
+
+        await self.flush()
+        if self.invalidator is not None:
+            await self.invalidator.close()
+
+    async def flush(self) -> None:
+        """Write every outstanding change to the backend."""
+        async with self._flush_lock:
+            guild_ids: Set[int] = (
+                self._dirty_guilds
+                | self._deleted_guilds
+                | self._dirty_members.keys()
+                | self._deleted_members.keys()
+            )
+            for guild_id in guild_ids:
+                await self._flush_guild(guild_id)
+
+    async def get_guild(self, guild_id: int) -> Guild:
+        log.debug("Attempting to return cached Guild(id=%s)", guild_id)
+        guild: Optional[Guild] = await self._load_guild(guild_id)
+        if guild is None:
+            raise GuildNotFound
+
+        return guild
+
+    async def set_guild(self, guild: Guild) -> None:
+        log.debug("Attempting to set Guild(id=%s)", guild.id)
+        # The whole guild gets written, so individual
+        # member changes no longer need tracking
+        self._dirty_members.pop(guild.id, None)
+        self._deleted_members.pop(guild.id, None)
+        self._dirty_guilds.add(guild.id)
+
+        self._guilds[guild.id] = guild
+        self._guilds.move_to_end(guild.id)
+        await self._evict()
+
+    async def delete_guild(self, guild_id: int) -> None:
+        log.debug("Attempting to delete Guild(id=%s)", guild_id)
+        self._guilds.pop(guild_id, None)
+        self._dirty_guilds.discard(guild_id)
+        self._dirty_members.pop(guild_id, None)
+        self._deleted_members.pop(guild_id, None)
+        self._stale_guilds.discard(guild_id)
+        self._stale_members.pop(guild_id, None)
+        self._deleted_guilds.add(guild_id)
+
+    async def get_member(self, member_id: int, guild_id: int) -> Member:
+        log.debug(
+            "Attempting to return a cached Member(id=%s) for Guild(id=%s)",
+            member_id,
+            guild_id,
+        )
+        guild: Guild = await self.get_guild(guild_id)
+        try:
+            return guild.members[member_id]
+        except KeyError:
+            raise MemberNotFound from None
+
+    async def set_member(self, member: Member) -> None:
+        log.debug(
+            "Attempting to cache Member(id=%s) for Guild(id=%s)",
+            member.id,
+            member.guild_id,
+        )
+        guild: Guild = await self._load_or_create_guild(member.guild_id)
+        guild.members[member.id] = member
+        self._mark_member(member.guild_id, member.id)
+
+    async def delete_member(self, member_id: int, guild_id: int) -> None:
+        log.debug(
+            "Attempting to delete Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        guild: Optional[Guild] = await self._load_guild(guild_id)
+        if guild is None or guild.members.pop(member_id, None) is None:
+            return
+
+        self._dirty_members.get(guild_id, set()).discard(member_id)
+        if guild_id not in self._dirty_guilds:
+            self._deleted_members.setdefault(guild_id, set()).add(member_id)
+
+    async def add_message(self, message: Message) -> None:
+        log.debug(
+            "Attempting to add a Message(id=%s) to Member(id=%s) in Guild(id=%s)",
+            message.id,
+            message.author_id,
+            message.guild_id,
+        )
+        member: Member = await self._load_or_create_member(
+            message.author_id, message.guild_id
+        )
+        member.messages.append(message)
+        self._mark_member(message.guild_id, message.author_id)
+
+    async def reset_member_count(
+        self, member_id: int, guild_id: int, reset_type: ResetType
+    ) -> None:
+        log.debug(
+            "Attempting to reset counts on Member(id=%s) in Guild(id=%s) with type %s",
+            member_id,
+            guild_id,
+            reset_type.name,
+        )
+        try:
+            member: Member = await self.get_member(member_id, guild_id)
+        except (MemberNotFound, GuildNotFound):
+            return
+
+        if reset_type == ResetType.KICK_COUNTER:
+            member.kick_count = 0
+        else:
+            member.warn_count = 0
+
+        self._mark_member(guild_id, member_id)
+
+    async def increment_member_counter(
+        self,
+        member_id: int,
+        guild_id: int,
+        counter: MemberCounter,
+        amount: int = 1,
+    ) -> int:
+        log.debug(
+            "Attempting to increment %s on Member(id=%s) in Guild(id=%s) by %s",
+            counter.name,
+            member_id,
+            guild_id,
+            amount,
+        )
+        member: Member = await self._load_or_create_member(member_id, guild_id)
+        value: int = getattr(member, counter.value) + amount
+        setattr(member, counter.value, value)
+        self._mark_member(guild_id, member_id)
+        return value
+
+    async def get_all_guilds(self) -> AsyncIterable[Guild]:
+        log.debug("Yielding all cached guilds")
+        await self.flush()
+        async for guild in self.backend.get_all_guilds():
+            # Prefer the instance we hold so changes are tracked
+            yield self._guilds.get(guild.id, guild)
+
+    async def get_all_members(self, guild_id: int) -> AsyncIterable[Member]:
+        log.debug("Yielding all cached members for Guild(id=%s)", guild_id)
+        guild: Guild = await self.get_guild(guild_id)
+        for member in list(guild.members.values()):
+            yield member
+
+    async def drop(self) -> None:
+        log.warning("Cache was just dropped")
+        self._guilds.clear()
+        self._dirty_guilds.clear()
+        self._deleted_guilds.clear()
+        self._dirty_members.clear()
+        self._deleted_members.clear()
+        self._stale_guilds.clear()
+        self._stale_members.clear()
+        await self.backend.drop()
+
+    def _mark_member(self, guild_id: int, member_id: int) -> None:
+        if guild_id in self._dirty_guilds:
+            # Already getting written in full
+            return
+
+        self._dirty_members.setdefault(guild_id, set()).add(member_id)
+        self._deleted_members.get(guild_id, set()).discard(member_id)
+
+    async def _load_guild(self, guild_id: int) -> Optional[Guild]:
+        """Return the guild from memory, falling back to the backend."""
+        guild: Optional[Guild] = self._guilds.get(guild_id)
+        if guild is not None:
+            self._guilds.move_to_end(guild_id)
+            if guild_id in self._stale_members:
+                await self._refresh_members(guild)
+
+            return guild
+
+        if guild_id in self._deleted_guilds:
+            # The backend still has it until the next flush
+            return None
+
+        try:
+            guild = await self.backend.get_guild(guild_id)
+        except GuildNotFound:
+            return None
+
+        # Something else may have loaded it while we waited
+        guild = self._guilds.setdefault(guild_id, guild)
+        self._guilds.move_to_end(guild_id)
+        await self._evict()
+        return guild
+
+    async def _load_or_create_guild(self, guild_id: int) -> Guild:
+        guild: Optional[Guild] = await self._load_guild(guild_id)
+        if guild is None:
+            guild = Guild(id=guild_id, options=self.handler.options)
+            await self.set_guild(guild)
+
+        return guild
+
+    async def _load_or_create_member(self, member_id: int, guild_id: int) -> Member:
+        guild: Guild = await self._load_or_create_guild(guild_id)
+        try:
+            return guild.members[member_id]
+        except KeyError:
+            member: Member = Member(id=member_id, guild_id=guild_id)
+            guild.members[member_id] = member
+            return member
+
+    async def _evict(self) -> None:
+        while len(self._guilds) > self.max_guilds:
+            guild_id: int = next(iter(self._guilds))
+            async with self._flush_lock:
+                await self._flush_guild(guild_id)
+
+            if guild_id in self._dirty_guilds:
+                # Flushing failed, keep it rather than lose data
+                return
+
+            self._guilds.pop(guild_id, None)
+            log.debug("Evicted Guild(id=%s) from memory", guild_id)
+
+    async def _flush_guild(self, guild_id: int) -> None:
+        """Write the outstanding changes for a guild, the flush lock must be held."""
+        deleted: bool = guild_id in self._deleted_guilds
+        written: bool = guild_id in self._dirty_guilds
+        members: Set[int] = self._dirty_members.pop(guild_id, set())
+        deleted_members: Set[int] = self._deleted_members.pop(guild_id, set())
+        self._deleted_guilds.discard(guild_id)
+        self._dirty_guilds.discard(guild_id)
+
+        guild: Optional[Guild] = self._guilds.get(guild_id)
+        try:
+            if deleted:
+                await self.backend.delete_guild(guild_id)
+
+            if guild is not None and written:
+                await self.backend.set_guild(guild)
+
+            elif guild is not None:
+                for member_id in members:
+                    member: Optional[Member] = guild.members.get(member_id)
+                    if member is not None:
+                        await self.backend.set_member(member)
+
+                for member_id in deleted_members:
+                    await self.backend.delete_member(member_id, guild_id)
+
+        except Exception:
+            log.exception("Failed to flush Guild(id=%s), retrying later", guild_id)
+            if deleted:
+                self._deleted_guilds.add(guild_id)
+
+            if guild is not None:
+                self._dirty_guilds.add(guild_id)
+
+            return
+
+        if guild_id in self._stale_guilds and not self._has_changes(guild_id):
+            self._stale_guilds.discard(guild_id)
+            self._guilds.pop(guild_id, None)
+
+        changed_members: Set[int] = members | deleted_members
+        if self.invalidator is None or not (deleted or written or changed_members):
+            return
+
+        # Peers only need to reload a single member where possible
+        member_id: Optional[int] = None
+        if not deleted and not written and len(changed_members) == 1:
+            member_id = next(iter(changed_members))
+
+        try:
+            await self.invalidator.publish(guild_id, member_id)
+        except Exception:
+            log.exception("Failed to publish invalidation for Guild(id=%s)", guild_id)
+
+    def _has_changes(self, guild_id: int) -> bool:
+        return (
+            guild_id in self._dirty_guilds
+            or guild_id in self._deleted_guilds
+            or bool(self._dirty_members.get(guild_id))
+            or bool(self._deleted_members.get(guild_id))
+        )
+
+    async def _on_invalidation(self, guild_id: int, member_id: Optional[int]) -> None:
+        """Another process changed this guild within the backend."""
+        if guild_id not in self._guilds:
+            return
+
+        if member_id is None:
+            if self._has_changes(guild_id):
+                # Drop it once our own changes are written
+                self._stale_guilds.add(guild_id)
+            else:
+                self._guilds.pop(guild_id, None)
+
+        elif member_id not in self._dirty_members.get(guild_id, set()):
+            self._stale_members.setdefault(guild_id, set()).add(member_id)
+
+    async def _refresh_members(self, guild: Guild) -> None:
+        """Reload any members another process has changed."""
+        for member_id in self._stale_members.pop(guild.id, set()):
+            if member_id in self._dirty_members.get(guild.id, set()):
+                continue
+
+            try:
+                guild.members[member_id] = await self.backend.get_member(
+                    member_id, guild.id
+                )
+            except (MemberNotFound, GuildNotFound):
+                guild.members.pop(member_id, None)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:  # pragma: no cover
+                log.exception("Flushing TieredCache failed")
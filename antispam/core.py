@@ -24,17 +24,18 @@ import datetime
 import logging
 from typing import TYPE_CHECKING
 
-from thefuzz import fuzz
-
 from antispam.abc import Cache
 from antispam.dataclasses import CorePayload, Guild, Member, Message
+from antispam.enums import MemberCounter
 from antispam.exceptions import (
     DuplicateObject,
     LogicError,
     MemberNotFound,
     UnsupportedAction,
 )
-from antispam.util import get_aware_time
+from antispam.fingerprint import create_fingerprint, similarity
+from antispam.simhash import create_simhash, distance_threshold, hamming_distance
+from antispam.util import get_aware_time, intern_content
 
 if TYPE_CHECKING:  # pragma: no cover
     from antispam import AntiSpamHandler, Options
@@ -97,26 +98,41 @@ class Core:
                 )
 
         except MemberNotFound:
-            # Create a use-able member
+            # Create a use-able member, this is stored below
             member = Member(
                 id=original_message.author.id,
                 guild_id=await self.handler.lib_handler.get_guild_id(original_message),
             )
-            guild.members[member.id] = member
-            await self.cache.set_guild(guild=guild)
-
-        await self.clean_up(
-            member=member,
-            current_time=get_aware_time(),
-            channel_id=await self.handler.lib_handler.get_channel_id(original_message),
-            guild=guild,
-        )
+
+        current_time = get_aware_time()
         message: Message = await self.handler.lib_handler.create_message(
             original_message
         )
-        self._calculate_ratios(message, member, guild)
+        if not self.options(guild).store_message_content:
+            message.content = intern_content(create_fingerprint(message.content))
+
+        if self.options(guild).use_simhash:
+            # Cached per content, so this is the only time it is computed
+            # for this message, even when record_message reruns
+            create_simhash(
+                message.content, not self.options(guild).store_message_content
+            )
 
-        await self.cache.add_message(message)
+        def record_message(stored: Member) -> None:
+            # This reruns on concurrent changes, so start afresh each time
+            message.is_duplicate = False
+            self._clean_up(stored, current_time, guild)
+            self._calculate_ratios(message, stored, guild)
+            stored.messages.append(message)
+            self._cap_window(stored, guild)
+
+        # One atomic read-modify-write, so neither the cleaned up
+        # messages nor changed duplicate counts are lost
+        member = await self.cache.update_member(
+            member.id, member.guild_id, record_message
+        )
+        guild.members[member.id] = member
+        self.handler.expiry.schedule(guild, member.id, member.messages[0].creation_time)
         log.info(
             "Created Message(%s) on Member(id=%s) in Guild(id=%s)",
             message.id,
@@ -260,9 +276,10 @@ class Core:
                     ),
                 )
 
-                member.times_timed_out += 1
+                member.times_timed_out = await self.cache.increment_member_counter(
+                    member.id, member.guild_id, MemberCounter.TIMEOUT_COUNTER
+                )
                 member.internal_is_in_guild = True
-                await self.handler.cache.set_member(member)
 
                 return_payload.member_was_timed_out = True
                 return_payload.member_status = "Member was timed out"
@@ -285,7 +302,9 @@ class Core:
                 message.author_id,
                 message.guild_id,
             )
-            member.warn_count += 1
+            member.warn_count = await self.cache.increment_member_counter(
+                member.id, member.guild_id, MemberCounter.WARN_COUNTER
+            )
             channel = await self.handler.lib_handler.get_channel_from_message(
                 original_message
             )
@@ -311,7 +330,9 @@ class Core:
             except Exception as e:  # pragma: no cover
                 # This is a general sos, haven't figured out a way
                 # to raise this late but it could in theory happen
-                member.warn_count -= 1
+                member.warn_count = await self.cache.increment_member_counter(
+                    member.id, member.guild_id, MemberCounter.WARN_COUNTER, -1
+                )
                 raise e
 
             # Log this within guild log channels
@@ -336,7 +357,9 @@ class Core:
             # KICK
             # Set this to False here to stop processing other messages, we can revert on failure
             member.internal_is_in_guild = False
-            member.kick_count += 1
+            member.kick_count = await self.cache.increment_member_counter(
+                member.id, member.guild_id, MemberCounter.KICK_COUNTER
+            )
             log.debug(
                 "Attempting to kick Member(id=%s) from Guild(id=%s)",
                 message.author_id,
@@ -376,7 +399,9 @@ class Core:
             # BAN
             # Set this to False here to stop processing other messages, we can revert on failure
             member.internal_is_in_guild = False
-            member.kick_count += 1
+            member.kick_count = await self.cache.increment_member_counter(
+                member.id, member.guild_id, MemberCounter.KICK_COUNTER
+            )
             log.debug(
                 "Attempting to ban Member(id=%s) from Guild(id=%s)",
                 message.author_id,
@@ -414,8 +439,17 @@ class Core:
             # i'd rather be explicit then implicit
             raise LogicError
 
-        # Store the updated values
-        await self.cache.set_member(member)
+        # Store the updated values, the counters have already
+        # been incremented in place so only write what isn't one
+        is_in_guild: bool = member.internal_is_in_guild
+
+        def store_is_in_guild(stored: Member) -> None:
+            stored.internal_is_in_guild = is_in_guild
+
+        member = await self.cache.update_member(
+            member.id, member.guild_id, store_is_in_guild
+        )
+        guild.members[member.id] = member
 
         # Delete the message if wanted
         if (
@@ -463,49 +497,100 @@ class Core:
             A reference time used to clean up
             past messages against
         channel_id : int
-            The channel to clean messages in
-            if this is set to per_channel
+            Unused, each expired message's own
+            channel is used when per_channel_spam is set
         guild: Guild
             The guild to use for options
         """
+        self._clean_up(member, current_time, guild)
+
+    def _clean_up(self, member: Member, current_time, guild: Guild) -> None:
+        """The body of clean_up, which can be used while updating a member"""
         log.debug(
             "Attempting to remove outdated message's on Member(id=%s) in Guild(id=%s)",
             member.id,
             member.guild_id,
         )
-        message_interval = self.options(guild).message_interval
-
-        def _is_still_valid(message_obj):
-            """
-            Given a message, figure out if it hasn't
-            expired yet based on timestamps
-            """
-            difference = current_time - message_obj.creation_time
-            offset = datetime.timedelta(milliseconds=message_interval)
-
-            if difference >= offset:
-                return False
-            return True
+        # Messages sent at or before this have expired
+        cutoff = current_time - datetime.timedelta(
+            milliseconds=self.options(guild).message_interval
+        )
 
         current_messages = []
         outstanding_messages = []
 
         for message in member.messages:
-            if _is_still_valid(message):
+            if message.creation_time > cutoff:
                 current_messages.append(message)
             else:
                 outstanding_messages.append(message)
 
         # TODO This might need to be deepcopied
         member.messages = current_messages
+        self._forget_messages(member, guild, outstanding_messages)
+
+    def _cap_window(self, member: Member, guild: Guild) -> None:
+        """
+        Remove messages from a member until they are within
+        :py:attr:`antispam.Options.max_messages_per_member` and
+        :py:attr:`antispam.Options.max_characters_per_member`
+
+        Messages which are not duplicates are removed first, then
+        duplicates, oldest first in both cases. The newest
+        ``message_duplicate_count`` messages are always kept
+        so spam can still be punished.
+        """
+        options = self.options(guild)
+        max_messages = options.max_messages_per_member
+        max_characters = options.max_characters_per_member
+        if max_messages is None and max_characters is None:
+            return
+
+        messages = member.messages
+        count = len(messages)
+        characters = (
+            sum(len(message.content) for message in messages)
+            if max_characters is not None
+            else 0
+        )
+
+        def is_over() -> bool:
+            return (max_messages is not None and count > max_messages) or (
+                max_characters is not None and characters > max_characters
+            )
+
+        if not is_over():
+            return
+
+        candidates = list(range(max(count - options.message_duplicate_count, 0)))
+        # Stable, so each group stays oldest first
+        candidates.sort(key=lambda index: messages[index].is_duplicate)
 
+        removed = set()
+        for index in candidates:
+            if not is_over():
+                break
+
+            removed.add(index)
+            count -= 1
+            characters -= len(messages[index].content)
+
+        member.messages = [m for i, m in enumerate(messages) if i not in removed]
+        self._forget_messages(
+            member, guild, [m for i, m in enumerate(messages) if i in removed]
+        )
+
+    def _forget_messages(self, member: Member, guild: Guild, messages) -> None:
+        """Update the duplicate counters for messages removed from a member"""
         # Now if we have outstanding messages we need
         # to process them and see if we need to decrement
         # the duplicate counter as we are removing them from
         # the queue otherwise everything stacks up
-        for outstanding_message in outstanding_messages:
+        for outstanding_message in messages:
             if outstanding_message.is_duplicate:
-                self._remove_duplicate_count(member, guild, channel_id)
+                self._remove_duplicate_count(
+                    member, guild, outstanding_message.channel_id
+                )
                 log.debug(
                     "Removing duplicate message(%s) from Member(id=%s) in Guild(id=%s)",
                     outstanding_message.id,
@@ -528,23 +613,57 @@ class Core:
         """
         Calculates a messages relation to other messages
         """
+        per_channel_spam = self.options(guild).per_channel_spam
+        sketch_length = self.options(guild).sketch_content_length
+        accuracy = self.options(guild).message_duplicate_accuracy
+        use_simhash = self.options(guild).use_simhash
+        # Only then is content a fingerprint, members can send anything
+        fingerprinted = not self.options(guild).store_message_content
+        if use_simhash:
+            message_simhash = create_simhash(message.content, fingerprinted)
+            threshold = distance_threshold(accuracy)
+
+        # Identical content always has the same ratio, so it is only computed once
+        identical_ratio = None
         for message_obj in member.messages:
             # This calculates the relation to each other
-            if message == message_obj:
+            if message_obj.id == message.id and message_obj == message:
                 raise DuplicateObject
 
-            elif (
-                self.options(guild).per_channel_spam
-                and message.channel_id != message_obj.channel_id
-            ):
+            elif per_channel_spam and message.channel_id != message_obj.channel_id:
                 # This user's spam should only be counted per channel
                 # and these messages are in different channel
                 continue
 
-            elif (
-                fuzz.token_sort_ratio(message.content, message_obj.content)
-                >= self.options(guild).message_duplicate_accuracy
-            ):
+            if use_simhash:
+                other_simhash = create_simhash(message_obj.content, fingerprinted)
+                is_similar = (
+                    message_simhash is not None
+                    and other_simhash is not None
+                    and hamming_distance(message_simhash, other_simhash) <= threshold
+                )
+            else:
+                if message_obj.content == message.content:
+                    if identical_ratio is None:
+                        identical_ratio = similarity(
+                            message.content,
+                            message.content,
+                            sketch_length,
+                            fingerprinted=fingerprinted,
+                        )
+
+                    ratio = identical_ratio
+                else:
+                    ratio = similarity(
+                        message.content,
+                        message_obj.content,
+                        sketch_length,
+                        fingerprinted=fingerprinted,
+                    )
+
+                is_similar = ratio >= accuracy
+
+            if is_similar:
                 """
                 The handler works off an internal message duplicate counter
                 so just increment that and then let our logic process it later
@@ -24,7 +24,7 @@ import datetime
 
 import attr
 
-from antispam.util import get_aware_time
+from antispam.util import get_aware_time, intern_content
 
 
 @attr.s(slots=True)
@@ -35,6 +35,6 @@ class Message:
     channel_id: int = attr.ib()
     guild_id: int = attr.ib()
     author_id: int = attr.ib()
-    content: str = attr.ib()
+    content: str = attr.ib(converter=intern_content)
     creation_time: datetime.datetime = attr.ib(default=attr.Factory(get_aware_time))
     is_duplicate: bool = attr.ib(default=False)
@@ -235,6 +235,54 @@ class Options:
         Track spam as per channel, rather then per guild.
         I.e. False implies spam is tracked as ``Per Member Per Guild``
         True implies ``Per Member Per Channel``
+    max_messages_per_member : int
+        Default: ``None``
+
+        The most messages to keep per member within ``message_interval``,
+        every new message is compared against each kept message.
+        Once over, messages which are not duplicates are discarded
+        first, then duplicates, oldest first.
+
+        The newest ``message_duplicate_count`` messages are always kept
+        so spam can still be punished, discarded duplicates
+        count towards ``message_duplicate_count`` no longer.
+    max_characters_per_member : int
+        Default: ``None``
+
+        The most characters of message content to keep per member,
+        messages are discarded as with ``max_messages_per_member``.
+    sketch_content_length : int
+        Default: ``None``
+
+        Messages with content longer than this are compared using
+        bounded size sketches rather than fuzzy matching, see
+        :py:func:`antispam.fingerprint.sketch_similarity`
+
+        This stops very long messages, such as those from embeds,
+        being expensive to compare. Sketches can disagree with fuzzy
+        matching for messages close to ``message_duplicate_accuracy``
+    use_simhash : bool
+        Default: ``False``
+
+        Compare messages using SimHashes rather than fuzzy matching,
+        see :py:func:`antispam.simhash.create_simhash`
+
+        Comparisons are a constant cost regardless of message length,
+        with ``message_duplicate_accuracy`` mapped to how many bits
+        may differ by :py:func:`antispam.simhash.distance_threshold`.
+        Decisions can differ from fuzzy matching for messages close
+        to ``message_duplicate_accuracy``, ``sketch_content_length``
+        is ignored when this is ``True``
+    store_message_content : bool
+        Default: ``True``
+
+        Whether to store the content of each message. If ``False``,
+        only a compact fingerprint of the content and its length
+        is stored, see :py:func:`antispam.fingerprint.create_fingerprint`
+
+        Duplicate detection is unchanged for messages with short content,
+        however, transcripts from :py:class:`antispam.plugins.AdminLogs`
+        will only include the time and length of each message.
     addons : Dict
         Default: ``Empty Dict``
 
@@ -400,6 +448,25 @@ class Options:
         default=False, validator=attr.validators.instance_of(bool)
     )  # False implies per_user_per_guild
 
+    max_messages_per_member: int = attr.ib(
+        default=None,
+        validator=attr.validators.optional(attr.validators.instance_of(int)),
+    )
+    max_characters_per_member: int = attr.ib(
+        default=None,
+        validator=attr.validators.optional(attr.validators.instance_of(int)),
+    )
+    sketch_content_length: int = attr.ib(
+        default=None,
+        validator=attr.validators.optional(attr.validators.instance_of(int)),
+    )
+    use_simhash: bool = attr.ib(
+        default=False, validator=attr.validators.instance_of(bool)
+    )
+    store_message_content: bool = attr.ib(
+        default=True, validator=attr.validators.instance_of(bool)
+    )
+
     # TODO Implement this
     # Catches 5 people saying the same thing
     is_per_channel_per_guild: bool = attr.ib(
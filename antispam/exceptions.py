@@ -99,3 +99,7 @@ class ExistingEntry(BaseASHException):
 
 class NonExistentEntry(BaseASHException):
     """No entry found in the timed cache with this key."""
+
+
+class CacheFull(BaseASHException):
+    """The cache has no space left to store this object."""
@@ -0,0 +1,240 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from antispam.dataclasses import Guild, Member, Options
+from antispam.exceptions import GuildNotFound, MemberNotFound
+from antispam.util import get_aware_time
+
+if TYPE_CHECKING:
+    from antispam import AntiSpamHandler
+
+log = logging.getLogger(__name__)
+
+
+class ExpiryScheduler:
+    """
+    Removes expired messages from members who have stopped
+    sending messages, on schedule rather than waiting for
+    their next message or a full :py:meth:`antispam.AntiSpamHandler.clean_cache`
+
+    Members are kept in a heap keyed by when their oldest
+    message expires, so each expiry costs O(log n) and
+    idle members are never scanned.
+
+    Available as ``AntiSpamHandler.expiry``, nothing is
+    scheduled until :py:meth:`ExpiryScheduler.start` is called.
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler instance
+    """
+
+    def __init__(self, handler: AntiSpamHandler):
+        self.handler: AntiSpamHandler = handler
+
+        # (expires_at timestamp, guild_id, member_id)
+        self._heap: List[Tuple[float, int, int]] = []
+        # The deadline currently scheduled per member, heap
+        # entries which don't match this are stale and skipped
+        self._deadlines: Dict[Tuple[int, int], float] = {}
+        # The options of each guild as last scheduled, so expiring
+        # a member never requires reading their whole guild. Only
+        # kept while the guild has members scheduled
+        self._options: Dict[int, Options] = {}
+        self._scheduled: Dict[int, int] = {}
+
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def start(self) -> None:
+        """Start expiring members in the background."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop expiring members and forget everything scheduled."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+        self._heap = []
+        self._deadlines = {}
+        self._options = {}
+        self._scheduled = {}
+
+    def schedule(
+        self, guild: Guild, member_id: int, oldest_message: datetime.datetime
+    ) -> None:
+        """
+        Schedule a member to be cleaned once
+        their oldest message expires.
+
+        Parameters
+        ----------
+        guild: Guild
+            The guild the member is in
+        member_id: int
+            The member to clean
+        oldest_message: datetime.datetime
+            When the member's oldest message was sent
+
+        Notes
+        -----
+        This does nothing while the scheduler is not running.
+        """
+        if not self.is_running:
+            return
+
+        key = (guild.id, member_id)
+        deadline: float = (
+            oldest_message.timestamp() + guild.options.message_interval / 1000
+        )
+        current: Optional[float] = self._deadlines.get(key)
+        if current is not None:
+            # Always expire using the latest options
+            self._options[guild.id] = guild.options
+            if current <= deadline:
+                # The earlier run will reschedule as required
+                return
+
+        else:
+            self._options[guild.id] = guild.options
+            self._scheduled[guild.id] = self._scheduled.get(guild.id, 0) + 1
+
+        self._deadlines[key] = deadline
+        if not self._heap or deadline < self._heap[0][0]:
+            self._wakeup.set()
+
+        heapq.heappush(self._heap, (deadline, guild.id, member_id))
+
+    async def run_due(self, now: Optional[datetime.datetime] = None) -> int:
+        """
+        Clean every member whose oldest message has expired.
+
+        Parameters
+        ----------
+        now: Optional[datetime.datetime]
+            The time to expire against,
+            defaults to the current time
+
+        Returns
+        -------
+        int
+            How many members were cleaned
+        """
+        now = now or get_aware_time()
+        timestamp: float = now.timestamp()
+        cleaned: int = 0
+        while self._heap and self._heap[0][0] <= timestamp:
+            deadline, guild_id, member_id = heapq.heappop(self._heap)
+            key = (guild_id, member_id)
+            if self._deadlines.get(key) != deadline:
+                continue
+
+            del self._deadlines[key]
+            try:
+                await self._expire(guild_id, member_id, now)
+            except Exception:
+                log.exception(
+                    "Failed to expire Member(id=%s) in Guild(id=%s)",
+                    member_id,
+                    guild_id,
+                )
+            finally:
+                # Any reschedule has been counted by now
+                self._unschedule(guild_id)
+
+            cleaned += 1
+
+        return cleaned
+
+    def _unschedule(self, guild_id: int) -> None:
+        remaining: int = self._scheduled.get(guild_id, 0) - 1
+        if remaining > 0:
+            self._scheduled[guild_id] = remaining
+            return
+
+        # Options may change before the guild is next scheduled
+        self._scheduled.pop(guild_id, None)
+        self._options.pop(guild_id, None)
+
+    async def _expire(
+        self, guild_id: int, member_id: int, now: datetime.datetime
+    ) -> None:
+        cache = self.handler.cache
+        guild = Guild(
+            id=guild_id, options=self._options.get(guild_id, self.handler.options)
+        )
+        try:
+            # Don't create members which have since been removed
+            await cache.get_member(member_id, guild_id)
+        except (MemberNotFound, GuildNotFound):
+            return
+
+        def expire(stored: Member) -> None:
+            self.handler.core._clean_up(stored, now, guild)
+
+        # Cleaned as stored, so messages propagated meanwhile aren't lost
+        member: Member = await cache.update_member(member_id, guild_id, expire)
+
+        log.debug(
+            "Expired messages for Member(id=%s) in Guild(id=%s)", member_id, guild_id
+        )
+        if member.messages:
+            self.schedule(guild, member_id, member.messages[0].creation_time)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            timeout: Optional[float] = None
+            if self._heap:
+                timeout = max(self._heap[0][0] - get_aware_time().timestamp(), 0)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            await self.run_due()
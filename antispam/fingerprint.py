@@ -0,0 +1,210 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import functools
+import heapq
+import re
+from typing import FrozenSet, Optional, Tuple
+
+from thefuzz import fuzz, utils
+
+FINGERPRINT_SIZE = 64
+"""The most characters of sorted tokens a fingerprint keeps."""
+SKETCH_SIZE = 128
+"""The most shingles a sketch keeps."""
+SHINGLE_SIZE = 5
+"""The characters within each shingle of a sketch."""
+
+# A unicode noncharacter, which never appears within real content
+_MARKER = "\ufdd0"
+_FINGERPRINT = re.compile(f"^{_MARKER}(\\d+){_MARKER}(.*)$", re.DOTALL)
+
+
+def create_fingerprint(content: str, size: int = FINGERPRINT_SIZE) -> str:
+    """
+    Reduce message content to a compact similarity fingerprint,
+    as stored when :py:attr:`antispam.Options.store_message_content`
+    is ``False``.
+
+    The fingerprint is the content processed and token sorted as
+    ``fuzz.token_sort_ratio`` does, truncated to ``size`` characters,
+    along with the length of the untruncated form.
+
+    Parameters
+    ----------
+    content: str
+        The message content
+    size: int
+        The most characters of sorted tokens to keep
+
+    Returns
+    -------
+    str
+        The fingerprint, which can be compared using :py:func:`similarity`
+    """
+    tokens: str = " ".join(
+        sorted(utils.full_process(content, force_ascii=True).split())
+    )
+    return f"{_MARKER}{len(tokens)}{_MARKER}{tokens[:size]}"
+
+
+def parse_fingerprint(content: str) -> Optional[Tuple[int, str]]:
+    """
+    Split a fingerprint into its length and sorted tokens.
+
+    Parameters
+    ----------
+    content: str
+        The message content
+
+    Returns
+    -------
+    Optional[Tuple[int, str]]
+        ``None`` if the content is not a fingerprint
+    """
+    match = _FINGERPRINT.match(content)
+    if match is None:
+        return None
+
+    return int(match.group(1)), match.group(2)
+
+
+@functools.lru_cache(maxsize=1024)
+def create_sketch(content: str, size: int = SKETCH_SIZE) -> Tuple[int, FrozenSet[int]]:
+    """
+    Reduce message content to a bounded size sketch, as used
+    for content longer than :py:attr:`antispam.Options.sketch_content_length`
+
+    The content is processed and token sorted as ``fuzz.token_sort_ratio``
+    does, split into overlapping shingles of :py:data:`SHINGLE_SIZE`
+    characters and only the ``size`` smallest shingle hashes are kept.
+
+    Sketches use the builtin ``hash`` and so are only
+    comparable within the process which created them.
+
+    Parameters
+    ----------
+    content: str
+        The message content
+    size: int
+        The most shingles to keep
+
+    Returns
+    -------
+    Tuple[int, FrozenSet[int]]
+        The length of the sorted tokens and the kept shingle hashes
+    """
+    tokens: str = " ".join(
+        sorted(utils.full_process(content, force_ascii=True).split())
+    )
+    shingles = {
+        hash(tokens[i : i + SHINGLE_SIZE])
+        for i in range(max(len(tokens) - SHINGLE_SIZE + 1, 1))
+    }
+    return len(tokens), frozenset(heapq.nsmallest(size, shingles))
+
+
+def sketch_similarity(first: str, second: str) -> int:
+    """
+    How similar two message contents are out of 100, estimated
+    from their sketches. See :py:func:`create_sketch`
+
+    The cost of this does not grow with the length of either
+    content once both have been sketched, unlike ``fuzz.token_sort_ratio``
+    """
+    first_length, first_sketch = create_sketch(first)
+    second_length, second_sketch = create_sketch(second)
+    if not first_length or not second_length:
+        # Matches fuzz, which doesn't consider empty content similar
+        return 0
+
+    # The smallest hashes of both contents combined are a sample of
+    # every shingle, the fraction of those found within both estimates
+    # how much of their shingles the contents share
+    sample = heapq.nsmallest(
+        max(len(first_sketch), len(second_sketch)), first_sketch | second_sketch
+    )
+    shared: float = sum(
+        1 for shingle in sample if shingle in first_sketch and shingle in second_sketch
+    ) / len(sample)
+
+    # As a ratio of matches to both lengths, like fuzz
+    ratio: int = int(round(200 * shared / (1 + shared)))
+    bound: int = int(
+        round(200 * min(first_length, second_length) / (first_length + second_length))
+    )
+    return min(ratio, bound)
+
+
+def similarity(
+    first: str,
+    second: str,
+    sketch_length: Optional[int] = None,
+    *,
+    fingerprinted: bool = False,
+) -> int:
+    """
+    How similar two message contents are out of 100. When
+    ``fingerprinted`` is ``True`` either may be a fingerprint from
+    :py:func:`create_fingerprint`, otherwise both are plain content.
+    Content is never treated as a fingerprint unless ``fingerprinted``
+    is set, as members could otherwise send one to evade detection.
+
+    Plain content is compared with ``fuzz.token_sort_ratio``, unless
+    either is longer than ``sketch_length`` in which case it is compared
+    using :py:func:`sketch_similarity`. Otherwise
+    both are compared as fingerprints, which gives the same result unless
+    either was truncated. Truncated fingerprints are then also bounded
+    by how different their lengths are, so a long message isn't treated
+    as identical to a short one which happens to share its first tokens.
+    """
+    first_fingerprint = parse_fingerprint(first) if fingerprinted else None
+    second_fingerprint = parse_fingerprint(second) if fingerprinted else None
+    if first_fingerprint is None and second_fingerprint is None:
+        if sketch_length is not None and max(len(first), len(second)) > sketch_length:
+            return sketch_similarity(first, second)
+
+        return fuzz.token_sort_ratio(first, second)
+
+    # Plain content is truncated like the fingerprint it is compared to
+    if first_fingerprint is None:
+        first_fingerprint = parse_fingerprint(
+            create_fingerprint(first, max(FINGERPRINT_SIZE, len(second_fingerprint[1])))
+        )
+    elif second_fingerprint is None:
+        second_fingerprint = parse_fingerprint(
+            create_fingerprint(second, max(FINGERPRINT_SIZE, len(first_fingerprint[1])))
+        )
+
+    first_length, first_tokens = first_fingerprint
+    second_length, second_tokens = second_fingerprint
+    if first_length == len(first_tokens) and second_length == len(second_tokens):
+        return fuzz.token_sort_ratio(first_tokens, second_tokens)
+
+    # Fingerprints may be truncated to different sizes, such as by a cache
+    size: int = min(len(first_tokens), len(second_tokens))
+    ratio: int = fuzz.token_sort_ratio(first_tokens[:size], second_tokens[:size])
+    # Two strings can only be as similar as their lengths allow
+    bound: int = int(
+        round(200 * min(first_length, second_length) / (first_length + second_length))
+    )
+    return min(ratio, bound)
@@ -20,7 +20,7 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
-from typing import Any
+from typing import Any, Callable, Optional
 
 from antispam import AntiSpamHandler
 from antispam.dataclasses import Guild, Member
@@ -117,23 +117,56 @@ class PluginCache:
         Silently creates the required
         Guild / Member objects as needed
         """
-        try:
-            guild = await self.cache.get_guild(guild_id=guild_id)
-        except GuildNotFound:
-            # Create the guild, and store it
-            guild = Guild(id=guild_id, options=self.handler.options)
-            guild.members[member_id] = Member(id=member_id, guild_id=guild_id)
-            await self.cache.set_guild(guild)
 
-        # Get/create the member
-        try:
-            member = guild.members[member_id]
-        except KeyError:
-            member = Member(id=member_id, guild_id=guild_id)
+        def store(member: Member) -> None:
+            member.addons[self.key] = addon_data
+
+        await self.cache.update_member(member_id, guild_id, store)
+
+    async def update_member_data(
+        self, member_id: int, guild_id: int, fn: Callable[[Optional[Any]], Any]
+    ) -> Any:
+        """
+        Replaces a member's data with the result of ``fn``
+        in a single atomic operation, rather than calling
+        :py:meth:`get_member_data` then :py:meth:`set_member_data`
+
+        .. code-block:: python
+            :linenos:
+
+            count = await plugin_cache.update_member_data(
+                member_id, guild_id, lambda current: (current or 0) + 1
+            )
+
+        Parameters
+        ----------
+        member_id : int
+            The user's id to update
+        guild_id : int
+            The guild this user is in
+        fn : Callable[[Optional[Any]], Any]
+            Given the currently stored data, or None
+            if there is none, returns the data to store
+
+        Returns
+        -------
+        Any
+            The data now stored
+
+        Notes
+        -----
+        Silently creates the required
+        Guild / Member objects as needed
+
+        ``fn`` may be called more than once, so it should
+        return new data rather than modifying what it is given.
+        """
+
+        def update(member: Member) -> None:
+            member.addons[self.key] = fn(member.addons.get(self.key))
 
-        member.addons[self.key] = addon_data
-        guild.members[member_id] = member
-        await self.cache.set_member(member)
+        member: Member = await self.cache.update_member(member_id, guild_id, update)
+        return member.addons[self.key]
 
     async def get_guild_data(self, guild_id: int) -> Any:
         """
@@ -28,6 +28,7 @@ from typing import Any, Union, Callable, Optional
 from antispam import AntiSpamHandler, CorePayload, LogicError
 from antispam.base_plugin import BasePlugin
 from antispam.dataclasses import Guild, Member
+from antispam.fingerprint import parse_fingerprint
 
 log = logging.getLogger(__name__)
 
@@ -72,6 +73,10 @@ class AdminLogs(BasePlugin):
         This will save transcripts for *every* punishment,
         but it only sends ones to discord if the Guild
         has a log_channel_id set.
+
+        When :py:attr:`antispam.Options.store_message_content`
+        is ``False`` for the Guild, transcripts are still saved
+        but only include the time and length of each message.
         """
         super().__init__(is_pre_invoke=False)
 
@@ -168,13 +173,18 @@ class AdminLogs(BasePlugin):
             )
 
             # Write each message to the file
+            fingerprinted: bool = not guild.options.store_message_content
             for message in member.messages:
                 if not message.is_duplicate:
                     # Only write out duplicate messages
                     continue
 
+                content: str = message.content
+                parsed = parse_fingerprint(content) if fingerprinted else None
+                if parsed is not None:
+                    content = f"Content not stored ({parsed[0]} characters)"
                 f.write(
-                    f"{message.creation_time.strftime('%I:%M:%S %p, %d/%m/%Y')} | {message.content}\n-----\n"
+                    f"{message.creation_time.strftime('%I:%M:%S %p, %d/%m/%Y')} | {content}\n-----\n"
                 )
 
         log.debug(
@@ -27,7 +27,7 @@ import typing
 from antispam import AntiSpamHandler
 from antispam.abc import Lib
 from antispam.base_plugin import BasePlugin
-from antispam.dataclasses import CorePayload, Member
+from antispam.dataclasses import CorePayload
 from antispam.exceptions import (
     GuildAddonNotFound,
     GuildNotFound,
@@ -188,24 +188,8 @@ class AntiSpamTracker(BasePlugin):
         timestamp = get_aware_time()
 
         # We now need to increase their cache
-        try:
-            addon_data = await self.member_tracking.get_member_data(
-                member_id=member_id, guild_id=guild_id
-            )
-
-        except (MemberNotFound, GuildNotFound):
-            # Store the new member
-            member = Member(id=member_id, guild_id=guild_id)
-            await self.anti_spam_handler.cache.set_member(member)
-            addon_data = []
-
-        except MemberAddonNotFound:
-            # Member exists, just an addon doesnt
-            addon_data = []
-
-        addon_data.append(timestamp)
-        await self.member_tracking.set_member_data(
-            member_id, guild_id, addon_data=addon_data
+        await self.member_tracking.update_member_data(
+            member_id, guild_id, lambda timestamps: [*(timestamps or []), timestamp]
         )
 
         log.debug("Cache updated for Member(id=%s) in Guild(id%s)", member_id, guild_id)
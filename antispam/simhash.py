@@ -0,0 +1,123 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import functools
+import math
+from typing import Optional
+
+from thefuzz import utils
+
+from antispam.fingerprint import parse_fingerprint
+
+SIMHASH_BITS = 64
+"""The bits within each SimHash."""
+SHINGLE_SIZE = 3
+"""The characters within each shingle of a SimHash."""
+
+_MASK = (1 << SIMHASH_BITS) - 1
+_TOP = 1 << SIMHASH_BITS
+
+
+@functools.lru_cache(maxsize=4096)
+def create_simhash(content: str, fingerprinted: bool = False) -> Optional[int]:
+    """
+    Create a SimHash of message content, as used when
+    :py:attr:`antispam.Options.use_simhash` is ``True``
+
+    The content is processed and token sorted as ``fuzz.token_sort_ratio``
+    does and split into overlapping shingles of :py:data:`SHINGLE_SIZE`
+    characters. Each bit of the SimHash is set if it is set within
+    the hash of most shingles, so similar content has similar bits.
+
+    SimHashes use the builtin ``hash`` and so are only
+    comparable within the process which created them.
+
+    Parameters
+    ----------
+    content: str
+        The message content
+    fingerprinted: bool
+        Whether the content may be a fingerprint from
+        :py:func:`antispam.fingerprint.create_fingerprint`,
+        as when :py:attr:`antispam.Options.store_message_content`
+        is ``False``. Otherwise it is always treated as plain content.
+
+    Returns
+    -------
+    Optional[int]
+        The SimHash, ``None`` if the content has nothing to compare
+    """
+    fingerprint = parse_fingerprint(content) if fingerprinted else None
+    if fingerprint is not None:
+        tokens: str = fingerprint[1]
+    else:
+        tokens: str = " ".join(
+            sorted(utils.full_process(content, force_ascii=True).split())
+        )
+
+    if not tokens:
+        # Matches fuzz, which doesn't consider empty content similar
+        return None
+
+    # Every shingle hash as bits, so each bit can be counted in one go
+    bits: str = "".join(
+        [
+            # The top bit keeps leading zeros, then is sliced off with 0b
+            bin(hash(tokens[i : i + SHINGLE_SIZE]) & _MASK | _TOP)[3:]
+            for i in range(max(len(tokens) - SHINGLE_SIZE + 1, 1))
+        ]
+    )
+    majority: int = len(bits) // SIMHASH_BITS // 2
+    simhash: int = 0
+    for bit in range(SIMHASH_BITS):
+        if bits[bit::SIMHASH_BITS].count("1") > majority:
+            simhash |= 1 << (SIMHASH_BITS - 1 - bit)
+
+    return simhash
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """How many bits differ between two SimHashes"""
+    return bin(first ^ second).count("1")
+
+
+def distance_threshold(accuracy: int) -> int:
+    """
+    The most bits two SimHashes can differ by to be
+    considered duplicates at the given accuracy.
+
+    The chance of a bit differing is proportional to the angle
+    between the shingles of both contents, so the threshold is
+    the distance at which that angle's cosine falls below accuracy.
+
+    Parameters
+    ----------
+    accuracy: int
+        :py:attr:`antispam.Options.message_duplicate_accuracy`, out of 100
+
+    Returns
+    -------
+    int
+        The distance threshold
+    """
+    accuracy = min(max(accuracy, 0), 100)
+    return int(SIMHASH_BITS * math.acos(accuracy / 100) / math.pi)
@@ -0,0 +1,248 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2020-Current Skelmis
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+import attr
+
+from antispam.dataclasses import Guild, Member
+from antispam.exceptions import GuildNotFound
+from antispam.factory import FactoryBuilder
+from antispam.util import get_aware_time
+
+if TYPE_CHECKING:
+    from antispam import AntiSpamHandler
+
+log = logging.getLogger(__name__)
+
+
+def should_keep_member(member: Member, strict: bool) -> bool:
+    """
+    Whether a member, with expired messages already
+    removed, still holds state worth caching.
+
+    Members with messages are kept in either mode, as
+    are those with any counters or addons.
+    """
+    if strict and len(member.messages) != 0:
+        return True
+
+    return (
+        len(member.messages) != 0
+        or member.kick_count != 0
+        or member.warn_count != 0
+        or member.duplicate_counter != 1
+        or bool(member.duplicate_channel_counter_dict)
+        or bool(member.addons)
+    )
+
+
+def is_guild_configured(
+    guild: Guild, has_members: bool, handler: AntiSpamHandler
+) -> bool:
+    """Whether a guild has custom options, a log channel or any members."""
+    return (
+        guild.options != handler.options
+        or guild.log_channel_id is not None
+        or has_members
+    )
+
+
+def should_keep_guild(
+    guild: Guild, has_members: bool, handler: AntiSpamHandler, strict: bool
+) -> bool:
+    """
+    Whether a guild still holds state worth caching.
+
+    Guilds with addons are kept in either mode, however,
+    :py:meth:`antispam.AntiSpamHandler.clean_cache` only keeps their
+    addons in strict mode if they aren't otherwise configured.
+    """
+    return is_guild_configured(guild, has_members, handler) or bool(guild.addons)
+
+
+@attr.s(slots=True)
+class SweepProgress:
+    """How far a :py:class:`CacheSweeper` has got."""
+
+    #: Full passes over the cache completed
+    passes: int = attr.ib(default=0)
+    #: Guilds looked at within the current pass
+    guilds_swept: int = attr.ib(default=0)
+    #: Totals since the sweeper was created
+    members_removed: int = attr.ib(default=0)
+    guilds_removed: int = attr.ib(default=0)
+    #: How long the last tick took, in seconds
+    last_tick_duration: float = attr.ib(default=0.0)
+
+
+class CacheSweeper:
+    """
+    Cleans the cache a few guilds at a time in the background,
+    using the same criteria as
+    :py:meth:`antispam.AntiSpamHandler.clean_cache`.
+
+    Unlike ``clean_cache`` this never drops the cache, it
+    removes expired messages, members and guilds in place.
+
+    Parameters
+    ----------
+    handler: AntiSpamHandler
+        The AntiSpamHandler whose cache should be cleaned
+    guilds_per_tick: int
+        The most guilds to clean per tick.
+
+        Defaults to 50
+    time_budget: float
+        Stop a tick once it has taken this many seconds,
+        checked after each guild.
+
+        Defaults to 0.05
+    interval: float
+        How many seconds to wait between ticks.
+
+        Defaults to 1
+    strict: bool
+        See :py:meth:`antispam.AntiSpamHandler.clean_cache`
+
+        Defaults to False
+    """
+
+    def __init__(
+        self,
+        handler: AntiSpamHandler,
+        *,
+        guilds_per_tick: int = 50,
+        time_budget: float = 0.05,
+        interval: float = 1,
+        strict: bool = False,
+    ):
+        self.handler: AntiSpamHandler = handler
+        self.guilds_per_tick: int = guilds_per_tick
+        self.time_budget: float = time_budget
+        self.interval: float = interval
+        self.strict: bool = strict
+
+        self.progress: SweepProgress = SweepProgress()
+
+        self._guilds: Optional[AsyncIterator[Guild]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sweeping in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sweeping, any guild currently being cleaned is finished first."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+
+    async def tick(self) -> int:
+        """
+        Clean the next slice of guilds.
+
+        Returns
+        -------
+        int
+            How many guilds were cleaned
+        """
+        start = time.perf_counter()
+        swept: int = 0
+        while swept < self.guilds_per_tick:
+            if self._guilds is None:
+                self._guilds = self.handler.cache.get_all_guilds().__aiter__()
+
+            try:
+                guild: Guild = await self._guilds.__anext__()
+            except StopAsyncIteration:
+                self._guilds = None
+                self.progress.passes += 1
+                self.progress.guilds_swept = 0
+                log.debug("Completed sweep %s of the cache", self.progress.passes)
+                break
+
+            await self._sweep_guild(guild)
+            swept += 1
+            self.progress.guilds_swept += 1
+
+            if time.perf_counter() - start >= self.time_budget:
+                break
+
+        self.progress.last_tick_duration = time.perf_counter() - start
+        return swept
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                log.exception("Sweeping the cache failed, restarting the pass")
+                self._guilds = None
+
+            await asyncio.sleep(self.interval)
+
+    async def _sweep_guild(self, guild: Guild) -> None:
+        cache = self.handler.cache
+        now = get_aware_time()
+        removed: int = 0
+        for member in list(guild.members.values()):
+            message_count: int = len(member.messages)
+            FactoryBuilder.clean_old_messages(member, now, self.handler.options)
+            if len(member.messages) == message_count and should_keep_member(
+                member, self.strict
+            ):
+                continue
+
+            # Propagates can run meanwhile, so clean the member as stored
+            # rather than writing this snapshot of it back over them
+            def clean(stored: Member) -> None:
+                FactoryBuilder.clean_old_messages(stored, now, self.handler.options)
+
+            stored: Member = await cache.update_member(member.id, guild.id, clean)
+            if not should_keep_member(stored, self.strict):
+                await cache.delete_member(member.id, guild.id)
+                removed += 1
+
+        self.progress.members_removed += removed
+
+        try:
+            guild = await cache.get_guild(guild.id)
+        except GuildNotFound:
+            return
+
+        if not should_keep_guild(guild, bool(guild.members), self.handler, self.strict):
+            await cache.delete_guild(guild.id)
+            self.progress.guilds_removed += 1
@@ -21,8 +21,86 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 import datetime
+import json
+import weakref
+from typing import Any
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
 
 
 def get_aware_time() -> datetime.datetime:
     """Used to get an aware datetime"""
     return datetime.datetime.now(datetime.timezone.utc)
+
+
+class _Content(str):
+    """Message content which the interning pool can refer to weakly"""
+
+    __slots__ = ("__weakref__",)
+
+
+# Keyed by hash so the pool itself never keeps content alive
+_contents: "weakref.WeakValueDictionary[int, _Content]" = weakref.WeakValueDictionary()
+
+
+def intern_content(content: Any) -> Any:
+    """
+    Share one copy of each distinct message content.
+
+    During raids thousands of members post the same content,
+    shared content is stored once and freed once no message
+    refers to it. A string also caches its hash, so the shared
+    copy is only ever hashed once.
+
+    Unlike ``sys.intern``, which makes strings immortal from
+    Python 3.12, content members choose is never kept
+    around for the life of the process.
+    """
+    # Subclasses of str, including shared content, are kept as is
+    if type(content) is not str:
+        return content
+
+    key = hash(content)
+    shared = _contents.get(key)
+    if shared is not None and shared == content:
+        return shared
+
+    if shared is None:
+        shared = _Content(content)
+        _contents[key] = shared
+        return shared
+
+    # A different content with the same hash, too rare to share
+    return content
+
+
+def to_timestamp(value: datetime.datetime) -> int:
+    """Convert a datetime into integer microseconds since the epoch"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_timestamp(value: int) -> datetime.datetime:
+    """Convert integer microseconds since the epoch into an aware datetime"""
+    return EPOCH + datetime.timedelta(microseconds=value)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+
+    raise TypeError(f"Cannot store {type(value).__name__} as JSON")
+
+
+def dumps_json(value: Any) -> str:
+    """
+    Dump options and addons to JSON for caches with their own
+    storage format, sets become lists and datetimes ISO strings.
+    """
+    return json.dumps(value, default=_json_default)
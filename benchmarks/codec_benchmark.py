@@ -0,0 +1,63 @@
+"""
+Compares the encode/decode cost and payload size
+of the available cache codecs.
+
+Usage: python -m benchmarks.codec_benchmark
+"""
+import timeit
+
+from antispam import Options
+from antispam.caches.codecs import JsonCodec, MsgPackCodec
+from antispam.dataclasses import Guild, Member, Message
+
+ITERATIONS = 10_000
+
+
+def create_member(message_count: int) -> Member:
+    member = Member(1234567890123456, 987654321098765, warn_count=1)
+    for i in range(message_count):
+        member.messages.append(
+            Message(
+                id=1000000000000000 + i,
+                channel_id=555555555555555,
+                guild_id=member.guild_id,
+                author_id=member.id,
+                content=f"This is spam message number {i}",
+                is_duplicate=i % 2 == 0,
+            )
+        )
+
+    return member
+
+
+def main():
+    guild = Guild(987654321098765, Options(warn_threshold=4))
+    print(
+        "{:<14}|{:>10} |{:>12} |{:>12}".format(
+            "CODEC", "BYTES", "ENCODE (us)", "DECODE (us)"
+        )
+    )
+    print("{:-<14}|{:->11}|{:->13}|{:->13}".format("", "", "", ""))
+    for message_count in (0, 5, 25):
+        member = create_member(message_count)
+        for codec in (JsonCodec(), MsgPackCodec()):
+            for name, value, encode, decode in (
+                ("guild", guild, codec.encode_guild, codec.decode_guild),
+                ("member", member, codec.encode_member, codec.decode_member),
+            ):
+                payload = encode(value)
+                encode_time = timeit.timeit(lambda: encode(value), number=ITERATIONS)
+                decode_time = timeit.timeit(lambda: decode(payload), number=ITERATIONS)
+                print(
+                    "{:<14}|{:>10} |{:>12.2f} |{:>12.2f}".format(
+                        f"{codec.__class__.__name__[:-5]} {name}",
+                        len(payload),
+                        encode_time / ITERATIONS * 1_000_000,
+                        decode_time / ITERATIONS * 1_000_000,
+                    )
+                )
+        print(f"^ Member with {message_count} messages\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares storing full message content against storing
+only a fingerprint, as done when Options.store_message_content
+is False, for members whose messages came from embeds.
+
+Reports the encoded size of a member for each codec, the
+time to encode and decode it, and the memory used per member.
+
+Usage: python -m benchmarks.fingerprint_benchmark [content length]
+"""
+import sys
+import time
+import tracemalloc
+from typing import List
+
+from antispam.caches.codecs import JsonCodec, MsgPackCodec
+from antispam.dataclasses import Member, Message
+from antispam.fingerprint import create_fingerprint
+
+CONTENT_LENGTH = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+MESSAGES_PER_MEMBER = 10
+MEMBER_COUNT = 1_000
+ITERATIONS = 1_000
+
+WORDS = "raid title description field value footer author join nitro free".split()
+
+
+def create_content(seed: int) -> str:
+    # Unique content, so interning can't share it between messages
+    words: List[str] = [str(seed)]
+    while sum(len(word) + 1 for word in words) < CONTENT_LENGTH:
+        words.append(f"{WORDS[(seed + len(words)) % len(WORDS)]}{len(words)}")
+    return " ".join(words)[:CONTENT_LENGTH]
+
+
+def create_member(member_id: int, fingerprint: bool) -> Member:
+    member = Member(member_id, 1)
+    for message_id in range(MESSAGES_PER_MEMBER):
+        content = create_content(member_id * MESSAGES_PER_MEMBER + message_id)
+        if fingerprint:
+            content = create_fingerprint(content)
+        member.messages.append(Message(message_id, 1, 1, member_id, content))
+    return member
+
+
+def main():
+    print(f"{MESSAGES_PER_MEMBER} messages of {CONTENT_LENGTH} characters per member")
+    print(
+        "{:<12}|{:>13}|{:>14}|{:>14}|{:>14}|{:>12}".format(
+            "STORAGE", "CODEC", "BYTES", "ENCODE (us)", "DECODE (us)", "MEMORY (KiB)"
+        )
+    )
+    for name, fingerprint in (("Content", False), ("Fingerprint", True)):
+        tracemalloc.start()
+        members = [create_member(i, fingerprint) for i in range(MEMBER_COUNT)]
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        member = members[0]
+        for codec in (JsonCodec(), MsgPackCodec()):
+            start = time.perf_counter()
+            for _ in range(ITERATIONS):
+                data = codec.encode_member(member)
+            encode = (time.perf_counter() - start) / ITERATIONS
+
+            start = time.perf_counter()
+            for _ in range(ITERATIONS):
+                codec.decode_member(data)
+            decode = (time.perf_counter() - start) / ITERATIONS
+
+            print(
+                f"{name:<12}|{codec.__class__.__name__:>13}|{len(data):>14}"
+                f"|{encode * 1_000_000:>14.1f}|{decode * 1_000_000:>14.1f}"
+                f"|{memory / MEMBER_COUNT / 1024:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures the memory MemoryCache uses during a raid, where
+every member posts the same content, with and without
+message content being interned.
+
+Contents are decoded by a codec, so each message starts
+with its own copy as it would when read from Redis or MongoDB.
+
+Usage: python -m benchmarks.interning_benchmark [member count]
+"""
+import asyncio
+import sys
+import tracemalloc
+from unittest.mock import Mock
+
+from antispam import Options
+from antispam.caches import MemoryCache
+from antispam.caches.codecs import JsonCodec
+from antispam.dataclasses import Member, Message
+
+MEMBER_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+MESSAGES_PER_MEMBER = 3
+CONTENT = "Join this totally legit server for free nitro discord.gg/raid " * 4
+
+
+async def run(interned: bool) -> int:
+    handler = Mock()
+    handler.options = Options()
+    codec = JsonCodec()
+
+    tracemalloc.start()
+    cache = MemoryCache(handler)
+    for member_id in range(MEMBER_COUNT):
+        member = Member(member_id, 1)
+        for message_id in range(MESSAGES_PER_MEMBER):
+            member.messages.append(Message(message_id, 1, 1, member_id, CONTENT))
+
+        member = codec.decode_member(codec.encode_member(member))
+        if not interned:
+            # Setting the attribute skips interning, giving each message a copy
+            for message in member.messages:
+                message.content = message.content[:-1] + message.content[-1]
+
+        await cache.set_member(member)
+
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+async def main():
+    print(
+        f"{MEMBER_COUNT} members each posting the same content {MESSAGES_PER_MEMBER} times"
+    )
+    for name, interned in (("Copied", False), ("Interned", True)):
+        size = await run(interned)
+        print(f"{name:<10}|{size / 1024 / 1024:>10.1f} MiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
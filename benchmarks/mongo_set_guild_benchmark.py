@@ -0,0 +1,118 @@
+"""
+Compares MongoCache.set_guild against the previous
+delete then upsert every member approach.
+
+This uses mongomock-motor as an in-process stand in,
+so it measures client side and per operation overhead
+rather than network latency. The number of requests
+sent to Mongo, each of which would be a round trip
+against a real server, is reported alongside. mongomock does not yet
+understand bulk operations from pymongo 4.11 onwards.
+
+Usage: python -m benchmarks.mongo_set_guild_benchmark [member count]
+"""
+import asyncio
+import sys
+import time
+from copy import deepcopy
+from unittest.mock import Mock
+
+from attr import asdict
+from mongomock_motor import AsyncMongoMockClient
+
+from antispam import Options
+from antispam.caches.mongo import MongoCache
+from antispam.caches.mongo.document import Document
+from antispam.dataclasses import Guild, Member, Message
+
+MEMBER_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+
+class CountingCollection:
+    """Counts every request made against a collection"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.requests: int = 0
+
+    def __getattr__(self, item):
+        attr = getattr(self._collection, item)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self.requests += 1
+            return attr(*args, **kwargs)
+
+        return call
+
+
+def requests_made(cache: MongoCache) -> int:
+    return cache.guilds._document.requests + cache.members._document.requests
+
+
+def create_cache() -> MongoCache:
+    handler = Mock()
+    handler.options = Options()
+    cache = MongoCache(handler, "mongodb://localhost:27017")
+
+    db = AsyncMongoMockClient()["antispam"]
+    cache.guilds = Document(db, "antispam_guilds", converter=Guild)
+    cache.members = Document(db, "antispam_members", converter=Member)
+    for document in (cache.guilds, cache.members):
+        document._document = CountingCollection(document._document)
+
+    return cache
+
+
+def create_guild() -> Guild:
+    guild = Guild(1, Options())
+    for i in range(MEMBER_COUNT):
+        guild.members[i] = Member(
+            i, guild.id, messages=[Message(i, 1, guild.id, i, "Hello world")]
+        )
+
+    return guild
+
+
+async def legacy_set_guild(cache: MongoCache, guild: Guild) -> None:
+    """How set_guild used to work"""
+    guild = deepcopy(guild)
+    await cache.members.delete({"guild_id": guild.id})
+
+    members = list(guild.members.values())
+    guild.members = {}
+
+    async def set_member(member: Member):
+        if not await cache.guilds.find({"id": member.guild_id}):
+            await cache.guilds.upsert({"id": member.guild_id}, asdict(guild))
+
+        await cache.members.upsert_custom(
+            {"id": member.id, "guild_id": member.guild_id},
+            asdict(member, recurse=True),
+        )
+
+    await asyncio.gather(*[set_member(m) for m in members])
+    await cache.guilds.upsert({"id": guild.id}, asdict(guild, recurse=True))
+
+
+async def main():
+    guild = create_guild()
+    for name, set_guild in (
+        ("legacy", legacy_set_guild),
+        ("bulk_write", lambda c, g: c.set_guild(g)),
+    ):
+        cache = create_cache()
+        for run in ("insert", "replace"):
+            requests = requests_made(cache)
+            start = time.perf_counter()
+            await set_guild(cache, guild)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:<11} {run:<8} {MEMBER_COUNT} members: "
+                f"{elapsed:.2f}s, {requests_made(cache) - requests} requests"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Measures SharedMemoryCache throughput as more processes,
+like one per group of shards, share it at the same time.
+
+Every process adds messages and increments counters for
+its own members within the same guilds, the totals are
+checked afterwards to confirm no update was lost. Members
+stay within the default messages_per_member for up to
+32,000 operations per process.
+
+Usage: python -m benchmarks.shared_memory_benchmark [operations per process]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+from unittest.mock import Mock
+
+from antispam import Options
+from antispam.caches import MemoryCache
+from antispam.caches.shared_memory import SharedMemoryCache
+from antispam.dataclasses import Message
+from antispam.enums import MemberCounter
+
+OPERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+MEMBERS_PER_PROCESS = 1_000
+GUILDS = 10
+NAME = "antispam-benchmark"
+
+
+def create_handler() -> Mock:
+    handler = Mock()
+    handler.options = Options(max_messages_per_member=16, store_message_content=False)
+    return handler
+
+
+async def work(cache, process: int) -> None:
+    for operation in range(OPERATIONS // 2):
+        member_id = process * MEMBERS_PER_PROCESS + operation % MEMBERS_PER_PROCESS
+        guild_id = operation % GUILDS
+        await cache.add_message(
+            Message(operation, 1, guild_id, member_id, "Hello world, this is spam")
+        )
+        await cache.increment_member_counter(
+            member_id, guild_id, MemberCounter.WARN_COUNTER
+        )
+
+
+def run_process(process: int, start) -> None:
+    async def run():
+        cache = SharedMemoryCache(create_handler(), NAME)
+        await cache.initialize()
+        start.wait()
+        await work(cache, process)
+        cache.close()
+
+    asyncio.run(run())
+
+
+async def main():
+    start = time.perf_counter()
+    await work(MemoryCache(create_handler()), 0)
+    elapsed = time.perf_counter() - start
+    print(f"{OPERATIONS} operations per process")
+    print("{:<20}|{:>15}|{:>15}".format("CACHE", "OPS / SECOND", "US / OP"))
+    print(
+        f"{'MemoryCache':<20}|{OPERATIONS / elapsed:>15,.0f}"
+        f"|{elapsed / OPERATIONS * 1_000_000:>15.2f}"
+    )
+
+    context = multiprocessing.get_context("spawn")
+    for processes in (1, 2, 4):
+        cache = SharedMemoryCache(create_handler(), NAME)
+        await cache.initialize()
+        # Left behind if an earlier run failed
+        await cache.drop()
+
+        barrier = context.Barrier(processes + 1)
+        workers = [
+            context.Process(target=run_process, args=(process, barrier))
+            for process in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        total = 0
+        async for guild in cache.get_all_guilds():
+            total += sum(member.warn_count for member in guild.members.values())
+        assert total == processes * (OPERATIONS // 2), "An update was lost"
+
+        print(
+            f"{f'Shared x{processes}':<20}|{processes * OPERATIONS / elapsed:>15,.0f}"
+            f"|{elapsed / OPERATIONS * 1_000_000:>15.2f}"
+        )
+        cache.unlink()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Calibrates SimHash comparisons, as used when Options.use_simhash
+is True, against fuzz.token_sort_ratio decisions.
+
+Pairs of chat style messages are recorded with a mix of typos,
+reordering, additions and unrelated content. For each accuracy,
+reports how often both agree on whether a pair is a duplicate
+using the threshold from distance_threshold, alongside the best
+threshold for this corpus. Also reports the time per comparison.
+
+Usage: python -m benchmarks.simhash_benchmark [pair count]
+"""
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from thefuzz import fuzz
+
+from antispam.simhash import create_simhash, distance_threshold, hamming_distance
+
+PAIR_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000
+ACCURACIES = (50, 60, 70, 80, 85, 90, 95, 100)
+
+WORDS = (
+    "hey hello the a is you free nitro join server click here lol what "
+    "why how good game gg ok discord gift steam claim"
+).split()
+CHARACTERS = "abcdefghijklmnopqrstuvwxyz "
+
+
+def create_message(rng: random.Random, length: int) -> str:
+    return " ".join(
+        rng.choice(WORDS) + (str(rng.randrange(100)) if rng.random() < 0.3 else "")
+        for _ in range(length)
+    )
+
+
+def create_pairs() -> List[Tuple[str, str]]:
+    rng = random.Random(0)
+    pairs: List[Tuple[str, str]] = []
+    for _ in range(PAIR_COUNT):
+        message = create_message(rng, rng.randrange(2, 30))
+        kind = rng.random()
+        if kind < 0.3:
+            # Typos
+            rate = rng.random() * 0.3
+            other = "".join(
+                rng.choice(CHARACTERS) if rng.random() < rate else character
+                for character in message
+            )
+        elif kind < 0.5:
+            words = message.split()
+            rng.shuffle(words)
+            other = " ".join(words)
+        elif kind < 0.7:
+            other = f"{message} {create_message(rng, rng.randrange(1, 5))}"
+        else:
+            other = create_message(rng, rng.randrange(2, 30))
+
+        pairs.append((message, other))
+
+    return pairs
+
+
+def agreement(ratios: List[int], distances: List[int], accuracy, threshold) -> float:
+    return sum(
+        (ratio >= accuracy) == (distance <= threshold)
+        for ratio, distance in zip(ratios, distances)
+    ) / len(ratios)
+
+
+def main():
+    pairs = create_pairs()
+    print(f"{len(pairs)} recorded pairs of messages")
+
+    start = time.perf_counter()
+    ratios = [fuzz.token_sort_ratio(first, second) for first, second in pairs]
+    ratio_time = (time.perf_counter() - start) / len(pairs)
+
+    start = time.perf_counter()
+    simhashes = [
+        (create_simhash(first), create_simhash(second)) for first, second in pairs
+    ]
+    create_time = (time.perf_counter() - start) / len(pairs) / 2
+
+    start = time.perf_counter()
+    distances = [
+        hamming_distance(first, second) if first is not None and second is not None
+        # Never considered duplicates
+        else 64
+        for first, second in simhashes
+    ]
+    distance_time = (time.perf_counter() - start) / len(pairs)
+
+    print(
+        "{:<10}|{:>11}|{:>11}|{:>11}|{:>11}".format(
+            "ACCURACY", "THRESHOLD", "AGREEMENT", "BEST", "AGREEMENT"
+        )
+    )
+    for accuracy in ACCURACIES:
+        threshold = distance_threshold(accuracy)
+        best = max(range(65), key=lambda t: agreement(ratios, distances, accuracy, t))
+        print(
+            f"{accuracy:<10}|{threshold:>11}"
+            f"|{agreement(ratios, distances, accuracy, threshold):>11.1%}"
+            f"|{best:>11}|{agreement(ratios, distances, accuracy, best):>11.1%}"
+        )
+
+    print(f"token_sort_ratio: {ratio_time * 1_000_000:.1f}us per comparison")
+    print(
+        f"SimHash: {create_time * 1_000_000:.1f}us per message, "
+        f"{distance_time * 1_000_000:.2f}us per comparison"
+    )
+
+
+if __name__ == "__main__":
+    main()
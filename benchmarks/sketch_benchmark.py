@@ -0,0 +1,96 @@
+"""
+Compares sketch scoring, as used for content longer than
+Options.sketch_content_length, against fuzz.token_sort_ratio
+for pairs of long messages with a varying amount of edits.
+
+Reports how often both agree on whether a pair is a duplicate
+at the default Options.message_duplicate_accuracy, and the time
+taken per comparison.
+
+Usage: python -m benchmarks.sketch_benchmark [content length]
+"""
+import random
+import sys
+import time
+from typing import Callable, List, Tuple
+
+from thefuzz import fuzz
+
+from antispam import Options
+from antispam.fingerprint import create_sketch, sketch_similarity
+
+CONTENT_LENGTH = int(sys.argv[1]) if len(sys.argv) > 1 else 4_000
+PAIRS = 400
+ACCURACY = Options().message_duplicate_accuracy
+
+WORDS = (
+    "raid title description field value footer author join nitro free "
+    "server invite click link gift claim limited offer steam event"
+).split()
+
+
+def create_content(rng: random.Random) -> List[str]:
+    words: List[str] = []
+    while sum(len(word) + 1 for word in words) < CONTENT_LENGTH:
+        words.append(f"{rng.choice(WORDS)}{rng.randrange(1_000)}")
+    return words
+
+
+def create_pairs() -> List[Tuple[str, str]]:
+    rng = random.Random(0)
+    pairs: List[Tuple[str, str]] = []
+    for i in range(PAIRS):
+        words = create_content(rng)
+        edited = list(words)
+        kind = i % 4
+        if kind == 0:
+            # Replace a fraction of the words, around the duplicate threshold
+            for index in rng.sample(
+                range(len(edited)), int(len(edited) * i / PAIRS / 2)
+            ):
+                edited[index] = f"{rng.choice(WORDS)}{rng.randrange(1_000)}"
+        elif kind == 1:
+            # Reordered, which token sorting ignores
+            rng.shuffle(edited)
+        elif kind == 2:
+            # Extended with more content
+            edited += create_content(rng)[: int(len(words) * i / PAIRS)]
+        else:
+            edited = create_content(rng)
+
+        pairs.append((" ".join(words), " ".join(edited)))
+
+    return pairs
+
+
+def run(pairs, scorer: Callable[[str, str], int]) -> Tuple[List[bool], float]:
+    start = time.perf_counter()
+    decisions = [scorer(first, second) >= ACCURACY for first, second in pairs]
+    return decisions, (time.perf_counter() - start) / len(pairs)
+
+
+def main():
+    pairs = create_pairs()
+    print(f"{len(pairs)} pairs of {CONTENT_LENGTH} character messages")
+
+    full, full_time = run(pairs, fuzz.token_sort_ratio)
+    create_sketch.cache_clear()
+    sketched, sketch_time = run(pairs, sketch_similarity)
+    # Sketches are cached per content, as they are for a member's window
+    cached, cached_time = run(pairs, sketch_similarity)
+    assert cached == sketched
+
+    agreement = sum(a == b for a, b in zip(full, sketched)) / len(pairs)
+    print("{:<16}|{:>14}|{:>12}".format("SCORER", "TIME (us)", "DUPLICATES"))
+    for name, decisions, taken in (
+        ("token_sort_ratio", full, full_time),
+        ("Sketch", sketched, sketch_time),
+        ("Sketch (cached)", cached, cached_time),
+    ):
+        print(f"{name:<16}|{taken * 1_000_000:>14.1f}|{sum(decisions):>12}")
+
+    print(f"Agreement: {agreement:.1%}")
+
+
+if __name__ == "__main__":
+    main()
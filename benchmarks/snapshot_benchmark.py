@@ -0,0 +1,79 @@
+"""
+Measures how long a SnapshotCache takes to become usable
+after a restart compared to decoding every stored guild,
+and how long saving again takes when one member changed.
+
+The snapshot is written within a temporary directory.
+
+Usage: python -m benchmarks.snapshot_benchmark [guild count]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import Mock
+
+from antispam import Options
+from antispam.caches import MemoryCache
+from antispam.caches.snapshot import SnapshotCache, write_snapshot
+from antispam.dataclasses import Message
+
+GUILD_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+MEMBERS_PER_GUILD = 100
+MESSAGES_PER_MEMBER = 3
+
+
+async def main():
+    handler = Mock()
+    handler.options = Options()
+
+    cache = MemoryCache(handler)
+    message_id = 0
+    for guild_id in range(GUILD_COUNT):
+        for member_id in range(MEMBERS_PER_GUILD):
+            for _ in range(MESSAGES_PER_MEMBER):
+                message_id += 1
+                await cache.add_message(
+                    Message(message_id, 1, guild_id, member_id, "Hello world")
+                )
+
+    print(
+        f"{GUILD_COUNT} guilds with {MEMBERS_PER_GUILD} members "
+        f"and {MESSAGES_PER_MEMBER} messages each"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "antispam.snapshot")
+
+        start = time.perf_counter()
+        await write_snapshot(cache, path)
+        print(f"{'Write':<20}|{(time.perf_counter() - start) * 1000:>10.1f} ms")
+        print(f"{'Size':<20}|{os.path.getsize(path) / 1024:>10.1f} KiB")
+
+        start = time.perf_counter()
+        snapshot = SnapshotCache(handler, path)
+        await snapshot.initialize()
+        print(f"{'Open':<20}|{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+        start = time.perf_counter()
+        await snapshot.get_member(0, GUILD_COUNT // 2)
+        print(f"{'First member':<20}|{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+        start = time.perf_counter()
+        async for _ in snapshot.get_all_guilds():
+            pass
+        print(
+            f"{'Decode every guild':<20}|{(time.perf_counter() - start) * 1000:>10.1f} ms"
+        )
+        await snapshot.close()
+
+        size = os.path.getsize(path)
+        await cache.add_message(Message(message_id + 1, 1, 0, 0, "Hello again"))
+        start = time.perf_counter()
+        await write_snapshot(cache, path)
+        print(f"{'Append':<20}|{(time.perf_counter() - start) * 1000:>10.1f} ms")
+        print(f"{'Appended':<20}|{(os.path.getsize(path) - size) / 1024:>10.1f} KiB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
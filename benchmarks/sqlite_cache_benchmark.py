@@ -0,0 +1,102 @@
+"""
+Compares SQLiteCache against MemoryCache for the
+operations a propagate makes, plus loading a guild.
+
+SQLiteCache is run both in memory and on disk, the disk
+database is created within a temporary directory.
+
+Usage: python -m benchmarks.sqlite_cache_benchmark [member count]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import Mock
+
+from antispam import Options
+from antispam.abc import Cache
+from antispam.caches import MemoryCache
+from antispam.caches.sqlite import SQLiteCache
+from antispam.dataclasses import Member, Message
+from antispam.enums import MemberCounter
+
+MEMBER_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+MESSAGES_PER_MEMBER = 5
+
+
+async def run(name: str, cache: Cache) -> None:
+    await cache.initialize()
+
+    timings = {}
+    start = time.perf_counter()
+    message_id = 0
+    for _ in range(MESSAGES_PER_MEMBER):
+        for member_id in range(MEMBER_COUNT):
+            message_id += 1
+            await cache.add_message(
+                Message(message_id, 1, 1, member_id, "Hello world, this is spam")
+            )
+    timings["add_message"] = (time.perf_counter() - start) / message_id
+
+    start = time.perf_counter()
+    for member_id in range(MEMBER_COUNT):
+        await cache.get_member(member_id, 1)
+    timings["get_member"] = (time.perf_counter() - start) / MEMBER_COUNT
+
+    start = time.perf_counter()
+    for member_id in range(MEMBER_COUNT):
+        await cache.increment_member_counter(member_id, 1, MemberCounter.WARN_COUNTER)
+    timings["increment"] = (time.perf_counter() - start) / MEMBER_COUNT
+
+    def warn(member: Member) -> None:
+        member.warn_count += 1
+
+    start = time.perf_counter()
+    for member_id in range(MEMBER_COUNT):
+        await cache.update_member(member_id, 1, warn)
+    timings["update_member"] = (time.perf_counter() - start) / MEMBER_COUNT
+
+    start = time.perf_counter()
+    guild = await cache.get_guild(1)
+    timings["get_guild"] = time.perf_counter() - start
+    assert len(guild.members) == MEMBER_COUNT
+
+    print(
+        f"{name:<15}"
+        + "".join(
+            f"|{value * 1_000_000:>14.1f} " for value in list(timings.values())[:-1]
+        )
+        + f"|{timings['get_guild'] * 1000:>12.1f}"
+    )
+
+    if isinstance(cache, SQLiteCache):
+        await cache.close()
+
+
+async def main():
+    handler = Mock()
+    handler.options = Options()
+
+    print(f"{MEMBER_COUNT} members with {MESSAGES_PER_MEMBER} messages each")
+    print(
+        "{:<15}|{:>15}|{:>15}|{:>15}|{:>15}|{:>13}".format(
+            "CACHE",
+            "ADD (us)",
+            "GET (us)",
+            "INCREMENT (us)",
+            "UPDATE (us)",
+            "GUILD (ms)",
+        )
+    )
+    await run("MemoryCache", MemoryCache(handler))
+    await run("SQLite memory", SQLiteCache(handler, ":memory:"))
+    with tempfile.TemporaryDirectory() as directory:
+        await run(
+            "SQLite disk",
+            SQLiteCache(handler, os.path.join(directory, "antispam.sqlite3")),
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
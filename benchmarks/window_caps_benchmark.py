@@ -0,0 +1,82 @@
+"""
+Measures the per message cost of recording a message for a
+member sending a burst of unique content within
+Options.message_interval, with and without
+Options.max_messages_per_member capping their window.
+
+Without a cap every message is compared against every other
+message still in the window, so the work per message grows
+with the size of the burst.
+
+Usage: python -m benchmarks.window_caps_benchmark [burst size]
+"""
+import datetime
+import sys
+import time
+from typing import List, Optional
+from unittest.mock import Mock
+
+from antispam import Options
+from antispam.core import Core
+from antispam.dataclasses import Guild, Member, Message
+
+BURST_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+CAP = 20
+SAMPLE = 100
+
+WORDS = "raid title description field value footer author join nitro free".split()
+
+
+def create_content(seed: int) -> str:
+    # Shuffled enough that no two messages are considered duplicates
+    return " ".join(
+        f"{WORDS[(seed * (i + 3)) % len(WORDS)]}{seed * 7 + i}" for i in range(8)
+    )
+
+
+def run(max_messages: Optional[int]) -> List[float]:
+    options = Options(
+        no_punish=True,
+        message_interval=3_600_000,
+        max_messages_per_member=max_messages,
+    )
+    handler = Mock()
+    handler.options = options
+    core = Core(handler)
+    guild = Guild(1, options)
+    member = Member(1, 1)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    timings: List[float] = []
+    for message_id in range(BURST_SIZE):
+        message = Message(message_id, 1, 1, 1, create_content(message_id))
+        message.creation_time = now
+
+        start = time.perf_counter()
+        # Mirrors record_message within Core.propagate_user
+        core._clean_up(member, now, guild)
+        core._calculate_ratios(message, member, guild)
+        member.messages.append(message)
+        core._cap_window(member, guild)
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    print(f"A burst of {BURST_SIZE} unique messages from one member")
+    print(
+        "{:<12}|{:>10}|{:>16}|{:>16}".format(
+            "CAP", "WINDOW", f"FIRST {SAMPLE} (us)", f"LAST {SAMPLE} (us)"
+        )
+    )
+    for name, cap in (("None", None), (str(CAP), CAP)):
+        timings = run(cap)
+        first = sum(timings[:SAMPLE]) / SAMPLE * 1_000_000
+        last = sum(timings[-SAMPLE:]) / SAMPLE * 1_000_000
+        window = min(BURST_SIZE, cap) if cap else BURST_SIZE
+        print(f"{name:<12}|{window:>10}|{first:>16.1f}|{last:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,8 @@ setup(
         "dev": parse_requirements_file("dev-requirements.txt"),
         "mongo": ["motor", "dnspython", "pytz"],
         "redis": ["redis", "orjson", "hiredis"],
+        "msgpack": ["msgpack"],
+        "sqlite": ["aiosqlite"],
     },
     classifiers=[
         "Programming Language :: Python :: 3",
@@ -1,15 +1,19 @@
 import os
+import uuid
 from typing import Any, Dict, List
 from unittest.mock import Mock
 
 import pytest
+import pytest_asyncio
 from attr import asdict
 from discord.ext import commands  # noqa
 
 from antispam import AntiSpamHandler, PluginCache, Options
-from antispam.caches import MemoryCache
+from antispam.caches import InstrumentedCache, MemoryCache, TieredCache
 from antispam.caches.mongo import MongoCache
 from antispam.caches.redis import RedisCache
+from antispam.caches.shared_memory import SharedMemoryCache
+from antispam.caches.sqlite import SQLiteCache
 from antispam.core import Core
 from antispam.dataclasses import Guild, Member, Message
 from antispam.enums import Library
@@ -32,6 +36,8 @@ class MockedMongoCache(MongoCache):
         self.handler = handler
         self.guilds: MockedDocument = MockedDocument(guild_data, converter=Guild)
         self.members: MockedDocument = MockedDocument(member_data, converter=Member)
+        self.member_ttl = None
+        self.batch_size = 1000
 
 
 @pytest.fixture
@@ -135,6 +141,45 @@ def create_redis_cache(create_handler) -> RedisCache:
     return RedisCache(create_handler, MockedRedis())
 
 
+@pytest.fixture()
+def create_tiered_cache(create_handler, create_redis_cache) -> TieredCache:
+    return TieredCache(create_handler, create_redis_cache, max_guilds=2)
+
+
+@pytest_asyncio.fixture()
+async def create_sqlite_cache(create_handler) -> SQLiteCache:
+    pytest.importorskip("aiosqlite")
+    cache = SQLiteCache(create_handler, ":memory:")
+    yield cache
+    await cache.close()
+
+
+@pytest.fixture()
+def create_shared_memory_cache(create_handler) -> SharedMemoryCache:
+    # Keep within the layout below
+    create_handler.options = Options(
+        use_timeouts=False,
+        max_messages_per_member=3,
+        message_duplicate_count=3,
+        store_message_content=False,
+    )
+    cache = SharedMemoryCache(
+        create_handler,
+        f"antispam-test-{uuid.uuid4().hex[:12]}",
+        guild_capacity=4,
+        member_capacity=8,
+        messages_per_member=3,
+        content_size=16,
+    )
+    yield cache
+    cache.unlink()
+
+
+@pytest.fixture()
+def create_instrumented_cache(create_handler) -> InstrumentedCache:
+    return InstrumentedCache(create_handler, MemoryCache(create_handler))
+
+
 @pytest.fixture(scope="session")
 def get_test_path() -> str:
     pathlike = os.getcwd()
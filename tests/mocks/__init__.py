@@ -4,3 +4,4 @@ from .mocked_guild import MockedGuild
 from .mocked_member import MockedMember
 from .mocked_message import MockedMessage
 from .mocked_redis import MockedRedis
+from .counting_redis import CountingRedis
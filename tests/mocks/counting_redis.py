@@ -0,0 +1,64 @@
+import inspect
+
+
+class CountingPipeline:
+    """Counts a pipeline execute as a single round trip"""
+
+    def __init__(self, parent, pipe):
+        self._parent = parent
+        self._pipe = pipe
+
+    async def __aenter__(self):
+        await self._pipe.__aenter__()
+        return self
+
+    async def __aexit__(self, *args):
+        return await self._pipe.__aexit__(*args)
+
+    def __getattr__(self, item):
+        attr = getattr(self._pipe, item)
+
+        def queue(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if result is not self._pipe and inspect.isawaitable(result):
+                # Such as WATCH, which is sent straight away
+                self._parent.round_trips += 1
+                return result
+
+            return self
+
+        return queue
+
+    def multi(self):
+        self._pipe.multi()
+
+    async def reset(self):
+        if self._pipe.watching:
+            # Sends UNWATCH
+            self._parent.round_trips += 1
+
+        await self._pipe.reset()
+
+    async def execute(self):
+        self._parent.round_trips += 1
+        return await self._pipe.execute()
+
+
+class CountingRedis:
+    """Wraps a redis connection, counting the round trips made against it"""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self.round_trips: int = 0
+
+    def pipeline(self, *args, **kwargs):
+        return CountingPipeline(self, self._redis.pipeline(*args, **kwargs))
+
+    def __getattr__(self, item):
+        attr = getattr(self._redis, item)
+
+        async def call(*args, **kwargs):
+            self.round_trips += 1
+            return await attr(*args, **kwargs)
+
+        return call
@@ -1,6 +1,7 @@
 from copy import deepcopy
 from typing import List, Dict, Any, Optional, Union, Type, TypeVar
 
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
 from pymongo.results import DeleteResult
 
 from antispam.caches.mongo.document import Document, return_converted
@@ -17,6 +18,8 @@ class MockedDocument(Document):
 
     def __init__(self, data, converter=None):
         self._data: List[Dict[str, Any]] = data
+        self.indexes: Dict[tuple, Dict[str, Any]] = {}
+        self.bulk_writes: int = 0
         self.converter: Type[T] = converter
 
     @staticmethod
@@ -24,45 +27,107 @@ class MockedDocument(Document):
         """Given a two dicts, return True if is subset"""
         for k, v in filter_dict.items():
             try:
-                if compare_to_dict[k] != v:
-                    return False
+                value = compare_to_dict[k]
             except KeyError:
+                # Like Mongo, None matches missing fields
+                if v is None:
+                    continue
+
+                return False
+
+            if isinstance(v, dict) and "$in" in v:
+                if value not in v["$in"]:
+                    return False
+            elif isinstance(v, dict) and "$nin" in v:
+                if value in v["$nin"]:
+                    return False
+            elif value != v:
                 return False
 
         return True
 
+    @staticmethod
+    def project(entry: Dict, projection: Optional[Dict[str, Any]]) -> Dict:
+        """Apply a Mongo style projection"""
+        if not projection:
+            return entry
+
+        if any(projection.values()):
+            return {k: v for k, v in entry.items() if projection.get(k)}
+
+        return {k: v for k, v in entry.items() if projection.get(k, True)}
+
     @return_converted
     async def find_by_custom(
-        self, filter_dict: Dict[str, Any]
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
     ) -> Optional[Union[Dict[str, Any], Type[T]]]:
         self.__ensure_dict(filter_dict)
 
         for entry in self._data:
             if self.compare_keys(filter_dict, entry):
-                return entry
+                return self.project(deepcopy(entry), projection)
 
         return None
 
     @return_converted
     async def find_many_by_custom(
-        self, filter_dict: Dict[str, Any]
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Union[Dict[str, Any], Type[T]]]:
         self.__ensure_dict(filter_dict)
         to_return = []
         for entry in self._data:
             if self.compare_keys(filter_dict, entry):
-                to_return.append(deepcopy(entry))
+                to_return.append(self.project(deepcopy(entry), projection))
 
         return to_return
 
     @return_converted
     async def get_all(
-        self, filter_dict: Optional[Dict[str, Any]] = None
+        self,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
     ) -> List[Optional[Union[Dict[str, Any], Type[T]]]]:
-        if filter_dict is None:
-            return deepcopy(self._data)
+        return [
+            self.project(deepcopy(entry), projection)
+            for entry in self._data
+            if self.compare_keys(filter_dict or {}, entry)
+        ]
+
+    async def bulk_write(self, operations: List[Any], ordered: bool = False):
+        self.bulk_writes += 1
+        for operation in operations:
+            if isinstance(operation, DeleteMany):
+                await self.delete_by_custom(operation._filter)
+            elif isinstance(operation, ReplaceOne):
+                await self.delete_by_custom(operation._filter)
+                self._data.append(deepcopy(operation._doc))
+            elif isinstance(operation, UpdateOne):
+                self.__apply_operators(
+                    operation._filter, operation._doc, operation._upsert
+                )
+            else:
+                raise NotImplementedError(type(operation))
+
+    async def iterate_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+    ):
+        self.__ensure_dict(filter_dict)
+        for entry in list(self._data):
+            if self.compare_keys(filter_dict, entry):
+                item = self.project(deepcopy(entry), projection)
+                item.pop("_id", None)
+                yield self.converter(**item) if self.converter else item
 
-        return await self.find_many_by_custom(filter_dict)
+    async def create_index(self, keys, **kwargs) -> str:
+        self.indexes[tuple(keys)] = kwargs
+        return "_".join(f"{field}_{direction}" for field, direction in keys)
 
     async def delete_by_custom(self, filter_dict: Dict[str, Any]):
         to_delete = []
@@ -92,6 +157,86 @@ class MockedDocument(Document):
         # Insert when it doesnt exist
         self._data.append({**filter_dict, **update_data})
 
+    async def update_with_operators(
+        self,
+        filter_dict: Dict[str, Any],
+        operators: Dict[str, Dict[str, Any]],
+        upsert: bool = False,
+    ) -> None:
+        self.__apply_operators(filter_dict, operators, upsert)
+
+    async def find_one_and_update_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        operators: Dict[str, Dict[str, Any]],
+        upsert: bool = False,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        entry = self.__apply_operators(filter_dict, operators, upsert)
+        return deepcopy(entry)
+
+    async def find_raw_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        self.__ensure_dict(filter_dict)
+
+        for entry in self._data:
+            if self.compare_keys(filter_dict, entry):
+                return self.project(deepcopy(entry), projection)
+
+        return None
+
+    async def replace_by_custom(
+        self,
+        filter_dict: Dict[str, Any],
+        data: Dict[str, Any],
+        upsert: bool = False,
+    ) -> bool:
+        self.__ensure_dict(filter_dict)
+        self.__ensure_dict(data)
+
+        for i, entry in enumerate(self._data):
+            if self.compare_keys(filter_dict, entry):
+                self._data[i] = deepcopy(data)
+                return True
+
+        if not upsert:
+            return False
+
+        self._data.append(deepcopy(data))
+        return True
+
+    def __apply_operators(self, filter_dict, operators, upsert):
+        """Supports the subset of update operators the cache uses"""
+        self.__ensure_dict(filter_dict)
+        self.__ensure_dict(operators)
+
+        for entry in self._data:
+            if self.compare_keys(filter_dict, entry):
+                break
+        else:
+            if not upsert:
+                return None
+
+            entry = deepcopy(filter_dict)
+            entry.update(deepcopy(operators.get("$setOnInsert", {})))
+            self._data.append(entry)
+
+        for k, v in operators.get("$set", {}).items():
+            entry[k] = deepcopy(v)
+
+        for k, v in operators.get("$inc", {}).items():
+            entry[k] = entry.get(k, 0) + v
+
+        for k, v in operators.get("$push", {}).items():
+            entry.setdefault(k, []).extend(deepcopy(v["$each"]))
+            if "$slice" in v:
+                entry[k] = entry[k][v["$slice"] :]
+
+        return entry
+
     @staticmethod
     def __ensure_list_of_dicts(data: List[Dict]):
         assert isinstance(data, list)
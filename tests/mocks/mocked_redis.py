@@ -1,4 +1,53 @@
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _to_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+
+    return str(value).encode("utf-8")
+
+
+class MockedPipeline:
+    """A mock aioredis pipeline which queues
+    commands and runs them on execute.
+    """
+
+    def __init__(self, redis: "MockedRedis"):
+        self._redis: "MockedRedis" = redis
+        self._commands: List[Tuple[str, tuple, dict]] = []
+        # Commands run straight away between WATCH and MULTI
+        self._immediate: bool = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self._commands = []
+
+    async def watch(self, *keys):
+        self._immediate = True
+
+    def multi(self):
+        self._immediate = False
+
+    def __getattr__(self, item):
+        if self._immediate:
+            return getattr(self._redis, item)
+
+        def queue(*args, **kwargs):
+            self._commands.append((item, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        results = []
+        for name, args, kwargs in self._commands:
+            results.append(await getattr(self._redis, name)(*args, **kwargs))
+
+        self._commands = []
+        return results
 
 
 class MockedRedis:
@@ -7,26 +56,59 @@ class MockedRedis:
     """
 
     def __init__(self):
-        self._data: Dict[str, dict] = {}
+        self._data: Dict[str, Any] = {}
 
     @property
     def cache(self) -> Dict:
         return self._data
 
+    def pipeline(self, transaction: bool = True) -> MockedPipeline:
+        return MockedPipeline(self)
+
     async def get(self, key) -> Optional[dict]:
         try:
             return self._data[key]
         except:
             return None
 
-    async def set(self, key, value):
+    async def set(self, key, value, nx: bool = False):
+        if nx and key in self._data:
+            return None
+
         self._data[key] = value
+        return True
 
-    async def delete(self, key):
-        try:
-            self._data.pop(key)
-        except:
-            pass
+    async def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def exists(self, key) -> int:
+        return int(key in self._data)
+
+    async def hgetall(self, key) -> Dict[bytes, bytes]:
+        return dict(self._data.get(key, {}))
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        entry: Dict[bytes, bytes] = self._data.setdefault(key, {})
+        if field is not None:
+            entry[_to_bytes(field)] = _to_bytes(value)
+
+        for k, v in (mapping or {}).items():
+            entry[_to_bytes(k)] = _to_bytes(v)
+
+    async def hsetnx(self, key, field, value) -> int:
+        entry: Dict[bytes, bytes] = self._data.setdefault(key, {})
+        if _to_bytes(field) in entry:
+            return 0
+
+        entry[_to_bytes(field)] = _to_bytes(value)
+        return 1
+
+    async def hincrby(self, key, field, amount: int = 1) -> int:
+        entry: Dict[bytes, bytes] = self._data.setdefault(key, {})
+        value = int(entry.get(_to_bytes(field), 0)) + amount
+        entry[_to_bytes(field)] = _to_bytes(value)
+        return value
 
     async def flushdb(self, *args, **kwargs):
         self._data = {}
@@ -47,5 +129,5 @@ class MockedRedis:
         return [
             key.encode("utf-8")
             for key in self._data.keys()
-            if key.startswith(f"MEMBER:{guild_id}")
+            if key.startswith(f"MEMBER:{guild_id}:")
         ]
@@ -1,6 +1,8 @@
 import pytest
 
-from antispam import CorePayload, GuildNotFound, LogicError
+from antispam import CorePayload, GuildNotFound, LogicError, Options
+from antispam.dataclasses import Guild, Member, Message
+from antispam.fingerprint import create_fingerprint
 from antispam.plugins import AdminLogs
 
 from .mocks import MockedMessage
@@ -43,3 +45,42 @@ class TestAdminLogs:
                     member_should_be_punished_this_message=True, member_was_warned=True
                 ),
             )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("store_message_content", [True, False])
+    async def test_transcript_content(
+        self, create_handler, tmp_path, store_message_content
+    ):
+        """Tests fingerprints are only hidden when content isn't stored"""
+        admin_logs = AdminLogs(create_handler, str(tmp_path))
+        fingerprint = create_fingerprint("Hello world")
+        await create_handler.cache.set_guild(
+            Guild(
+                123456789,
+                Options(store_message_content=store_message_content),
+            )
+        )
+        await create_handler.cache.set_member(
+            Member(
+                12345,
+                123456789,
+                messages=[
+                    Message(1, 2, 123456789, 12345, fingerprint, is_duplicate=True)
+                ],
+            )
+        )
+
+        await admin_logs.propagate(
+            MockedMessage().to_mock(),
+            CorePayload(
+                member_should_be_punished_this_message=True, member_was_warned=True
+            ),
+        )
+
+        transcript = (tmp_path / "123456789" / "12345" / "warn" / "1.txt").read_text()
+        if store_message_content:
+            # Members can send content which looks like a fingerprint
+            assert fingerprint in transcript
+        else:
+            assert fingerprint not in transcript
+            assert "Content not stored (11 characters)" in transcript
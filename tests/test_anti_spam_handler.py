@@ -789,6 +789,29 @@ class TestAntiSpamHandler:
         await create_handler.clean_cache(strict=True)
         assert bool(create_handler.cache.cache)
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("strict", [True, False])
+    async def test_clean_cache_strict_and_non_strict(self, create_handler, strict):
+        """Tests which members and guilds each mode keeps"""
+        cache = create_handler.cache
+        await cache.set_member(Member(2, 1, kick_count=3))
+        await cache.set_member(Member(3, 1))
+        await cache.set_guild(Guild(5, create_handler.options, addons={"a": 1}))
+        await cache.set_guild(
+            Guild(6, create_handler.options, log_channel_id=1, addons={"a": 1})
+        )
+        await cache.set_guild(Guild(7, create_handler.options))
+
+        await create_handler.clean_cache(strict=strict)
+
+        assert [
+            (guild.id, list(guild.members.keys()))
+            async for guild in cache.get_all_guilds()
+        ] == [(1, [2]), (5, []), (6, [])]
+        assert (await cache.get_guild(5)).addons == {"a": 1}
+        # Strict mode only keeps addons on guilds kept because of them
+        assert (await cache.get_guild(6)).addons == ({} if strict else {"a": 1})
+
     @pytest.mark.asyncio
     async def test_plugin_blacklists(self, create_handler):
         """Tests blacklisted guilds get skipped within plugin calls"""
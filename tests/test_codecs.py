@@ -0,0 +1,158 @@
+import datetime
+import gc
+import uuid
+import weakref
+
+import orjson as json
+import pytest
+from attr import asdict
+
+from antispam import Options
+from antispam.abc import Codec
+from antispam.caches.codecs import JsonCodec, MsgPackCodec
+from antispam.caches.redis import RedisCache
+from antispam.dataclasses import Guild, Member, Message
+from antispam.util import intern_content
+from tests.mocks import MockedRedis
+
+
+def create_member() -> Member:
+    return Member(
+        1,
+        2,
+        warn_count=3,
+        kick_count=1,
+        times_timed_out=2,
+        duplicate_counter=4,
+        duplicate_channel_counter_dict={5: 2},
+        messages=[
+            Message(1, 5, 2, 1, "Foo"),
+            Message(
+                2,
+                5,
+                2,
+                1,
+                "Bar",
+                creation_time=datetime.datetime(
+                    2021, 1, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc
+                ),
+                is_duplicate=True,
+            ),
+        ],
+        addons={"Plugin": [1, 2]},
+    )
+
+
+def create_guild() -> Guild:
+    return Guild(
+        1,
+        Options(warn_threshold=5, ignored_members={1, 2}, addons={"Plugin": "data"}),
+        log_channel_id=12345,
+        members={1: Member(1, 1)},
+        addons={"Plugin": {"key": "value"}},
+    )
+
+
+@pytest.fixture(params=[JsonCodec, MsgPackCodec])
+def codec(request) -> Codec:
+    return request.param()
+
+
+class TestCodecs:
+    def test_is_codec(self, codec):
+        assert isinstance(codec, Codec)
+
+    def test_guild_round_trip(self, codec):
+        guild = create_guild()
+        r_1 = codec.decode_guild(codec.encode_guild(guild))
+
+        assert r_1 == guild
+        assert r_1.options == guild.options
+        assert r_1.log_channel_id == 12345
+        assert r_1.addons == {"Plugin": {"key": "value"}}
+        assert r_1.members == {}
+
+    def test_member_round_trip(self, codec):
+        member = create_member()
+        r_1 = codec.decode_member(codec.encode_member(member))
+
+        assert r_1 == member
+        assert asdict(r_1) == asdict(member)
+
+    def test_content_is_shared(self, codec):
+        data = codec.encode_member(create_member())
+        r_1 = codec.decode_member(data)
+        r_2 = codec.decode_member(data)
+
+        assert r_1.messages[0].content is r_2.messages[0].content
+        assert r_1.messages[1].content is r_2.messages[1].content
+
+    def test_content_is_released(self, codec):
+        """Tests shared content is freed once no message refers to it"""
+        member = create_member()
+        member.messages[0].content = "A unique raid message " + uuid.uuid4().hex
+        member = codec.decode_member(codec.encode_member(member))
+
+        content = weakref.ref(member.messages[0].content)
+        assert intern_content(str(content())) is content()
+
+        del member
+        gc.collect()
+        assert content() is None
+
+    def test_msgpack_is_smaller(self):
+        member = create_member()
+        assert len(MsgPackCodec().encode_member(member)) < len(
+            JsonCodec().encode_member(member)
+        )
+
+    def test_msgpack_reads_json(self):
+        """Existing JSON payloads should still be readable"""
+        member = create_member()
+        guild = create_guild()
+        codec = MsgPackCodec()
+
+        assert asdict(codec.decode_member(JsonCodec().encode_member(member))) == asdict(
+            member
+        )
+        assert codec.decode_guild(JsonCodec().encode_guild(guild)).options == (
+            guild.options
+        )
+
+    def test_msgpack_rejects_future_schema(self):
+        codec = MsgPackCodec()
+        data = codec._msgpack.packb([codec.SCHEMA_VERSION + 1, 1])
+
+        with pytest.raises(ValueError):
+            codec.decode_member(data)
+
+    def test_msgpack_upgrades(self, monkeypatch):
+        codec = MsgPackCodec()
+        payload = codec._unpack(codec.encode_guild(create_guild()))
+        payload[0] = 0
+        payload[3] = None
+
+        def upgrade(old):
+            return [1, old[1], old[2], 54321, old[4]]
+
+        monkeypatch.setitem(MsgPackCodec._guild_upgrades, 0, upgrade)
+        r_1 = codec.decode_guild(codec._pack(payload))
+        assert r_1.log_channel_id == 54321
+
+    def test_legacy_redis_payload(self):
+        """The JsonCodec should read what RedisCache used to write"""
+        guild = Guild(1, Options())
+        guild_payload = json.dumps(asdict(guild, recurse=True))
+        assert JsonCodec().decode_guild(guild_payload) == guild
+
+    @pytest.mark.asyncio
+    async def test_redis_with_codec(self, create_handler, codec):
+        cache = RedisCache(create_handler, MockedRedis(), codec=codec)
+        member = create_member()
+        await cache.set_member(member)
+
+        r_1 = await cache.get_member(1, 2)
+        assert asdict(r_1) == asdict(member)
+
+        r_2 = await cache.get_guild(2)
+        assert len(r_2.members) == 1
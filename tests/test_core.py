@@ -1,11 +1,13 @@
 import datetime
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 import nextcord
 import pytest
 
 from antispam import DuplicateObject, Options, UnsupportedAction
 from antispam.dataclasses import CorePayload, Guild, Member, Message
+from antispam.enums import MemberCounter
+from antispam.fingerprint import parse_fingerprint
 from antispam.libs.dpy_forks.lib_nextcord import Nextcord
 
 from .mocks import MockedMessage
@@ -208,6 +210,42 @@ class TestCore:
         assert member.messages[3].is_duplicate is True
         assert member.messages[4].is_duplicate is True
 
+    def test_calculate_ratios_identical_content(self, create_core):
+        """Tests identical content is only compared once"""
+        member = Member(
+            1, 1, messages=[Message(i, 1, 1, 1, "Spam tho") for i in range(1, 4)]
+        )
+        message = Message(4, 1, 1, 1, "Spam tho")
+
+        with patch(
+            "antispam.fingerprint.fuzz.token_sort_ratio", return_value=100
+        ) as token_sort_ratio:
+            create_core._calculate_ratios(message, member, Guild(1))
+
+        assert token_sort_ratio.call_count == 1
+        assert member.duplicate_counter == 4
+        assert all(m.is_duplicate for m in member.messages)
+
+    def test_calculate_ratios_simhash(self, create_core):
+        member = Member(
+            1,
+            1,
+            messages=[
+                Message(1, 1, 1, 1, "Join my server for free nitro"),
+                Message(2, 1, 1, 1, "Something else entirely"),
+                Message(3, 1, 1, 1, ""),
+            ],
+        )
+        message = Message(4, 1, 1, 1, "free nitro, join my server for")
+        guild = Guild(1, Options(use_simhash=True))
+
+        with patch("antispam.fingerprint.fuzz.token_sort_ratio") as token_sort_ratio:
+            create_core._calculate_ratios(message, member, guild)
+
+        token_sort_ratio.assert_not_called()
+        assert member.duplicate_counter == 2
+        assert [m.is_duplicate for m in member.messages] == [True, False, False]
+
     def test_calculate_ratios_per_channel(self, create_core):
         member = Member(1, 1)
         member.messages = [Message(1, 1, 1, 1, "Hello world", datetime.datetime.now())]
@@ -238,6 +276,129 @@ class TestCore:
             member_status="Member should be punished, however, was not due to no_punish being True",
         )
 
+    @pytest.mark.asyncio
+    async def test_propagate_without_content(self, create_core):
+        guild = Guild(1, Options(no_punish=True, store_message_content=False))
+        await create_core.cache.set_guild(guild)
+
+        for message_id in range(1, 3):
+            await create_core.propagate_user(
+                MockedMessage(guild_id=1, author_id=1, message_id=message_id).to_mock(),
+                guild,
+            )
+
+        member = await create_core.cache.get_member(1, 1)
+        assert [parse_fingerprint(m.content) is not None for m in member.messages] == [
+            True,
+            True,
+        ]
+        assert member.duplicate_counter == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("use_simhash", [False, True])
+    async def test_propagate_typed_fingerprints(self, create_core, use_simhash):
+        """Tests content looking like a fingerprint is compared as sent"""
+        guild = Guild(1, Options(no_punish=True, use_simhash=use_simhash))
+        await create_core.cache.set_guild(guild)
+
+        for message_id, length in enumerate([1000, 9000], start=1):
+            await create_core.propagate_user(
+                MockedMessage(
+                    guild_id=1,
+                    author_id=1,
+                    message_id=message_id,
+                    message_clean_content=f"\ufdd0{length}\ufdd0 buy cheap nitro here",
+                ).to_mock(),
+                guild,
+            )
+
+        member = await create_core.cache.get_member(1, 1)
+        assert member.duplicate_counter == 2
+
+    def test_cap_window(self, create_core):
+        messages = [Message(i, 1, 1, 1, f"Message {i % 2}") for i in range(6)]
+        messages[0].is_duplicate = True
+        messages[3].is_duplicate = True
+        member = Member(1, 1, messages=list(messages), duplicate_counter=3)
+
+        create_core._cap_window(member, Guild(1))
+        assert member.messages == messages
+
+        # Messages which are not duplicates go first, oldest first
+        options = Options(max_messages_per_member=3, message_duplicate_count=1)
+        create_core._cap_window(member, Guild(1, options))
+        assert member.messages == [messages[0], messages[3], messages[5]]
+        assert member.duplicate_counter == 3
+
+        # The newest message_duplicate_count messages are always kept
+        options = Options(max_messages_per_member=0, message_duplicate_count=1)
+        create_core._cap_window(member, Guild(1, options))
+        assert member.messages == [messages[5]]
+        assert member.duplicate_counter == 1
+
+    def test_cap_window_characters(self, create_core):
+        messages = [Message(i, 1, 1, 1, f"Message {i % 2}") for i in range(4)]
+        member = Member(1, 1, messages=list(messages))
+
+        # Each content is 9 characters
+        options = Options(max_characters_per_member=20, message_duplicate_count=1)
+        create_core._cap_window(member, Guild(1, options))
+        assert member.messages == messages[2:]
+
+    @pytest.mark.asyncio
+    async def test_propagate_window_caps(self, create_core):
+        guild = Guild(
+            1,
+            Options(
+                no_punish=True, max_messages_per_member=3, message_duplicate_count=2
+            ),
+        )
+        await create_core.cache.set_guild(guild)
+
+        contents = ["One", "Two", "Three", "Four", "Four", "Five"]
+        for message_id, content in enumerate(contents, start=1):
+            await create_core.propagate_user(
+                MockedMessage(
+                    guild_id=1,
+                    author_id=1,
+                    message_id=message_id,
+                    message_clean_content=content,
+                ).to_mock(),
+                guild,
+            )
+
+        member = await create_core.cache.get_member(1, 1)
+        # The duplicates are kept over the older message which isn't
+        assert [m.content for m in member.messages] == ["Four", "Four", "Five"]
+        assert member.duplicate_counter == 2
+
+    @pytest.mark.asyncio
+    async def test_propagate_keeps_concurrent_counters(self, create_core):
+        """Tests punishing doesn't overwrite counters changed elsewhere meanwhile"""
+        member = Member(1, 1)
+        await create_core.cache.set_member(member)
+        create_core._increment_duplicate_count(member, Guild(1), 1, 15)
+        guild = await create_core.cache.get_guild(1)
+        create_core.options.warn_only = True
+
+        send_guild_log = create_core.handler.lib_handler.send_guild_log
+
+        async def concurrent_warn(*args, **kwargs):
+            # Another worker warns this member while we are punishing
+            await create_core.cache.increment_member_counter(
+                1, 1, MemberCounter.WARN_COUNTER
+            )
+            return await send_guild_log(*args, **kwargs)
+
+        with patch.object(
+            create_core.handler.lib_handler, "send_guild_log", concurrent_warn
+        ):
+            await create_core.propagate_user(
+                MockedMessage(guild_id=1, author_id=1).to_mock(), guild
+            )
+
+        assert (await create_core.cache.get_member(1, 1)).warn_count == 2
+
     @pytest.mark.asyncio
     async def test_propagate_warn_only(self, create_core):
         member = Member(1, 1)
@@ -0,0 +1,175 @@
+import asyncio
+import datetime
+from unittest.mock import patch
+
+import pytest
+
+from antispam import MemberNotFound, Options
+from antispam.dataclasses import Guild, Member, Message
+from antispam.util import get_aware_time
+
+
+class TestExpiryScheduler:
+    @pytest.mark.asyncio
+    async def test_not_running(self, create_handler):
+        expiry = create_handler.expiry
+        assert not expiry.is_running
+
+        expiry.schedule(Guild(1, create_handler.options), 1, get_aware_time())
+        assert len(expiry) == 0
+
+    @pytest.mark.asyncio
+    async def test_run_due(self, create_handler):
+        cache = create_handler.cache
+        expiry = create_handler.expiry
+        expiry.start()
+
+        sent = get_aware_time()
+        message = Message(1, 2, 1, 1, "Hello", creation_time=sent, is_duplicate=True)
+        member = Member(1, 1, messages=[message], duplicate_counter=2)
+        await cache.set_member(member)
+
+        guild = await cache.get_guild(1)
+        expiry.schedule(guild, 1, sent)
+        assert len(expiry) == 1
+
+        # Not expired yet
+        assert await expiry.run_due(sent) == 0
+
+        later = sent + datetime.timedelta(
+            milliseconds=create_handler.options.message_interval + 1
+        )
+        assert await expiry.run_due(later) == 1
+        assert len(expiry) == 0
+
+        member = await cache.get_member(1, 1)
+        assert member.messages == []
+        assert member.duplicate_counter == 1
+
+        await expiry.stop()
+
+    @pytest.mark.asyncio
+    async def test_reschedules_remaining(self, create_handler):
+        cache = create_handler.cache
+        expiry = create_handler.expiry
+        expiry.start()
+
+        interval = datetime.timedelta(
+            milliseconds=create_handler.options.message_interval
+        )
+        first = get_aware_time() - interval
+        second = get_aware_time()
+        await cache.set_member(
+            Member(
+                1,
+                1,
+                messages=[
+                    Message(1, 2, 1, 1, "Hello", creation_time=first),
+                    Message(2, 2, 1, 1, "World", creation_time=second),
+                ],
+            )
+        )
+
+        expiry.schedule(await cache.get_guild(1), 1, first)
+        assert await expiry.run_due(second) == 1
+
+        member = await cache.get_member(1, 1)
+        assert [m.id for m in member.messages] == [2]
+        assert len(expiry) == 1
+
+        await expiry.stop()
+        assert len(expiry) == 0
+
+    @pytest.mark.asyncio
+    async def test_stale_entries_skipped(self, create_handler):
+        expiry = create_handler.expiry
+        expiry.start()
+        guild = Guild(1, create_handler.options)
+
+        now = get_aware_time()
+        expiry.schedule(guild, 1, now)
+        expiry.schedule(guild, 1, now - datetime.timedelta(seconds=1))
+        assert len(expiry._heap) == 2
+        assert len(expiry) == 1
+
+        # A later deadline doesn't replace an earlier one
+        expiry.schedule(guild, 1, now + datetime.timedelta(seconds=1))
+        assert len(expiry._heap) == 2
+
+        later = now + datetime.timedelta(minutes=1)
+        assert await expiry.run_due(later) == 1
+        assert not expiry._heap
+
+        await expiry.stop()
+
+    @pytest.mark.asyncio
+    async def test_guild_options_forgotten(self, create_handler):
+        expiry = create_handler.expiry
+        expiry.start()
+
+        now = get_aware_time()
+        expiry.schedule(Guild(1, Options()), 1, now)
+        expiry.schedule(Guild(1, Options()), 2, now + datetime.timedelta(seconds=1))
+        expiry.schedule(Guild(2, Options()), 1, now - datetime.timedelta(seconds=29))
+
+        # A later deadline still refreshes the options used
+        latest = Options(message_interval=1000)
+        expiry.schedule(Guild(1, latest), 1, now + datetime.timedelta(seconds=1))
+        assert expiry._options[1] is latest
+
+        assert await expiry.run_due(now + datetime.timedelta(seconds=5)) == 2
+        assert set(expiry._options) == {1}
+
+        assert await expiry.run_due(now + datetime.timedelta(minutes=1)) == 1
+        assert expiry._options == {}
+
+        await expiry.stop()
+
+    @pytest.mark.asyncio
+    async def test_background(self, create_handler):
+        create_handler.options.message_interval = 50
+        expiry = create_handler.expiry
+        expiry.start()
+
+        await create_handler.cache.set_member(
+            Member(1, 1, messages=[Message(1, 2, 1, 1, "Hello")])
+        )
+        expiry.schedule(await create_handler.cache.get_guild(1), 1, get_aware_time())
+
+        await asyncio.sleep(0.2)
+        member = await create_handler.cache.get_member(1, 1)
+        assert member.messages == []
+        assert len(expiry) == 0
+
+        await expiry.stop()
+        assert not expiry.is_running
+
+    @pytest.mark.asyncio
+    async def test_expires_single_member(self, create_handler, create_redis_cache):
+        create_handler.cache = cache = create_redis_cache
+        expiry = create_handler.expiry
+        expiry.start()
+
+        sent = get_aware_time()
+        await cache.set_member(
+            Member(1, 1, messages=[Message(1, 2, 1, 1, "Hello", creation_time=sent)])
+        )
+        expiry.schedule(Guild(1, create_handler.options), 1, sent)
+        expiry.schedule(Guild(1, create_handler.options), 2, sent)
+
+        later = sent + datetime.timedelta(
+            milliseconds=create_handler.options.message_interval + 1
+        )
+        # Sent after the member was scheduled, but before they expire
+        await cache.add_message(Message(2, 2, 1, 1, "World", creation_time=later))
+
+        with patch.object(cache, "get_guild", side_effect=AssertionError):
+            assert await expiry.run_due(later) == 2
+
+        member = await cache.get_member(1, 1)
+        assert [m.id for m in member.messages] == [2]
+        # Members which no longer exist aren't created
+        with pytest.raises(MemberNotFound):
+            await cache.get_member(2, 1)
+
+        await expiry.stop()
@@ -0,0 +1,114 @@
+import pytest
+from thefuzz import fuzz
+
+from antispam.fingerprint import (
+    FINGERPRINT_SIZE,
+    SKETCH_SIZE,
+    create_fingerprint,
+    create_sketch,
+    parse_fingerprint,
+    similarity,
+)
+
+
+class TestFingerprint:
+    def test_create_and_parse(self):
+        fingerprint = create_fingerprint("Hello, World! this is SPAM")
+        assert parse_fingerprint(fingerprint) == (24, "hello is spam this world")
+        assert parse_fingerprint("Hello world") is None
+
+        length, tokens = parse_fingerprint(create_fingerprint("spam " * 100))
+        assert length == 499
+        assert len(tokens) == FINGERPRINT_SIZE
+
+    @pytest.mark.parametrize(
+        "first, second",
+        [
+            ("Hello world", "world hello"),
+            ("Spam tho", "Spam though"),
+            ("This is a test", "Heres another message"),
+            ("!!!", "???"),
+        ],
+    )
+    def test_matches_token_sort_ratio(self, first, second):
+        expected = fuzz.token_sort_ratio(first, second)
+        assert similarity(first, second) == expected
+        assert (
+            similarity(
+                create_fingerprint(first),
+                create_fingerprint(second),
+                fingerprinted=True,
+            )
+            == expected
+        )
+        # Fingerprints can be compared to plain content
+        assert (
+            similarity(create_fingerprint(first), second, fingerprinted=True)
+            == expected
+        )
+        assert (
+            similarity(first, create_fingerprint(second), fingerprinted=True)
+            == expected
+        )
+
+    def test_truncated_lengths(self):
+        short = "spam " * 20
+        long = "spam " * 200
+        assert (
+            similarity(
+                create_fingerprint(long), create_fingerprint(long), fingerprinted=True
+            )
+            == 100
+        )
+        # Equal truncated tokens, but very different lengths
+        assert (
+            similarity(
+                create_fingerprint(short), create_fingerprint(long), fingerprinted=True
+            )
+            < 50
+        )
+        assert similarity(create_fingerprint(long), long, fingerprinted=True) == 100
+
+        # Truncated to different sizes
+        assert (
+            similarity(
+                create_fingerprint(long, 8),
+                create_fingerprint(long),
+                fingerprinted=True,
+            )
+            == 100
+        )
+
+    def test_plain_content_is_never_a_fingerprint(self):
+        """Tests members can't evade detection by sending a fingerprint"""
+        first = "\ufdd01000\ufdd0 buy cheap nitro here"
+        second = "\ufdd09000\ufdd0 buy cheap nitro here"
+        assert similarity(first, second) == fuzz.token_sort_ratio(first, second)
+        # Rather than fingerprints of very different lengths
+        assert similarity(first, second) > 90
+
+    def test_create_sketch(self):
+        length, sketch = create_sketch("Hello, World! this is SPAM")
+        assert length == 24
+        assert sketch == create_sketch("spam this is world hello")[1]
+
+        length, sketch = create_sketch(" ".join(str(i) for i in range(1000)))
+        assert length == 3889
+        assert len(sketch) == SKETCH_SIZE
+
+    def test_sketch_similarity(self):
+        content = " ".join(f"word{i}" for i in range(500))
+        reordered = " ".join(reversed(content.split()))
+        assert similarity(content, content, sketch_length=100) == 100
+        assert similarity(content, reordered, sketch_length=100) == 100
+
+        unrelated = " ".join(f"other{i}" for i in range(500))
+        assert similarity(content, unrelated, sketch_length=100) < 50
+
+        # Much longer content can't be a duplicate
+        assert similarity(content, content * 3, sketch_length=100) < 90
+
+        # Short content is still compared using fuzz
+        assert similarity("Spam tho", "Spam though", sketch_length=100) == (
+            fuzz.token_sort_ratio("Spam tho", "Spam though")
+        )
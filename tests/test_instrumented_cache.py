@@ -0,0 +1,119 @@
+import pytest
+
+from antispam import GuildNotFound, Options
+from antispam.caches import InstrumentedCache, MemoryCache
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter
+
+
+class TestInstrumentedCache:
+    @pytest.mark.asyncio
+    async def test_counts_calls(self, create_instrumented_cache):
+        cache = create_instrumented_cache
+        await cache.add_message(Message(1, 1, 1, 1, "Hello"))
+        await cache.add_message(Message(2, 1, 1, 1, "World"))
+        await cache.get_member(1, 1)
+        assert (
+            await cache.increment_member_counter(1, 1, MemberCounter.WARN_COUNTER) == 1
+        )
+
+        stats = cache.snapshot()
+        assert set(stats.keys()) == {
+            "add_message",
+            "get_member",
+            "increment_member_counter",
+        }
+        assert stats["add_message"].calls == 2
+        assert stats["add_message"].errors == 0
+        assert sum(stats["add_message"].histogram) == 2
+        assert len(stats["add_message"].histogram) == len(cache.buckets) + 1
+        assert stats["add_message"].max_time <= stats["add_message"].total_time
+        assert stats["get_member"].average_time == stats["get_member"].total_time
+
+    @pytest.mark.asyncio
+    async def test_errors(self, create_instrumented_cache):
+        with pytest.raises(GuildNotFound):
+            await create_instrumented_cache.get_guild(1)
+
+        stats = create_instrumented_cache.snapshot()["get_guild"]
+        assert stats.calls == 1
+        assert stats.errors == 1
+
+    @pytest.mark.asyncio
+    async def test_payload_sizes(self, create_instrumented_cache):
+        cache = create_instrumented_cache
+        message = Message(1, 1, 1, 1, "Hello")
+        await cache.add_message(message)
+        await cache.get_member(1, 1)
+
+        stats = cache.snapshot()
+        assert stats["add_message"].payload_bytes > len("Hello")
+        assert stats["get_member"].payload_bytes > stats["add_message"].payload_bytes
+
+    @pytest.mark.asyncio
+    async def test_payload_sampling(self, create_handler):
+        cache = InstrumentedCache(
+            create_handler, MemoryCache(create_handler), payload_sample_rate=3
+        )
+        for i in range(7):
+            await cache.set_member(Member(i, 1))
+
+        stats = cache.snapshot()["set_member"]
+        assert stats.calls == 7
+        # The first, fourth and seventh calls
+        assert stats.payload_samples == 3
+        assert stats.average_payload_bytes == stats.payload_bytes / 3
+
+        with pytest.raises(ValueError):
+            InstrumentedCache(
+                create_handler, MemoryCache(create_handler), payload_sample_rate=0
+            )
+
+    @pytest.mark.asyncio
+    async def test_encoded_payload_sizes(self, create_handler, create_redis_cache):
+        cache = InstrumentedCache(
+            create_handler, create_redis_cache, payload_sample_rate=1
+        )
+        member = Member(1, 1, messages=[Message(1, 1, 1, 1, "Hello")])
+        await cache.set_member(member)
+
+        assert cache.snapshot()["set_member"].payload_bytes == len(
+            create_redis_cache.codec.encode_member(member)
+        )
+
+    @pytest.mark.asyncio
+    async def test_iteration(self, create_instrumented_cache):
+        cache = create_instrumented_cache
+        await cache.set_guild(Guild(1, Options()))
+        await cache.set_member(Member(1, 2))
+
+        assert len([guild async for guild in cache.get_all_guilds()]) == 2
+        assert len([member async for member in cache.get_all_members(2)]) == 1
+
+        with pytest.raises(GuildNotFound):
+            async for _ in cache.get_all_members(3):
+                pass
+
+        stats = cache.snapshot()
+        assert stats["get_all_guilds"].calls == 1
+        assert stats["get_all_members"].calls == 2
+        assert stats["get_all_members"].errors == 1
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_a_copy(self, create_instrumented_cache):
+        cache = create_instrumented_cache
+        await cache.set_member(Member(1, 1))
+
+        snapshot = cache.snapshot()
+        await cache.set_member(Member(1, 1))
+        assert snapshot["set_member"].calls == 1
+        assert cache.snapshot()["set_member"].calls == 2
+
+        cache.reset()
+        assert cache.snapshot() == {}
+
+    def test_buckets_ordered(self, create_handler):
+        with pytest.raises(ValueError):
+            InstrumentedCache(
+                create_handler, MemoryCache(create_handler), buckets=(1, 0.5)
+            )
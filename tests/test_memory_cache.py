@@ -1,8 +1,9 @@
 import pytest
 
 from antispam import GuildNotFound, MemberNotFound, Options
+from antispam.caches import MemoryCache
 from antispam.dataclasses import Guild, Member, Message
-from antispam.enums import ResetType
+from antispam.enums import MemberCounter, ResetType
 from antispam.factory import FactoryBuilder
 
 
@@ -154,3 +155,159 @@ class TestMemoryCache:
         await create_memory_cache.delete_member(1, 2)
         g = await create_memory_cache.get_guild(2)
         assert len(g.members) == 0
+
+    @pytest.mark.asyncio
+    async def test_increment_member_counter(self, create_memory_cache):
+        r_1 = await create_memory_cache.increment_member_counter(
+            1, 2, MemberCounter.WARN_COUNTER
+        )
+        assert r_1 == 1
+
+        member = await create_memory_cache.get_member(1, 2)
+        assert member.warn_count == 1
+
+        r_2 = await create_memory_cache.increment_member_counter(
+            1, 2, MemberCounter.TIMEOUT_COUNTER, 3
+        )
+        assert r_2 == 3
+        assert member.times_timed_out == 3
+
+        r_3 = await create_memory_cache.increment_member_counter(
+            1, 2, MemberCounter.WARN_COUNTER, -1
+        )
+        assert r_3 == 0
+
+    @pytest.mark.asyncio
+    async def test_max_members_per_guild(self, create_handler):
+        cache = MemoryCache(create_handler, max_members_per_guild=3)
+        await cache.set_member(Member(1, 1, warn_count=1))
+        await cache.set_member(Member(2, 1))
+        await cache.set_member(Member(3, 1))
+        await cache.get_member(2, 1)
+        await cache.set_member(Member(4, 1))
+
+        # Member 1 is protected by its counters, 3 is least recently used
+        guild = await cache.get_guild(1)
+        assert list(guild.members.keys()) == [1, 2, 4]
+        assert cache.evicted_members == 1
+
+    @pytest.mark.asyncio
+    async def test_spam_state_is_not_evicted(self, create_handler):
+        cache = MemoryCache(create_handler, max_members_per_guild=1)
+        await cache.add_message(Message(1, 1, 1, 1, "Hello world"))
+        await cache.set_member(Member(2, 1, duplicate_counter=3))
+        await cache.set_member(Member(3, 1, duplicate_channel_counter_dict={1: 2}))
+        await cache.set_member(Member(4, 1))
+        await cache.set_member(Member(5, 1))
+
+        # Members part way to a punishment are kept over the limit
+        guild = await cache.get_guild(1)
+        assert list(guild.members.keys()) == [1, 2, 3, 5]
+        assert cache.evicted_members == 1
+
+    @pytest.mark.asyncio
+    async def test_eviction_skips_protected_members(self, create_handler):
+        cache = MemoryCache(create_handler, max_members_per_guild=10)
+        for i in range(10):
+            await cache.set_member(Member(i, 1, warn_count=1))
+
+        for i in range(10, 20):
+            await cache.set_member(Member(i, 1))
+
+        # Only evictable members are looked at when evicting
+        assert list(cache._evictable[1].keys()) == [19]
+        assert cache.evicted_members == 9
+
+        # Members changed in place are re-checked before eviction
+        (await cache.get_member(19, 1)).warn_count = 1
+        await cache.set_member(Member(20, 1))
+        assert cache.evicted_members == 9
+        assert len((await cache.get_guild(1)).members) == 12
+
+    @pytest.mark.asyncio
+    async def test_max_guilds(self, create_handler):
+        cache = MemoryCache(create_handler, max_guilds=2)
+        await cache.set_guild(Guild(1, create_handler.options, log_channel_id=1))
+        await cache.set_guild(Guild(2, create_handler.options))
+        await cache.set_guild(Guild(3, create_handler.options))
+
+        assert list(cache.cache.keys()) == [1, 3]
+        assert cache.evicted_guilds == 1
+
+    @pytest.mark.asyncio
+    async def test_max_bytes(self, create_handler):
+        cache = MemoryCache(create_handler, max_bytes=10_000)
+        for i in range(50):
+            await cache.set_member(Member(i, 1))
+
+        assert cache.approximate_bytes <= 10_000
+        assert cache.evicted_members > 0
+
+        # The most recent member is always kept
+        assert await cache.get_member(49, 1)
+
+        await cache.delete_guild(1)
+        assert cache.approximate_bytes == 0
+
+    @pytest.mark.asyncio
+    async def test_max_bytes_protects_by_guild(self, create_handler):
+        """Tests a member id is only protected within its own guild"""
+        cache = MemoryCache(create_handler, max_bytes=1_000_000)
+        await cache.set_member(Member(1, 1))
+        await cache.set_member(Member(2, 1))
+        await cache.set_member(Member(3, 2))
+
+        # Just too small to fit another member
+        cache.max_bytes = cache.approximate_bytes + cache._sizes[(2, 3)] - 1
+        await cache.set_member(Member(1, 2))
+
+        # Member 1 in guild 1 is evicted rather than all of guild 1
+        assert list((await cache.get_guild(1)).members.keys()) == [2]
+        assert list((await cache.get_guild(2)).members.keys()) == [3, 1]
+        assert cache.evicted_members == 1
+        assert cache.evicted_guilds == 0
+
+    @pytest.mark.asyncio
+    async def test_unbounded_by_default(self, create_memory_cache):
+        for i in range(50):
+            await create_memory_cache.add_message(Message(i, 1, 1, i, "Hello world"))
+
+        assert len((await create_memory_cache.get_guild(1)).members) == 50
+        assert create_memory_cache.approximate_bytes == 0
+
+    @pytest.mark.asyncio
+    async def test_members_many(self, create_memory_cache):
+        cache = create_memory_cache
+        assert await cache.get_members_many([1, 2], 1) == {}
+
+        await cache.set_members_many([Member(1, 1), Member(2, 1), Member(1, 2)])
+        members = await cache.get_members_many([1, 2, 3], 1)
+        assert set(members.keys()) == {1, 2}
+        assert await cache.get_member(1, 2)
+
+        await cache.add_messages_many(
+            [
+                Message(1, 1, 1, 1, "Hello"),
+                Message(2, 1, 1, 3, "World"),
+                Message(3, 1, 1, 1, "Again"),
+            ]
+        )
+        member = await cache.get_member(1, 1)
+        assert [m.id for m in member.messages] == [1, 3]
+        assert len((await cache.get_member(3, 1)).messages) == 1
+
+        await cache.delete_members_many([1, 3, 4], 1)
+        assert list((await cache.get_guild(1)).members.keys()) == [2]
+        await cache.delete_members_many([1], 5)
+
+    @pytest.mark.asyncio
+    async def test_update_member(self, create_memory_cache):
+        def warn(member: Member) -> None:
+            member.warn_count += 1
+
+        member = await create_memory_cache.update_member(1, 1, warn)
+        assert member.warn_count == 1
+        assert await create_memory_cache.get_member(1, 1) is member
+
+        await create_memory_cache.update_member(1, 1, warn)
+        assert member.warn_count == 2
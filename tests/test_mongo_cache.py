@@ -4,7 +4,7 @@ import pytest
 
 from antispam import GuildNotFound, Options, MemberNotFound
 from antispam.dataclasses import Guild, Member, Message
-from antispam.enums import ResetType
+from antispam.enums import MemberCounter, ResetType
 
 
 class TestMongoCache:
@@ -31,6 +31,22 @@ class TestMongoCache:
         assert isinstance(r_1, Guild)
         assert r_1 == set_guild
 
+    @pytest.mark.asyncio
+    async def test_set_guild_replaces_members(self, create_mongo_cache):
+        guild = await create_mongo_cache.get_guild(1)
+        assert set(guild.members.keys()) == {1, 2}
+
+        guild.members.pop(2)
+        guild.members[1].kick_count = 5
+        guild.members[3] = Member(3, 1)
+        await create_mongo_cache.set_guild(guild)
+        assert create_mongo_cache.members.bulk_writes == 1
+
+        r_1 = await create_mongo_cache.get_guild(1)
+        assert set(r_1.members.keys()) == {1, 3}
+        assert r_1.members[1].kick_count == 5
+        assert len(r_1.members[1].messages) == 3
+
     @pytest.mark.asyncio
     async def test_delete_guild(self, create_mongo_cache):
         await create_mongo_cache.get_guild(1)
@@ -196,6 +212,17 @@ class TestMongoCache:
 
         assert counter == 1
 
+    @pytest.mark.asyncio
+    async def test_get_all_guilds_includes_members(self, create_mongo_cache):
+        guilds = [g async for g in create_mongo_cache.get_all_guilds()]
+        assert len(guilds) == 1
+        assert isinstance(guilds[0].options, Options)
+        assert set(guilds[0].members.keys()) == {1, 2}
+        assert isinstance(guilds[0].members[1].messages[0], Message)
+
+        members = [m async for m in create_mongo_cache.get_all_members(1)]
+        assert isinstance(members[0].messages[0], Message)
+
     @pytest.mark.asyncio
     async def test_set_guild_is_idempotent(self, create_mongo_cache):
         await create_mongo_cache.delete_member(1, 2)
@@ -220,3 +247,151 @@ class TestMongoCache:
         assert isinstance(member.messages[0].creation_time, datetime.datetime)
         await create_mongo_cache.set_member(member)
         assert isinstance(member.messages[0].creation_time, datetime.datetime)
+
+    @pytest.mark.asyncio
+    async def test_increment_member_counter(self, create_mongo_cache):
+        r_1 = await create_mongo_cache.increment_member_counter(
+            1, 1, MemberCounter.WARN_COUNTER
+        )
+        assert r_1 == 3
+
+        # The rest of the member is untouched
+        r_2 = await create_mongo_cache.get_member(1, 1)
+        assert r_2.warn_count == 3
+        assert len(r_2.messages) == 3
+
+        # Creates the guild and member as required
+        r_3 = await create_mongo_cache.increment_member_counter(
+            1, 3, MemberCounter.KICK_COUNTER, 2
+        )
+        assert r_3 == 2
+
+        r_4 = await create_mongo_cache.get_guild(3)
+        assert r_4.members[1].kick_count == 2
+        assert r_4.members[1].warn_count == 0
+
+    @pytest.mark.asyncio
+    async def test_initialize_indexes(self, create_mongo_cache):
+        await create_mongo_cache.initialize()
+        assert create_mongo_cache.members.indexes == {
+            (("guild_id", 1), ("id", 1)): {"unique": True}
+        }
+        assert create_mongo_cache.guilds.indexes == {(("id", 1),): {"unique": True}}
+
+        create_mongo_cache.member_ttl = datetime.timedelta(hours=1)
+        await create_mongo_cache.initialize()
+        assert create_mongo_cache.members.indexes[(("updated_at", 1),)] == {
+            "expireAfterSeconds": 3600
+        }
+
+    @pytest.mark.asyncio
+    async def test_updated_at_is_not_returned(self, create_mongo_cache):
+        await create_mongo_cache.add_message(Message(4, 1, 1, 1, "Hello world"))
+        await create_mongo_cache.set_member(Member(3, 1))
+
+        guild = await create_mongo_cache.get_guild(1)
+        assert len(guild.members) == 3
+
+        member = await create_mongo_cache.get_member(1, 1)
+        assert len(member.messages) == 4
+
+        members = [m async for m in create_mongo_cache.get_all_members(1)]
+        assert len(members) == 3
+
+    @pytest.mark.asyncio
+    async def test_add_message_caps_messages(self, create_mongo_cache):
+        """Tests adding messages keeps members within the guild's options"""
+        cache = create_mongo_cache
+        await cache.set_guild(
+            Guild(
+                5,
+                Options(max_messages_per_member=3, message_duplicate_count=2),
+                members={1: Member(1, 5, warn_count=1)},
+            )
+        )
+        for message_id in range(4):
+            await cache.add_message(Message(message_id, 1, 5, 1, "Hello"))
+
+        member = await cache.get_member(1, 5)
+        assert [m.id for m in member.messages] == [1, 2, 3]
+        assert member.warn_count == 1
+
+        await cache.add_messages_many(
+            [Message(i, 1, 5, 1, "World") for i in range(4, 8)]
+            + [Message(8, 1, 6, 1, "Elsewhere")]
+        )
+        assert [m.id for m in (await cache.get_member(1, 5)).messages] == [5, 6, 7]
+        # The handler's options, which have no limit, apply to new guilds
+        assert len((await cache.get_member(1, 6)).messages) == 1
+
+    @pytest.mark.asyncio
+    async def test_members_many(self, create_mongo_cache):
+        cache = create_mongo_cache
+        assert await cache.get_members_many([1, 2], 10) == {}
+
+        await cache.set_members_many(
+            [Member(1, 10, warn_count=2), Member(2, 10), Member(1, 11)]
+        )
+        assert cache.members.bulk_writes == 1
+        members = await cache.get_members_many([1, 2, 3], 10)
+        assert set(members.keys()) == {1, 2}
+        assert members[1].warn_count == 2
+        assert await cache.get_guild(11)
+
+        await cache.add_messages_many(
+            [
+                Message(1, 1, 10, 1, "Hello"),
+                Message(2, 1, 10, 3, "World"),
+                Message(3, 1, 10, 1, "Again"),
+            ]
+        )
+        assert cache.members.bulk_writes == 2
+        member = await cache.get_member(1, 10)
+        assert [m.id for m in member.messages] == [1, 3]
+        assert member.warn_count == 2
+        assert len((await cache.get_member(3, 10)).messages) == 1
+
+        await cache.delete_members_many([1, 3, 4], 10)
+        assert list((await cache.get_guild(10)).members.keys()) == [2]
+
+    @pytest.mark.asyncio
+    async def test_update_member(self, create_mongo_cache):
+        def warn(member: Member) -> None:
+            member.warn_count += 1
+
+        member = await create_mongo_cache.update_member(1, 10, warn)
+        assert member.warn_count == 1
+        assert await create_mongo_cache.get_guild(10)
+
+        await create_mongo_cache.update_member(1, 10, warn)
+        assert (await create_mongo_cache.get_member(1, 10)).warn_count == 2
+
+    @pytest.mark.asyncio
+    async def test_update_member_retries(self, create_mongo_cache):
+        cache = create_mongo_cache
+        await cache.set_member(Member(1, 10))
+        calls = []
+
+        def warn(member: Member) -> None:
+            calls.append(member.warn_count)
+            member.warn_count += 1
+
+        original = cache.members.find_raw_by_custom
+
+        async def find_then_write(*args, **kwargs):
+            result = await original(*args, **kwargs)
+            if not calls:
+                # Another process writes between the read and the write
+                await cache.add_message(Message(1, 1, 10, 1, "Hello"))
+
+            return result
+
+        cache.members.find_raw_by_custom = find_then_write
+        member = await cache.update_member(1, 10, warn)
+
+        assert calls == [0, 0]
+        assert member.warn_count == 1
+        assert len(member.messages) == 1
+        stored = await cache.get_member(1, 10)
+        assert stored.warn_count == 1
+        assert len(stored.messages) == 1
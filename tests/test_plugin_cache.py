@@ -114,3 +114,16 @@ class TestPluginCache:
             await plugin_cache.get_member_data(1, 1)
 
         await plugin_cache.set_member_data(1, 1, "A member test")
+
+    @pytest.mark.asyncio
+    async def test_update_member_data(self):
+        plugin_cache = PluginCache(
+            AntiSpamHandler(commands.Bot("!"), Library.DPY), MockClass()
+        )
+
+        def increment(current):
+            return (current or 0) + 1
+
+        assert await plugin_cache.update_member_data(1, 1, increment) == 1
+        assert await plugin_cache.update_member_data(1, 1, increment) == 2
+        assert await plugin_cache.get_member_data(1, 1) == 2
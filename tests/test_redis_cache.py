@@ -8,7 +8,7 @@ from attr import asdict
 from antispam import GuildNotFound, MemberNotFound, Options
 from antispam.caches.redis import RedisCache
 from antispam.dataclasses import Guild, Member, Message
-from antispam.enums import ResetType
+from antispam.enums import MemberCounter, ResetType
 from antispam.factory import FactoryBuilder
 
 
@@ -224,3 +224,113 @@ class TestRedisCache:
         assert isinstance(member.messages[0].creation_time, datetime.datetime)
         await create_redis_cache.set_member(member)
         assert isinstance(member.messages[0].creation_time, datetime.datetime)
+
+    @pytest.mark.asyncio
+    async def test_increment_member_counter(self, create_redis_cache):
+        r_1 = await create_redis_cache.increment_member_counter(
+            1, 2, MemberCounter.KICK_COUNTER
+        )
+        assert r_1 == 1
+
+        # Creates the guild and member as required
+        guild = await create_redis_cache.get_guild(2)
+        assert guild.members[1].kick_count == 1
+
+        member = Member(
+            1, 2, kick_count=1, messages=[Message(1, 1, 2, 1, "Hello world")]
+        )
+        await create_redis_cache.set_member(member)
+        r_2 = await create_redis_cache.increment_member_counter(
+            1, 2, MemberCounter.KICK_COUNTER, 2
+        )
+        assert r_2 == 3
+
+        # The rest of the member is untouched
+        r_3 = await create_redis_cache.get_member(1, 2)
+        assert r_3.kick_count == 3
+        assert len(r_3.messages) == 1
+
+    @pytest.mark.asyncio
+    async def test_reset_member_count_missing(self, create_redis_cache):
+        await create_redis_cache.reset_member_count(1, 1, ResetType.KICK_COUNTER)
+
+        with pytest.raises(MemberNotFound):
+            await create_redis_cache.get_member(1, 1)
+
+    @pytest.mark.asyncio
+    async def test_members_many(self, create_redis_cache):
+        cache = create_redis_cache
+        assert await cache.get_members_many([1, 2], 1) == {}
+
+        await cache.set_members_many(
+            [Member(1, 1, warn_count=2), Member(2, 1), Member(1, 2)]
+        )
+        members = await cache.get_members_many([1, 2, 3], 1)
+        assert set(members.keys()) == {1, 2}
+        assert members[1].warn_count == 2
+        assert await cache.get_guild(2)
+
+        await cache.add_messages_many(
+            [
+                Message(1, 1, 1, 1, "Hello"),
+                Message(2, 1, 1, 3, "World"),
+                Message(3, 1, 1, 1, "Again"),
+            ]
+        )
+        member = await cache.get_member(1, 1)
+        assert [m.id for m in member.messages] == [1, 3]
+        assert member.warn_count == 2
+        assert len((await cache.get_member(3, 1)).messages) == 1
+
+        await cache.delete_members_many([1, 3, 4], 1)
+        assert list((await cache.get_guild(1)).members.keys()) == [2]
+
+    @pytest.mark.asyncio
+    async def test_update_member(self, create_redis_cache):
+        def warn(member: Member) -> None:
+            member.warn_count += 1
+            member.messages.append(Message(member.warn_count, 1, 1, 1, "Hello"))
+
+        member = await create_redis_cache.update_member(1, 1, warn)
+        assert member.warn_count == 1
+        assert await create_redis_cache.get_guild(1)
+
+        await create_redis_cache.update_member(1, 1, warn)
+        member = await create_redis_cache.get_member(1, 1)
+        assert member.warn_count == 2
+        assert [m.id for m in member.messages] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_update_member_in_pipeline(self, create_redis_cache):
+        def warn(member: Member) -> None:
+            member.warn_count += 1
+
+        async with create_redis_cache.pipeline(1):
+            await create_redis_cache.update_member(1, 1, warn)
+            assert (await create_redis_cache.get_member(1, 1)).warn_count == 1
+
+        assert (await create_redis_cache.get_member(1, 1)).warn_count == 1
+
+    @pytest.mark.asyncio
+    async def test_add_messages_keeps_concurrent_increments(self, create_redis_cache):
+        cache = create_redis_cache
+        await cache.set_member(Member(1, 1, warn_count=2))
+        read = cache.redis.hgetall
+
+        async def hgetall(key):
+            resp = await read(key)
+            # Another process increments between the read and the write
+            await cache.redis.hincrby(key, "warn_count", 1)
+            return resp
+
+        cache.redis.hgetall = hgetall
+        await cache.add_messages_many(
+            [Message(1, 1, 1, 1, "Hello"), Message(2, 1, 1, 2, "World")]
+        )
+        cache.redis.hgetall = read
+
+        member = await cache.get_member(1, 1)
+        assert member.warn_count == 3
+        assert [m.id for m in member.messages] == [1]
+        # Even when the member was created meanwhile
+        assert (await cache.redis.hgetall("MEMBER:1:2"))[b"warn_count"] == b"1"
@@ -0,0 +1,76 @@
+import orjson as json
+import pytest
+from attr import asdict
+
+from antispam import Options
+from antispam.caches.redis import RedisCache
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture()
+def create_fake_redis():
+    return fakeredis.FakeAsyncRedis()
+
+
+class TestRedisHashTags:
+    @pytest.mark.asyncio
+    async def test_key_layout(self, create_handler, create_fake_redis):
+        cache = RedisCache(create_handler, create_fake_redis, hash_tags=True)
+        await cache.set_member(Member(2, 1))
+        await cache.increment_member_counter(2, 1, MemberCounter.KICK_COUNTER)
+
+        assert sorted(await create_fake_redis.keys("*")) == [
+            b"GUILD:{1}",
+            b"MEMBER:{1}:2",
+        ]
+
+        guild = await cache.get_guild(1)
+        assert guild.members[2].kick_count == 1
+        assert [g.id async for g in cache.get_all_guilds()] == [1]
+
+        await cache.delete_guild(1)
+        assert not await create_fake_redis.keys("*")
+
+    @pytest.mark.asyncio
+    async def test_pipeline(self, create_handler, create_fake_redis):
+        cache = RedisCache(create_handler, create_fake_redis, hash_tags=True)
+        await cache.set_member(Member(2, 1))
+
+        async with cache.pipeline(1):
+            await cache.add_message(Message(1, 1, 1, 2, "Hello world"))
+
+        member = await cache.get_member(2, 1)
+        assert len(member.messages) == 1
+
+    @pytest.mark.asyncio
+    async def test_migrate_keys(self, create_handler, create_fake_redis):
+        old = RedisCache(create_handler, create_fake_redis)
+        await old.set_guild(Guild(1, Options(), members={2: Member(2, 1)}))
+        await old.increment_member_counter(2, 1, MemberCounter.WARN_COUNTER)
+
+        # The layout before members were stored as hashes
+        await create_fake_redis.set(
+            "MEMBER:1:3",
+            json.dumps(asdict(Member(3, 1, kick_count=2), recurse=True)),
+        )
+
+        cache = RedisCache(create_handler, create_fake_redis, hash_tags=True)
+        assert await cache.migrate_keys() == 3
+        assert await cache.migrate_keys() == 0
+
+        guild = await cache.get_guild(1)
+        assert guild.members[2].warn_count == 1
+        assert guild.members[3].kick_count == 2
+        assert sorted(await create_fake_redis.keys("*")) == [
+            b"GUILD:{1}",
+            b"MEMBER:{1}:2",
+            b"MEMBER:{1}:3",
+        ]
+
+        # And back again
+        assert await old.migrate_keys() == 3
+        guild = await old.get_guild(1)
+        assert len(guild.members) == 2
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from antispam import Options
+from antispam.caches import TieredCache
+from antispam.caches.redis import RedisCache, RedisInvalidator
+from antispam.dataclasses import Guild, Member
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+async def wait_for(predicate, timeout: float = 1) -> bool:
+    """Give pub/sub messages time to arrive"""
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return True
+
+        await asyncio.sleep(0.01)
+
+    return predicate()
+
+
+@pytest.fixture()
+def create_nodes(create_handler):
+    """Two processes, each with their own connection to the same redis"""
+    server = fakeredis.FakeServer()
+    nodes = []
+    for _ in range(2):
+        redis = fakeredis.FakeAsyncRedis(server=server)
+        nodes.append(
+            TieredCache(
+                create_handler,
+                RedisCache(create_handler, redis),
+                flush_interval=60,
+                invalidator=RedisInvalidator(redis),
+            )
+        )
+
+    return nodes
+
+
+class TestRedisInvalidation:
+    @pytest.mark.asyncio
+    async def test_guild_options_change(self, create_nodes):
+        node_1, node_2 = create_nodes
+        for node in create_nodes:
+            await node.initialize()
+
+        await node_1.set_guild(Guild(1, Options()))
+        await node_1.flush()
+        assert (await node_2.get_guild(1)).options == Options()
+
+        guild = await node_1.get_guild(1)
+        guild.options = Options(warn_threshold=10)
+        await node_1.set_guild(guild)
+        await node_1.flush()
+
+        assert await wait_for(lambda: 1 not in node_2._guilds)
+        assert (await node_2.get_guild(1)).options.warn_threshold == 10
+        # Our own changes never invalidate ourselves
+        assert 1 in node_1._guilds
+
+        for node in create_nodes:
+            await node.close()
+
+    @pytest.mark.asyncio
+    async def test_member_change(self, create_nodes):
+        node_1, node_2 = create_nodes
+        for node in create_nodes:
+            await node.initialize()
+
+        await node_1.set_guild(Guild(1, Options(), members={1: Member(1, 1)}))
+        await node_1.flush()
+        assert (await node_2.get_member(1, 1)).kick_count == 0
+
+        member = await node_1.get_member(1, 1)
+        member.kick_count = 2
+        await node_1.set_member(member)
+        await node_1.flush()
+
+        assert await wait_for(lambda: 1 in node_2._stale_members)
+        # Only the member is reloaded, not the guild
+        assert 1 in node_2._guilds
+        assert (await node_2.get_member(1, 1)).kick_count == 2
+
+        for node in create_nodes:
+            await node.close()
+
+    @pytest.mark.asyncio
+    async def test_pending_changes_are_kept(self, create_nodes):
+        node_1, node_2 = create_nodes
+        for node in create_nodes:
+            await node.initialize()
+
+        await node_1.set_guild(Guild(1, Options()))
+        await node_1.flush()
+
+        await node_2.set_member(Member(2, 1))
+        await node_1.set_guild(Guild(1, Options(warn_threshold=10)))
+        await node_1.flush()
+
+        assert await wait_for(lambda: 1 in node_2._stale_guilds)
+        assert (await node_2.get_member(2, 1)).id == 2
+
+        # Dropped once written
+        await node_2.flush()
+        assert 1 not in node_2._guilds
+
+        for node in create_nodes:
+            await node.close()
+
+    @pytest.mark.asyncio
+    async def test_out_of_order_invalidations(self, create_nodes):
+        node_1, node_2 = create_nodes
+        invalidator: RedisInvalidator = node_2.invalidator
+        calls = []
+
+        async def callback(guild_id, member_id):
+            calls.append((guild_id, member_id))
+
+        # Each member is invalidated, whichever order they arrive in
+        await invalidator._handle(b"other:1:5", callback)
+        await invalidator._handle(b"other:1:4", callback)
+        await invalidator._handle(b"other:1:5", callback)
+        await invalidator._handle(b"other:1:", callback)
+        await invalidator._handle(f"{invalidator.node_id}:1:".encode(), callback)
+        assert calls == [(1, 5), (1, 4), (1, 5), (1, None)]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("data", [b"other:1", b"other:1:5:6", b"other:x:5"])
+    async def test_malformed_invalidations(self, create_nodes, data):
+        invalidator: RedisInvalidator = create_nodes[1].invalidator
+        calls = []
+
+        async def callback(guild_id, member_id):
+            calls.append((guild_id, member_id))
+
+        with pytest.raises(ValueError):
+            await invalidator._handle(data, callback)
+
+        assert calls == []
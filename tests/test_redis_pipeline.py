@@ -0,0 +1,239 @@
+import asyncio
+
+import pytest
+
+from antispam import Options
+from antispam.caches.redis import RedisCache
+from antispam.core import Core
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter
+from tests.mocks import CountingRedis, MockedMessage
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture()
+def create_counting_redis_cache(create_handler) -> RedisCache:
+    return RedisCache(create_handler, CountingRedis(fakeredis.FakeAsyncRedis()))
+
+
+class TestRedisPipeline:
+    @pytest.mark.asyncio
+    async def test_propagate_round_trips(self, create_counting_redis_cache):
+        cache = create_counting_redis_cache
+        await cache.set_guild(Guild(1, Options()))
+        await cache.set_member(
+            Member(1, 1, messages=[Message(1, 1, 1, 1, "Hello world")])
+        )
+        await cache.set_member(Member(2, 1))
+        cache.redis.round_trips = 0
+
+        async with cache.pipeline(1):
+            guild = await cache.get_guild(1)
+            assert len(guild.members) == 2
+
+            await cache.update_member(
+                1, 1, lambda m: m.messages.append(Message(2, 1, 1, 1, "foo bar"))
+            )
+            await cache.increment_member_counter(1, 1, MemberCounter.WARN_COUNTER)
+            member = await cache.get_member(1, 1)
+            assert len(member.messages) == 2
+            assert member.warn_count == 1
+
+        # Three to read and watch, the update is written straight away
+        # and the increment goes straight to redis, so it can't act
+        # on stale counters
+        assert cache.redis.round_trips == 5
+
+        member = await cache.get_member(1, 1)
+        assert len(member.messages) == 2
+        assert member.warn_count == 1
+
+    @pytest.mark.asyncio
+    async def test_core_round_trips(self, create_handler, create_counting_redis_cache):
+        """Tests the round trips a propagate makes, as documented"""
+        cache = create_counting_redis_cache
+        create_handler.set_cache(cache)
+        core = Core(create_handler)
+        await cache.set_guild(Guild(1, Options(no_punish=True)))
+        await cache.set_member(Member(2, 1))
+
+        async def propagate(message_id: int, author_id: int) -> int:
+            cache.redis.round_trips = 0
+            async with cache.pipeline(1):
+                guild = await cache.get_guild(1)
+                await core.propagate_user(
+                    MockedMessage(
+                        guild_id=1, author_id=author_id, message_id=message_id
+                    ).to_mock(),
+                    guild,
+                )
+
+            return cache.redis.round_trips
+
+        # A member's first message has nothing watched beforehand
+        assert await propagate(1, 1) == 6
+        assert await propagate(2, 1) == 4
+        assert await propagate(3, 2) == 4
+
+        member = await cache.get_member(1, 1)
+        assert [m.id for m in member.messages] == [1, 2]
+        assert member.duplicate_counter == 2
+
+    @pytest.mark.asyncio
+    async def test_guarded_update_retries(self, create_handler):
+        redis = fakeredis.FakeAsyncRedis()
+        cache = RedisCache(create_handler, redis)
+        await cache.set_member(Member(1, 1))
+        calls = []
+
+        def warn(member: Member) -> None:
+            calls.append(member.kick_count)
+            member.warn_count += 1
+
+        async with cache.pipeline(1):
+            # Another process writes after the scope read the member
+            await redis.hincrby(cache._member_key(1, 1), "kick_count", 1)
+            member = await cache.update_member(1, 1, warn)
+
+        assert calls == [0, 1]
+        assert member.warn_count == 1
+        assert member.kick_count == 1
+
+        stored = await cache.get_member(1, 1)
+        assert stored.warn_count == 1
+        assert stored.kick_count == 1
+
+    @pytest.mark.asyncio
+    async def test_empty_guild(self, create_counting_redis_cache):
+        cache = create_counting_redis_cache
+
+        async with cache.pipeline(1):
+            await cache.set_member(
+                Member(1, 1, messages=[Message(1, 1, 1, 1, "Hello world")])
+            )
+
+        assert cache.redis.round_trips <= 2
+        guild = await cache.get_guild(1)
+        assert len(guild.members[1].messages) == 1
+
+    @pytest.mark.asyncio
+    async def test_nested_and_other_guilds(self, create_counting_redis_cache):
+        cache = create_counting_redis_cache
+
+        async with cache.pipeline(1):
+            async with cache.pipeline(1):
+                await cache.set_member(Member(1, 1))
+
+            await cache.set_member(Member(1, 2))
+            # Other guilds go straight to redis
+            assert await cache.get_member(1, 2)
+
+        assert await cache.get_member(1, 1)
+
+    @pytest.mark.asyncio
+    async def test_batch_round_trips(self, create_counting_redis_cache):
+        cache = create_counting_redis_cache
+
+        await cache.set_members_many([Member(i, 1) for i in range(10)])
+        assert cache.redis.round_trips == 1
+
+        cache.redis.round_trips = 0
+        assert len(await cache.get_members_many(range(10), 1)) == 10
+        assert cache.redis.round_trips == 1
+
+        cache.redis.round_trips = 0
+        await cache.add_messages_many(
+            [Message(i, 1, 1, i % 5, "Hello world") for i in range(10)]
+        )
+        assert cache.redis.round_trips == 2
+        assert len((await cache.get_member(0, 1)).messages) == 2
+
+        cache.redis.round_trips = 0
+        await cache.delete_members_many(range(10), 1)
+        assert cache.redis.round_trips == 1
+        assert await cache.get_members_many(range(10), 1) == {}
+
+    @pytest.mark.asyncio
+    async def test_update_member_retries(self, create_handler):
+        redis = fakeredis.FakeAsyncRedis()
+        cache = RedisCache(create_handler, redis)
+        await cache.set_member(Member(1, 1))
+        calls = []
+
+        def warn(member: Member) -> None:
+            calls.append(member.kick_count)
+            member.warn_count += 1
+
+        create_pipeline = redis.pipeline
+
+        def pipeline(*args, **kwargs):
+            pipe = create_pipeline(*args, **kwargs)
+            watched_read = pipe.hgetall
+
+            async def hgetall(key):
+                resp = await watched_read(key)
+                if not calls:
+                    # Another process writes between the read and the write
+                    await redis.hincrby(key, "kick_count", 1)
+
+                return resp
+
+            pipe.hgetall = hgetall
+            return pipe
+
+        redis.pipeline = pipeline
+        member = await cache.update_member(1, 1, warn)
+
+        assert calls == [0, 1]
+        assert member.warn_count == 1
+        assert member.kick_count == 1
+
+        stored = await cache.get_member(1, 1)
+        assert stored.warn_count == 1
+        assert stored.kick_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_increments_within_scope(self, create_handler):
+        redis = fakeredis.FakeAsyncRedis()
+        cache = RedisCache(create_handler, redis)
+        await cache.set_member(Member(1, 1))
+
+        async def warn():
+            async with cache.pipeline(1):
+                # Read within the scope, before anyone has incremented
+                await cache.get_member(1, 1)
+                await asyncio.sleep(0)
+                return await cache.increment_member_counter(
+                    1, 1, MemberCounter.WARN_COUNTER
+                )
+
+        values = await asyncio.gather(*[warn() for _ in range(5)])
+
+        assert sorted(values) == [1, 2, 3, 4, 5]
+        assert (await cache.get_member(1, 1)).warn_count == 5
+
+    @pytest.mark.asyncio
+    async def test_concurrent_updates_within_scope(self, create_handler):
+        redis = fakeredis.FakeAsyncRedis()
+        cache = RedisCache(create_handler, redis)
+        await cache.set_guild(Guild(1, Options()))
+
+        def add_message(message_id: int):
+            def update(member: Member) -> None:
+                member.messages.append(Message(message_id, 1, 1, 1, "Hello world"))
+
+            return update
+
+        async def propagate(message_id: int):
+            async with cache.pipeline(1):
+                await asyncio.sleep(0)
+                await cache.update_member(1, 1, add_message(message_id))
+                # Reads within the scope see the update
+                member = await cache.get_member(1, 1)
+                assert message_id in [m.id for m in member.messages]
+
+        await asyncio.gather(*[propagate(i) for i in range(5)])
+
+        member = await cache.get_member(1, 1)
+        assert sorted(m.id for m in member.messages) == [0, 1, 2, 3, 4]
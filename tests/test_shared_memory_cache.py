@@ -0,0 +1,338 @@
+import asyncio
+import datetime
+import multiprocessing
+import os
+
+import pytest
+
+from antispam import CacheFull, GuildNotFound, MemberNotFound, Options
+from antispam.caches.shared_memory import SharedMemoryCache
+from antispam.core import Core
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter, ResetType
+from antispam.fingerprint import parse_fingerprint
+from antispam.util import get_aware_time
+
+from .mocks import MockedMessage
+
+
+def attach(cache: SharedMemoryCache, **kwargs) -> SharedMemoryCache:
+    layout = dict(
+        guild_capacity=cache.guild_capacity,
+        member_capacity=cache.member_capacity,
+        messages_per_member=cache.messages_per_member,
+        content_size=cache.content_size,
+    )
+    layout.update(kwargs)
+    return SharedMemoryCache(cache.handler, cache.name, **layout)
+
+
+def increment_in_process(cache: SharedMemoryCache, count: int) -> None:
+    async def run():
+        # Each process locks the same file by default
+        other = attach(cache)
+        for _ in range(count):
+            await other.increment_member_counter(1, 1, MemberCounter.WARN_COUNTER)
+
+        other.close()
+
+    asyncio.run(run())
+
+
+class TestSharedMemoryCache:
+    @pytest.mark.asyncio
+    async def test_guild(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        with pytest.raises(GuildNotFound):
+            await cache.get_guild(1)
+
+        options = Options(
+            no_punish=True,
+            ignored_members={5},
+            max_messages_per_member=3,
+            message_duplicate_count=3,
+            store_message_content=False,
+        )
+        guild = Guild(1, options, log_channel_id=3, addons={"Plugin": [1, 2]})
+        guild.members[1] = Member(
+            1, 1, messages=[Message(1, 2, 1, 1, "Hello"), Message(2, 3, 1, 1, "World")]
+        )
+        guild.members[2] = Member(2, 1, kick_count=1)
+        await cache.set_guild(guild)
+
+        stored = await cache.get_guild(1)
+        assert stored.options == options
+        assert stored.log_channel_id == 3
+        assert stored.addons == {"Plugin": [1, 2]}
+        assert stored.members.keys() == {1, 2}
+        assert stored.members[1].messages == guild.members[1].messages
+        assert stored.members[2].kick_count == 1
+
+        # Old members are replaced
+        await cache.set_guild(Guild(1, options))
+        assert (await cache.get_guild(1)).members == {}
+
+        await cache.delete_guild(1)
+        with pytest.raises(GuildNotFound):
+            await cache.get_guild(1)
+
+    @pytest.mark.asyncio
+    async def test_member(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        with pytest.raises(GuildNotFound):
+            await cache.get_member(1, 1)
+
+        member = Member(
+            1,
+            1,
+            warn_count=2,
+            duplicate_counter=3,
+            duplicate_channel_counter_dict={5: 2},
+            internal_is_in_guild=False,
+            addons={"Plugin": "value"},
+        )
+        await cache.set_member(member)
+        stored = await cache.get_member(1, 1)
+        assert stored.warn_count == 2
+        assert stored.duplicate_counter == 3
+        assert stored.duplicate_channel_counter_dict == {5: 2}
+        assert stored.internal_is_in_guild is False
+        assert stored.addons == {"Plugin": "value"}
+
+        # The guild was created with the handlers options
+        assert (await cache.get_guild(1)).options == cache.handler.options
+
+        with pytest.raises(MemberNotFound):
+            await cache.get_member(2, 1)
+
+        await cache.delete_member(1, 1)
+        with pytest.raises(MemberNotFound):
+            await cache.get_member(1, 1)
+
+    @pytest.mark.asyncio
+    async def test_messages(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        creation_time = get_aware_time()
+        for message_id in range(3):
+            await cache.add_message(
+                Message(message_id, 2, 1, 1, f"Message {message_id}", creation_time)
+            )
+
+        messages = (await cache.get_member(1, 1)).messages
+        assert [m.id for m in messages] == [0, 1, 2]
+        assert messages[0].creation_time == creation_time
+
+        # The handler caps members first, so this is only reachable without it
+        with pytest.raises(CacheFull):
+            await cache.add_message(Message(3, 2, 1, 1, "Message 3"))
+
+        member = Member(1, 1, messages=messages + [Message(3, 2, 1, 1, "Message 3")])
+        with pytest.raises(CacheFull):
+            await cache.set_member(member)
+
+        assert len((await cache.get_member(1, 1)).messages) == 3
+
+        # Content is truncated without splitting characters
+        await cache.add_message(Message(6, 2, 1, 2, "a" * 15 + "é"))
+        assert (await cache.get_member(2, 1)).messages[-1].content == "a" * 15
+
+        await cache.add_message(
+            Message(7, 2, 1, 2, "Naive", datetime.datetime(2021, 1, 1))
+        )
+        assert (await cache.get_member(2, 1)).messages[-1].creation_time == (
+            datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+        )
+
+    @pytest.mark.asyncio
+    async def test_window_caps(self, create_handler, create_shared_memory_cache):
+        """Tests Core keeps members within messages_per_member"""
+        create_handler.set_cache(create_shared_memory_cache)
+        core = Core(create_handler)
+        guild = Guild(
+            1,
+            Options(
+                no_punish=True,
+                max_messages_per_member=3,
+                message_duplicate_count=2,
+                store_message_content=False,
+            ),
+        )
+        await create_shared_memory_cache.set_guild(guild)
+
+        contents = ["spam", "spam", "a b", "c d", "e f"]
+        for message_id, content in enumerate(contents + ["g h"] * 20):
+            await core.propagate_user(
+                MockedMessage(
+                    guild_id=1,
+                    author_id=1,
+                    message_id=message_id,
+                    message_clean_content=content,
+                ).to_mock(),
+                guild,
+            )
+
+        member = await create_shared_memory_cache.get_member(1, 1)
+        assert len(member.messages) == 3
+        assert all(m.content == member.messages[0].content for m in member.messages)
+        assert parse_fingerprint(member.messages[0].content) == (3, "g h")
+
+    @pytest.mark.asyncio
+    async def test_options(self, create_handler, create_shared_memory_cache):
+        """Tests options which could exceed the layout are rejected"""
+        cache = create_shared_memory_cache
+        for options in [
+            Options(max_messages_per_member=3),
+            Options(store_message_content=False),
+            Options(max_messages_per_member=4, store_message_content=False),
+            Options(
+                max_messages_per_member=3,
+                message_duplicate_count=4,
+                store_message_content=False,
+            ),
+        ]:
+            with pytest.raises(ValueError):
+                await cache.set_guild(Guild(1, options))
+
+            create_handler.options = options
+            with pytest.raises(ValueError):
+                attach(cache)
+
+        with pytest.raises(ValueError):
+            attach(cache, content_size=8)
+
+    @pytest.mark.asyncio
+    async def test_long_content(self, create_handler, create_shared_memory_cache):
+        """Tests content sharing a prefix longer than content_size isn't a duplicate"""
+        create_handler.set_cache(create_shared_memory_cache)
+        core = Core(create_handler)
+        guild = Guild(1, create_handler.options)
+        await create_shared_memory_cache.set_guild(guild)
+
+        contents = [
+            "alpha beta gamma delta",
+            "alpha beta gamma delta epsilon zeta eta theta iota kappa",
+            "alpha beta gamma delta epsilon zeta eta theta iota kappa",
+        ]
+        for message_id, content in enumerate(contents):
+            await core.propagate_user(
+                MockedMessage(
+                    guild_id=1,
+                    author_id=1,
+                    message_id=message_id,
+                    message_clean_content=content,
+                ).to_mock(),
+                guild,
+            )
+
+        member = await create_shared_memory_cache.get_member(1, 1)
+        # Only the identical messages are duplicates
+        assert [m.is_duplicate for m in member.messages] == [False, True, True]
+        assert member.duplicate_counter == 2
+
+    @pytest.mark.asyncio
+    async def test_counters(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        assert (
+            await cache.increment_member_counter(1, 1, MemberCounter.WARN_COUNTER) == 1
+        )
+        assert (
+            await cache.increment_member_counter(1, 1, MemberCounter.TIMEOUT_COUNTER, 3)
+            == 3
+        )
+        await cache.increment_member_counter(1, 1, MemberCounter.KICK_COUNTER)
+
+        await cache.reset_member_count(1, 1, ResetType.WARN_COUNTER)
+        member = await cache.get_member(1, 1)
+        assert member.warn_count == 0
+        assert member.kick_count == 1
+        assert member.times_timed_out == 3
+
+        # Missing members are ignored
+        await cache.reset_member_count(2, 1, ResetType.KICK_COUNTER)
+
+    @pytest.mark.asyncio
+    async def test_update_member(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        await cache.add_message(Message(1, 2, 1, 1, "Hello"))
+
+        def warn(member: Member) -> None:
+            member.warn_count += 1
+            member.messages.append(Message(2, 2, 1, 1, "World"))
+
+        member = await cache.update_member(1, 1, warn)
+        assert member.warn_count == 1
+        assert await cache.get_member(1, 1) == member
+        assert [m.id for m in (await cache.get_member(1, 1)).messages] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_batch(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        await cache.set_members_many([Member(1, 1), Member(2, 1), Member(3, 1)])
+        await cache.add_messages_many(
+            [Message(1, 2, 1, 1, "Hello"), Message(2, 2, 1, 2, "World")]
+        )
+        members = await cache.get_members_many([1, 2, 4], 1)
+        assert members.keys() == {1, 2}
+        assert len(members[2].messages) == 1
+
+        # Removing from the middle of a guild keeps the rest linked
+        await cache.delete_members_many([2], 1)
+        assert (await cache.get_guild(1)).members.keys() == {1, 3}
+        await cache.delete_members_many([3, 1], 1)
+        assert (await cache.get_guild(1)).members == {}
+
+    @pytest.mark.asyncio
+    async def test_full(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        await cache.set_members_many([Member(i, 1) for i in range(8)])
+        with pytest.raises(CacheFull):
+            await cache.set_member(Member(8, 1))
+
+        # Freed slots are reused
+        await cache.delete_member(3, 1)
+        await cache.set_member(Member(8, 1))
+        assert len((await cache.get_guild(1)).members) == 8
+
+        with pytest.raises(ValueError):
+            await cache.set_member(Member(9, 1, addons={"Plugin": "a" * 1024}))
+
+    @pytest.mark.asyncio
+    async def test_all_guilds_and_drop(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        await cache.set_member(Member(1, 1))
+        await cache.set_member(Member(1, 2))
+        assert {g.id async for g in cache.get_all_guilds()} == {1, 2}
+        assert [m.id async for m in cache.get_all_members(2)] == [1]
+
+        await cache.drop()
+        assert [g async for g in cache.get_all_guilds()] == []
+
+    @pytest.mark.asyncio
+    async def test_shared(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        other = attach(cache)
+        await cache.set_member(Member(1, 1, warn_count=1))
+        await other.increment_member_counter(1, 1, MemberCounter.WARN_COUNTER)
+        assert (await cache.get_member(1, 1)).warn_count == 2
+        other.close()
+
+        with pytest.raises(ValueError):
+            await attach(cache, member_capacity=16).initialize()
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(os.name != "posix", reason="Requires fork")
+    async def test_processes(self, create_shared_memory_cache):
+        cache = create_shared_memory_cache
+        context = multiprocessing.get_context("fork")
+        await cache.initialize()
+
+        processes = [
+            context.Process(target=increment_in_process, args=(cache, 50))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        assert (await cache.get_member(1, 1)).warn_count == 200
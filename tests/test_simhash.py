@@ -0,0 +1,46 @@
+import pytest
+from thefuzz import fuzz
+
+from antispam.fingerprint import create_fingerprint
+from antispam.simhash import create_simhash, distance_threshold, hamming_distance
+
+
+class TestSimHash:
+    def test_create_simhash(self):
+        simhash = create_simhash("Hello, World! this is SPAM")
+        assert 0 <= simhash < 2**64
+        assert simhash == create_simhash("spam this is world hello")
+        assert simhash == create_simhash(
+            create_fingerprint("Hello, World! this is SPAM"), True
+        )
+        # Only parsed as a fingerprint when content is fingerprinted
+        assert create_simhash("\ufdd05\ufdd0 spam") == create_simhash("5 spam")
+
+        assert create_simhash("") is None
+        assert create_simhash("!!!") is None
+
+    def test_hamming_distance(self):
+        assert hamming_distance(0, 0) == 0
+        assert hamming_distance(0b1011, 0b0110) == 3
+        assert hamming_distance(0, 2**64 - 1) == 64
+
+    def test_distance_threshold(self):
+        assert distance_threshold(100) == 0
+        assert distance_threshold(90) == 9
+        assert distance_threshold(0) == 32
+        thresholds = [distance_threshold(accuracy) for accuracy in range(101)]
+        assert thresholds == sorted(thresholds, reverse=True)
+
+    @pytest.mark.parametrize(
+        "first, second",
+        [
+            ("Hello world", "world hello"),
+            ("Join my server for free nitro", "Join my server for free nitro!!"),
+            ("This is a test", "Heres another message"),
+            ("free nitro " * 50, "totally legit giveaway " * 50),
+        ],
+    )
+    def test_agrees_with_token_sort_ratio(self, first, second):
+        expected = fuzz.token_sort_ratio(first, second) >= 90
+        distance = hamming_distance(create_simhash(first), create_simhash(second))
+        assert (distance <= distance_threshold(90)) == expected
@@ -0,0 +1,186 @@
+import os
+
+import pytest
+
+from antispam import GuildNotFound, Options
+from antispam.caches import MemoryCache
+from antispam.caches.codecs import JsonCodec, MsgPackCodec
+from antispam.caches.snapshot import SnapshotCache, write_snapshot
+from antispam.dataclasses import Guild, Member, Message
+
+
+@pytest.fixture()
+def snapshot_path(tmp_path) -> str:
+    return os.path.join(tmp_path, "antispam.snapshot")
+
+
+async def fill(cache: MemoryCache) -> None:
+    await cache.set_guild(Guild(1, Options(no_punish=True), log_channel_id=5))
+    await cache.add_message(Message(1, 2, 1, 1, "Hello"))
+    await cache.add_message(Message(2, 2, 1, 1, "World"))
+    await cache.set_member(Member(2, 1, warn_count=3))
+    await cache.set_member(Member(1, 2))
+
+
+class TestSnapshotCache:
+    @pytest.mark.asyncio
+    async def test_round_trip(self, create_handler, create_memory_cache, snapshot_path):
+        await fill(create_memory_cache)
+        assert await write_snapshot(create_memory_cache, snapshot_path) == 2
+        assert not os.path.exists(f"{snapshot_path}.tmp")
+
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.initialize()
+        assert cache.pending_guilds == 2
+        assert not cache.cache
+
+        # Only the accessed guild and member are decoded
+        member = await cache.get_member(1, 1)
+        assert [m.content for m in member.messages] == ["Hello", "World"]
+        assert cache.pending_guilds == 1
+        assert cache.pending_members == 1
+        assert list(cache.cache[1].members.keys()) == [1]
+
+        guild = await cache.get_guild(1)
+        assert guild.options == Options(no_punish=True)
+        assert guild.log_channel_id == 5
+        assert guild.members[2].warn_count == 3
+        assert cache.pending_members == 0
+
+        assert len([g async for g in cache.get_all_guilds()]) == 2
+        assert cache.pending_guilds == 0
+        assert cache._snapshot is None
+
+    @pytest.mark.asyncio
+    async def test_writes_replace_the_snapshot(
+        self, create_handler, create_memory_cache, snapshot_path
+    ):
+        await fill(create_memory_cache)
+        await write_snapshot(create_memory_cache, snapshot_path)
+
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.set_guild(Guild(1, Options()))
+        assert (await cache.get_guild(1)).members == {}
+
+        await cache.delete_guild(2)
+        with pytest.raises(GuildNotFound):
+            await cache.get_guild(2)
+
+        # Writes to a guild keep what the snapshot held
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.add_message(Message(3, 2, 1, 1, "Again"))
+        assert len((await cache.get_member(1, 1)).messages) == 3
+        assert (await cache.get_guild(1)).members[2].warn_count == 3
+
+        # As do writes to other members
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.delete_member(1, 1)
+        await cache.set_member(Member(3, 1))
+        assert set((await cache.get_guild(1)).members.keys()) == {2, 3}
+
+        # Replaced members aren't decoded
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.set_member(Member(2, 1))
+        assert (await cache.get_member(2, 1)).warn_count == 0
+        assert len((await cache.get_member(1, 1)).messages) == 2
+
+    @pytest.mark.asyncio
+    async def test_appends(self, create_handler, create_memory_cache, snapshot_path):
+        await fill(create_memory_cache)
+        await write_snapshot(create_memory_cache, snapshot_path)
+        with open(snapshot_path, "rb") as file:
+            original = file.read()
+
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.add_message(Message(3, 2, 1, 1, "Again"))
+        await write_snapshot(cache, snapshot_path)
+
+        # Only the changed member and the indexes are written again
+        member = await create_memory_cache.get_member(1, 1)
+        member.messages.append(Message(3, 2, 1, 1, "Again"))
+        with open(snapshot_path, "rb") as file:
+            assert file.read(len(original)) == original
+            appended = len(file.read())
+
+        assert appended < len(JsonCodec().encode_member(member)) + 200
+
+        cache = SnapshotCache(create_handler, snapshot_path)
+        assert len((await cache.get_member(1, 1)).messages) == 3
+        assert (await cache.get_member(2, 1)).warn_count == 3
+        assert await cache.get_guild(2)
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_incomplete_append(
+        self, create_handler, create_memory_cache, snapshot_path
+    ):
+        await fill(create_memory_cache)
+        await write_snapshot(create_memory_cache, snapshot_path)
+        (await create_memory_cache.get_member(1, 1)).warn_count = 5
+        await write_snapshot(create_memory_cache, snapshot_path)
+
+        # Lose the end of the last save
+        with open(snapshot_path, "r+b") as file:
+            file.truncate(os.path.getsize(snapshot_path) - 10)
+
+        cache = SnapshotCache(create_handler, snapshot_path)
+        assert (await cache.get_member(1, 1)).warn_count == 0
+        await cache.close()
+
+        # Appending to it is still readable
+        await write_snapshot(create_memory_cache, snapshot_path)
+        cache = SnapshotCache(create_handler, snapshot_path)
+        assert (await cache.get_member(1, 1)).warn_count == 5
+        await cache.close()
+
+    @pytest.mark.asyncio
+    async def test_compacts(self, create_handler, create_memory_cache, snapshot_path):
+        await fill(create_memory_cache)
+        await write_snapshot(create_memory_cache, snapshot_path)
+        size = os.path.getsize(snapshot_path)
+
+        member = await create_memory_cache.get_member(1, 1)
+        for count in range(10):
+            member.warn_count = count
+            await write_snapshot(create_memory_cache, snapshot_path)
+            assert os.path.getsize(snapshot_path) < size * 2
+
+        cache = SnapshotCache(create_handler, snapshot_path)
+        assert (await cache.get_member(1, 1)).warn_count == 9
+        assert len([g async for g in cache.get_all_guilds()]) == 2
+
+    @pytest.mark.asyncio
+    async def test_codecs(self, create_handler, create_memory_cache, snapshot_path):
+        pytest.importorskip("msgpack")
+        await fill(create_memory_cache)
+        await write_snapshot(create_memory_cache, snapshot_path, codec=MsgPackCodec())
+
+        cache = SnapshotCache(create_handler, snapshot_path, codec=MsgPackCodec())
+        assert len((await cache.get_member(1, 1)).messages) == 2
+
+        with pytest.raises(ValueError):
+            await SnapshotCache(
+                create_handler, snapshot_path, codec=JsonCodec()
+            ).initialize()
+
+    @pytest.mark.asyncio
+    async def test_missing_or_invalid(self, create_handler, snapshot_path):
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.initialize()
+        with pytest.raises(GuildNotFound):
+            await cache.get_guild(1)
+
+        with open(snapshot_path, "wb") as file:
+            file.write(b"Not a snapshot")
+
+        with pytest.raises(ValueError):
+            await SnapshotCache(create_handler, snapshot_path).initialize()
+
+    @pytest.mark.asyncio
+    async def test_empty(self, create_handler, create_memory_cache, snapshot_path):
+        assert await write_snapshot(create_memory_cache, snapshot_path) == 0
+
+        cache = SnapshotCache(create_handler, snapshot_path)
+        await cache.initialize()
+        assert cache.pending_guilds == 0
+        assert [g async for g in cache.get_all_guilds()] == []
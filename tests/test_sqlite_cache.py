@@ -0,0 +1,214 @@
+import asyncio
+import datetime
+import os
+
+import pytest
+
+from antispam import GuildNotFound, MemberNotFound, Options
+from antispam.caches.sqlite import SQLiteCache
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter, ResetType
+from antispam.util import get_aware_time
+
+pytest.importorskip("aiosqlite")
+
+
+class TestSQLiteCache:
+    @pytest.mark.asyncio
+    async def test_initialize(self, create_sqlite_cache):
+        await create_sqlite_cache.initialize()
+        db = await create_sqlite_cache._connection()
+        async with db.execute("PRAGMA foreign_keys") as cursor:
+            assert (await cursor.fetchone())[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_guild(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        with pytest.raises(GuildNotFound):
+            await cache.get_guild(1)
+
+        options = Options(no_punish=True, ignored_members={5})
+        guild = Guild(1, options, log_channel_id=3, addons={"Plugin": [1, 2]})
+        guild.members[1] = Member(
+            1, 1, messages=[Message(1, 2, 1, 1, "Hello"), Message(2, 3, 1, 1, "World")]
+        )
+        await cache.set_guild(guild)
+
+        stored = await cache.get_guild(1)
+        assert stored.options == options
+        assert stored.log_channel_id == 3
+        assert stored.addons == {"Plugin": [1, 2]}
+        assert stored.members[1].messages == guild.members[1].messages
+
+        # Old members are replaced
+        await cache.set_guild(Guild(1, Options()))
+        assert (await cache.get_guild(1)).members == {}
+
+        await cache.delete_guild(1)
+        with pytest.raises(GuildNotFound):
+            await cache.get_guild(1)
+
+    @pytest.mark.asyncio
+    async def test_member(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        with pytest.raises(MemberNotFound):
+            await cache.get_member(1, 1)
+
+        member = Member(
+            1,
+            1,
+            warn_count=2,
+            duplicate_channel_counter_dict={5: 2},
+            internal_is_in_guild=False,
+            messages=[Message(1, 2, 1, 1, "Hello", is_duplicate=True)],
+            addons={"Plugin": "data"},
+        )
+        await cache.set_member(member)
+        assert await cache.get_guild(1)
+
+        stored = await cache.get_member(1, 1)
+        assert stored.warn_count == 2
+        assert stored.duplicate_channel_counter_dict == {5: 2}
+        assert stored.internal_is_in_guild is False
+        assert stored.messages == member.messages
+        assert stored.addons == {"Plugin": "data"}
+
+        await cache.delete_member(1, 1)
+        with pytest.raises(MemberNotFound):
+            await cache.get_member(1, 1)
+
+    @pytest.mark.asyncio
+    async def test_add_message(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        await cache.add_message(Message(1, 2, 1, 1, "Hello"))
+        await cache.add_message(Message(2, 2, 1, 1, "World"))
+
+        member = await cache.get_member(1, 1)
+        assert [m.content for m in member.messages] == ["Hello", "World"]
+        assert (await cache.get_guild(1)).options == create_sqlite_cache.handler.options
+
+    @pytest.mark.asyncio
+    async def test_counters(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        assert (
+            await cache.increment_member_counter(1, 1, MemberCounter.WARN_COUNTER) == 1
+        )
+        assert (
+            await cache.increment_member_counter(1, 1, MemberCounter.WARN_COUNTER, 2)
+            == 3
+        )
+        await cache.increment_member_counter(1, 1, MemberCounter.KICK_COUNTER)
+
+        await cache.reset_member_count(1, 1, ResetType.WARN_COUNTER)
+        member = await cache.get_member(1, 1)
+        assert member.warn_count == 0
+        assert member.kick_count == 1
+
+        # Doesn't create the member
+        await cache.reset_member_count(2, 1, ResetType.KICK_COUNTER)
+        with pytest.raises(MemberNotFound):
+            await cache.get_member(2, 1)
+
+    @pytest.mark.asyncio
+    async def test_update_member(self, create_sqlite_cache):
+        def warn(member: Member) -> None:
+            member.warn_count += 1
+            member.messages.append(Message(member.warn_count, 1, 1, 1, "Hello"))
+
+        await create_sqlite_cache.update_member(1, 1, warn)
+        member = await create_sqlite_cache.update_member(1, 1, warn)
+        assert member.warn_count == 2
+        assert member == await create_sqlite_cache.get_member(1, 1)
+        assert len((await create_sqlite_cache.get_member(1, 1)).messages) == 2
+
+        def fail(member: Member) -> None:
+            member.warn_count += 1
+            raise ValueError
+
+        with pytest.raises(ValueError):
+            await create_sqlite_cache.update_member(1, 1, fail)
+
+        # Rolled back
+        assert (await create_sqlite_cache.get_member(1, 1)).warn_count == 2
+
+    @pytest.mark.asyncio
+    async def test_reads_during_writes(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        guild = Guild(1, Options())
+        for member_id in range(20):
+            guild.members[member_id] = Member(member_id, 1)
+        await cache.set_guild(guild)
+
+        async def read():
+            guilds = []
+            for _ in range(20):
+                guilds.append(await cache.get_guild(1))
+                await cache.get_member(19, 1)
+            return guilds
+
+        # set_guild removes every member before writing them again
+        *_, guilds = await asyncio.gather(
+            *[cache.set_guild(guild) for _ in range(20)], read()
+        )
+        assert all(len(result.members) == 20 for result in guilds)
+
+    @pytest.mark.asyncio
+    async def test_members_many(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        await cache.set_members_many([Member(1, 1), Member(2, 1), Member(1, 2)])
+        assert set((await cache.get_members_many([1, 2, 3], 1)).keys()) == {1, 2}
+
+        await cache.add_messages_many(
+            [Message(1, 1, 1, 1, "Hello"), Message(2, 1, 1, 3, "World")]
+        )
+        assert len((await cache.get_member(3, 1)).messages) == 1
+
+        await cache.delete_members_many([1, 3], 1)
+        assert list((await cache.get_guild(1)).members.keys()) == [2]
+
+    @pytest.mark.asyncio
+    async def test_expire_messages(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        now = get_aware_time()
+        await cache.add_messages_many(
+            [
+                Message(1, 1, 1, 1, "Old", now - datetime.timedelta(minutes=1)),
+                Message(2, 1, 1, 1, "New", now),
+            ]
+        )
+
+        assert await cache.expire_messages(now - datetime.timedelta(seconds=1)) == 1
+        member = await cache.get_member(1, 1)
+        assert [m.content for m in member.messages] == ["New"]
+
+    @pytest.mark.asyncio
+    async def test_iteration_and_drop(self, create_sqlite_cache):
+        cache = create_sqlite_cache
+        await cache.set_member(Member(1, 1))
+        await cache.set_member(Member(2, 1))
+        await cache.set_guild(Guild(2, Options()))
+
+        assert len([g async for g in cache.get_all_guilds()]) == 2
+        assert len([m async for m in cache.get_all_members(1)]) == 2
+        with pytest.raises(GuildNotFound):
+            async for _ in cache.get_all_members(3):
+                pass
+
+        await cache.drop()
+        assert [g async for g in cache.get_all_guilds()] == []
+
+    @pytest.mark.asyncio
+    async def test_persists(self, create_handler, tmp_path):
+        path = os.path.join(tmp_path, "antispam.sqlite3")
+        cache = SQLiteCache(create_handler, path)
+        await cache.add_message(Message(1, 1, 1, 1, "Hello"))
+        await cache.close()
+
+        cache = SQLiteCache(create_handler, path)
+        assert len((await cache.get_member(1, 1)).messages) == 1
+
+        db = await cache._connection()
+        async with db.execute("PRAGMA journal_mode") as cursor:
+            assert (await cursor.fetchone())[0] == "wal"
+
+        await cache.close()
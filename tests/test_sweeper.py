@@ -0,0 +1,97 @@
+import asyncio
+import datetime
+
+import pytest
+
+from antispam import CacheSweeper, Options
+from antispam.dataclasses import Guild, Member, Message
+from antispam.util import get_aware_time
+
+
+class TestCacheSweeper:
+    @pytest.mark.asyncio
+    async def test_sweep_in_place(self, create_handler):
+        cache = create_handler.cache
+        expired = Message(1, 1, 1, 1, "Hello")
+        expired.creation_time = get_aware_time() - datetime.timedelta(minutes=1)
+
+        await cache.set_member(Member(1, 1, messages=[expired]))
+        await cache.set_member(Member(2, 1, warn_count=1, messages=[expired]))
+        await cache.set_member(Member(1, 2))
+        await cache.set_guild(Guild(3, Options(no_punish=True)))
+        guild = await cache.get_guild(1)
+
+        sweeper = CacheSweeper(create_handler)
+        assert await sweeper.tick() == 3
+
+        # Cleaned without being dropped and rebuilt
+        assert await cache.get_guild(1) is guild
+        assert list(guild.members.keys()) == [2]
+        assert guild.members[2].messages == []
+        assert set(cache.cache.keys()) == {1, 3}
+
+        assert sweeper.progress.passes == 1
+        assert sweeper.progress.members_removed == 2
+        assert sweeper.progress.guilds_removed == 1
+
+    @pytest.mark.asyncio
+    async def test_strict(self, create_handler):
+        """Tests strict mode keeps what clean_cache(strict=True) keeps"""
+        await create_handler.cache.set_member(Member(1, 1, warn_count=1))
+        await create_handler.cache.set_member(Member(2, 1))
+        await create_handler.cache.set_guild(
+            Guild(2, create_handler.options, addons={"a": 1})
+        )
+
+        sweeper = CacheSweeper(create_handler, strict=True)
+        await sweeper.tick()
+        assert list(create_handler.cache.cache.keys()) == [1, 2]
+        assert list(create_handler.cache.cache[1].members.keys()) == [1]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_propagate(self, create_handler, create_redis_cache):
+        """Tests a sweep doesn't undo changes made after its snapshot"""
+        create_handler.cache = cache = create_redis_cache
+        expired = Message(1, 1, 1, 1, "Hello")
+        expired.creation_time = get_aware_time() - datetime.timedelta(minutes=1)
+        await cache.set_member(Member(1, 1, messages=[expired]))
+        await cache.set_member(Member(2, 1))
+
+        guild = await cache.get_guild(1)
+        # Both members receive a message after the sweeper read the guild
+        await cache.add_message(Message(2, 1, 1, 1, "World"))
+        await cache.add_message(Message(3, 1, 1, 2, "World"))
+
+        await CacheSweeper(create_handler)._sweep_guild(guild)
+
+        assert [m.id for m in (await cache.get_member(1, 1)).messages] == [2]
+        assert [m.id for m in (await cache.get_member(2, 1)).messages] == [3]
+
+    @pytest.mark.asyncio
+    async def test_bounded_ticks(self, create_handler):
+        for guild_id in range(5):
+            await create_handler.cache.set_member(Member(1, guild_id, warn_count=1))
+
+        sweeper = CacheSweeper(create_handler, guilds_per_tick=2)
+        assert await sweeper.tick() == 2
+        assert await sweeper.tick() == 2
+        assert sweeper.progress.guilds_swept == 4
+        assert await sweeper.tick() == 1
+        assert sweeper.progress.passes == 1
+        assert sweeper.progress.guilds_swept == 0
+
+        # A time budget stops the tick early
+        sweeper.time_budget = 0
+        assert await sweeper.tick() == 1
+
+    @pytest.mark.asyncio
+    async def test_background_task(self, create_handler):
+        await create_handler.cache.set_member(Member(1, 1))
+
+        sweeper = CacheSweeper(create_handler, interval=0.01)
+        sweeper.start()
+        await asyncio.sleep(0.05)
+        await sweeper.stop()
+
+        assert sweeper.progress.passes >= 1
+        assert not create_handler.cache.cache
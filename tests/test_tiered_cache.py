@@ -0,0 +1,126 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from antispam import GuildNotFound, MemberNotFound, Options
+from antispam.dataclasses import Guild, Member, Message
+from antispam.enums import MemberCounter, ResetType
+
+
+class TestTieredCache:
+    @pytest.mark.asyncio
+    async def test_initialize_and_close(self, create_tiered_cache):
+        await create_tiered_cache.initialize()
+        assert create_tiered_cache._flush_task is not None
+
+        await create_tiered_cache.set_member(Member(1, 1))
+        await create_tiered_cache.close()
+        assert create_tiered_cache._flush_task is None
+        assert await create_tiered_cache.backend.get_member(1, 1)
+
+    @pytest.mark.asyncio
+    async def test_flush_interval(self, create_tiered_cache):
+        create_tiered_cache.flush_interval = 0.01
+        await create_tiered_cache.initialize()
+        await create_tiered_cache.add_message(Message(1, 1, 1, 1, "Hello world"))
+        await asyncio.sleep(0.05)
+
+        member = await create_tiered_cache.backend.get_member(1, 1)
+        assert len(member.messages) == 1
+        await create_tiered_cache.close()
+
+    @pytest.mark.asyncio
+    async def test_reads_are_served_from_memory(self, create_tiered_cache):
+        backend = create_tiered_cache.backend
+        await backend.set_guild(Guild(1, Options(), members={1: Member(1, 1)}))
+
+        with patch.object(backend, "get_guild", wraps=backend.get_guild) as spy:
+            assert await create_tiered_cache.get_guild(1)
+            assert await create_tiered_cache.get_member(1, 1)
+            with pytest.raises(MemberNotFound):
+                await create_tiered_cache.get_member(2, 1)
+
+            assert spy.call_count == 1
+
+        with pytest.raises(GuildNotFound):
+            await create_tiered_cache.get_guild(2)
+
+    @pytest.mark.asyncio
+    async def test_writes_are_deferred(self, create_tiered_cache):
+        backend = create_tiered_cache.backend
+        await create_tiered_cache.add_message(Message(1, 1, 1, 1, "Hello world"))
+        await create_tiered_cache.add_message(Message(2, 1, 1, 1, "Hello world"))
+        value = await create_tiered_cache.increment_member_counter(
+            1, 1, MemberCounter.WARN_COUNTER
+        )
+        assert value == 1
+
+        with pytest.raises(GuildNotFound):
+            await backend.get_guild(1)
+
+        await create_tiered_cache.flush()
+        member = await backend.get_member(1, 1)
+        assert len(member.messages) == 2
+        assert member.warn_count == 1
+
+        # Only the changed member is written from now on
+        with patch.object(backend, "set_member", wraps=backend.set_member) as spy:
+            await create_tiered_cache.reset_member_count(1, 1, ResetType.WARN_COUNTER)
+            await create_tiered_cache.flush()
+            await create_tiered_cache.flush()
+            assert spy.call_count == 1
+
+        assert (await backend.get_member(1, 1)).warn_count == 0
+
+    @pytest.mark.asyncio
+    async def test_deletes(self, create_tiered_cache):
+        backend = create_tiered_cache.backend
+        await backend.set_guild(
+            Guild(1, Options(), members={1: Member(1, 1), 2: Member(2, 1)})
+        )
+        await backend.set_guild(Guild(2, Options()))
+
+        await create_tiered_cache.delete_member(1, 1)
+        await create_tiered_cache.delete_guild(2)
+        with pytest.raises(GuildNotFound):
+            await create_tiered_cache.get_guild(2)
+
+        assert await backend.get_member(1, 1)
+        await create_tiered_cache.flush()
+
+        with pytest.raises(MemberNotFound):
+            await backend.get_member(1, 1)
+
+        with pytest.raises(GuildNotFound):
+            await backend.get_guild(2)
+
+        assert await backend.get_member(2, 1)
+
+    @pytest.mark.asyncio
+    async def test_eviction_flushes(self, create_tiered_cache):
+        for guild_id in range(3):
+            await create_tiered_cache.set_member(Member(1, guild_id))
+
+        assert list(create_tiered_cache._guilds.keys()) == [1, 2]
+        assert await create_tiered_cache.backend.get_member(1, 0)
+
+        # Read back through from the backend
+        assert await create_tiered_cache.get_member(1, 0)
+        assert list(create_tiered_cache._guilds.keys()) == [2, 0]
+
+    @pytest.mark.asyncio
+    async def test_get_all(self, create_tiered_cache):
+        await create_tiered_cache.set_member(Member(1, 1))
+        await create_tiered_cache.set_member(Member(2, 1))
+        await create_tiered_cache.set_guild(Guild(2, Options()))
+
+        guilds = [g async for g in create_tiered_cache.get_all_guilds()]
+        assert sorted(g.id for g in guilds) == [1, 2]
+
+        members = [m async for m in create_tiered_cache.get_all_members(1)]
+        assert len(members) == 2
+
+        await create_tiered_cache.drop()
+        with pytest.raises(GuildNotFound):
+            await create_tiered_cache.get_guild(1)